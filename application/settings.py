@@ -125,6 +125,7 @@ JWT_AUTH = {
     "JWT_EXPIRATION_DELTA": datetime.timedelta(
         seconds=int(os.environ.get('JWT_EXPIRATION_DELTA_SECONDS', 300))
     ),
+    "JWT_PAYLOAD_HANDLER": 'domain_api.utilities.roles.jwt_payload_handler',
 }
 
 DATABASES = {
@@ -241,7 +242,7 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
-        'rest_framework_jwt.authentication.JSONWebTokenAuthentication',
+        'domain_api.authentication.RoleJSONWebTokenAuthentication',
     ),
     'DEFAULT_THROTTLE_CLASSES': (
         'rest_framework.throttling.AnonRateThrottle',
@@ -278,3 +279,100 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 CELERY_ENABLE_UTC = True
 CELERY_RESULT_BACKEND = 'rpc://'
+# Most seconds a request waits on its workflow chain, whatever the commands
+# of its steps add up to. Keep it below the web server's worker timeout.
+WORKFLOW_WAIT_TIMEOUT = float(os.environ.get('WORKFLOW_WAIT_TIMEOUT', 90))
+# Workflow step tasks are declared with ignore_result; their errors must
+# still reach the caller waiting on the chain.
+CELERY_TASK_STORE_ERRORS_EVEN_IF_IGNORED = True
+# Size of the per-process pool of EPP rpc connections and how long to wait
+# for one to become free.
+EPP_RPC_POOL_SIZE = int(os.environ.get('EPP_RPC_POOL_SIZE', 4))
+EPP_RPC_POOL_TIMEOUT = float(os.environ.get('EPP_RPC_POOL_TIMEOUT', 10))
+# Seconds to wait for a reply from the EPP gateway, per command. Registry
+# specific overrides go in EPP_REGISTRY_COMMAND_TIMEOUTS, i.e.
+# {"nzrs-test": {"createDomain": 90}}
+EPP_COMMAND_TIMEOUTS = {
+    "default": float(os.environ.get('EPP_COMMAND_TIMEOUT', 30)),
+    "checkDomain": 5,
+    "checkHost": 5,
+    "infoDomain": 10,
+    "infoContact": 10,
+    "infoHost": 10,
+    "createDomain": 60,
+}
+EPP_REGISTRY_COMMAND_TIMEOUTS = {}
+# "amqp" sends EPP commands to the gateway through RabbitMQ. "fake" answers
+# them from an in-process registry simulator for tests and load testing;
+# EPP_FAKE_REGISTRY sets its latency (seconds) and error injection. The
+# latency may also be a dict per command, i.e.
+# {"default": 0.2, "checkDomain": 0.05, "createDomain": 1.5}
+EPP_RPC_TRANSPORT = os.environ.get('EPP_RPC_TRANSPORT', 'amqp')
+EPP_FAKE_REGISTRY = {
+    "latency": float(os.environ.get('EPP_FAKE_REGISTRY_LATENCY', 0)),
+    "error_rate": float(os.environ.get('EPP_FAKE_REGISTRY_ERROR_RATE', 0)),
+    "timeout_rate": float(os.environ.get('EPP_FAKE_REGISTRY_TIMEOUT_RATE',
+                                         0)),
+}
+# Seconds to cache availability check results. Names found available are
+# kept briefly as someone may register them at any time; 0 disables caching.
+AVAILABILITY_CACHE_AVAILABLE_TTL = int(
+    os.environ.get('AVAILABILITY_CACHE_AVAILABLE_TTL', 60)
+)
+AVAILABILITY_CACHE_TAKEN_TTL = int(
+    os.environ.get('AVAILABILITY_CACHE_TAKEN_TTL', 3600)
+)
+# Longest a streamed bulk availability check waits for registries (seconds)
+# and how often it looks for finished registry checks.
+BULK_AVAILABILITY_DEADLINE = float(
+    os.environ.get('BULK_AVAILABILITY_DEADLINE', 10)
+)
+BULK_AVAILABILITY_POLL_INTERVAL = 0.05
+# Concurrent single name availability checks for the same registry arriving
+# within this many milliseconds are sent as one checkDomain of at most
+# AVAILABILITY_BATCH_SIZE names. Only worth it with threaded web workers; 0
+# (the default) sends every check straight away.
+AVAILABILITY_BATCH_WINDOW = float(
+    os.environ.get('AVAILABILITY_BATCH_WINDOW', 0)
+)
+AVAILABILITY_BATCH_SIZE = int(os.environ.get('AVAILABILITY_BATCH_SIZE', 20))
+# Rebuild the in-memory zone lookup at least this often (seconds) to pick up
+# TopLevelDomain changes made by other processes. 0 keeps it until changed
+# in this process.
+ZONE_TRIE_MAX_AGE = int(os.environ.get('ZONE_TRIE_MAX_AGE', 300))
+# Seconds to cache which registry a domain or zone is routed to. Entries are
+# also dropped when a RegisteredDomain or TopLevelDomainProvider is saved or
+# deleted, but not on queryset .update() or on DomainProvider changes; those
+# only show once the entries expire.
+ROUTING_CACHE_TTL = int(os.environ.get('ROUTING_CACHE_TTL', 300))
+# Names kept in each of the IDNA encode/decode caches per process.
+IDN_CACHE_SIZE = int(os.environ.get('IDN_CACHE_SIZE', 10000))
+# Largest page a client may ask for with ?page_size= on paginated lists.
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 1000))
+# Put the user's groups in issued tokens and trust them on later requests
+# instead of querying. Group changes then apply once the token is renewed.
+ROLES_FROM_JWT = os.environ.get('ROLES_FROM_JWT', '').lower() in ('1', 'true')
+# Default page size of the cursor paginated domain, contact, registrant and
+# nameserver lists.
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 100))
+# Info endpoints serve the local copy of a domain, contact or host while it
+# is younger than this (seconds). Older copies are served while a background
+# task refreshes them; ?refresh=true always asks the registry.
+INFO_MAX_AGE = int(os.environ.get('INFO_MAX_AGE', 300))
+# Seconds before a queued refresh that never finished may be queued again.
+INFO_REFRESH_LOCK_TIMEOUT = int(os.environ.get('INFO_REFRESH_LOCK_TIMEOUT', 60))
+# Seconds a live sync may wait for the registry when a previously synced
+# copy could be served instead.
+INFO_STALE_TIMEOUT = float(os.environ.get('INFO_STALE_TIMEOUT', 3))
+# Most domains accepted by one bulk registration or update request, and how
+# many of them are created or updated at the same time per registry.
+BULK_MAX_DOMAINS = int(os.environ.get('BULK_MAX_DOMAINS', 5000))
+BULK_CREATE_CONCURRENCY = int(os.environ.get('BULK_CREATE_CONCURRENCY', 4))
+BULK_UPDATE_CONCURRENCY = int(os.environ.get('BULK_UPDATE_CONCURRENCY', 4))
+# Seconds without progress after which an unfinished bulk job may be
+# resumed, on the assumption that its worker has gone away.
+BULK_STALL_TIMEOUT = int(os.environ.get('BULK_STALL_TIMEOUT', 600))
+# Seconds without progress after which a request kept under an
+# Idempotency-Key that is still pending or running is resumed when it is
+# sent again. Keep it well above the slowest EPP command timeout.
+JOB_STALL_TIMEOUT = int(os.environ.get('JOB_STALL_TIMEOUT', 300))
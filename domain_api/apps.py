@@ -1,5 +1,6 @@
+from celery.signals import task_failure, task_prerun, task_success
 from django.apps import AppConfig
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 
 def add_to_default_group(sender, **kwargs):
     """
@@ -21,5 +22,50 @@ class DomainApiConfig(AppConfig):
 
         """
         from django.contrib.auth.models import User
+        from .models import (
+            Contact,
+            DomainContact,
+            RegisteredDomain,
+            Registrant,
+            TopLevelDomain,
+            TopLevelDomainProvider,
+        )
+        from .utilities.access import (
+            contact_access,
+            domain_contact_access,
+            registered_domain_access,
+            registrant_access,
+        )
+        from .utilities.availability import invalidate_registered_domain
+        from .utilities.domain import (
+            invalidate_domain_route,
+            invalidate_zone_route,
+        )
+        from .utilities.jobs import (
+            job_step_failed,
+            job_step_started,
+            job_step_succeeded,
+        )
+        from .utilities.zones import reset_zone_trie
         post_save.connect(add_to_default_group, sender=User)
+        post_save.connect(invalidate_registered_domain,
+                          sender=RegisteredDomain)
+        post_delete.connect(invalidate_registered_domain,
+                            sender=RegisteredDomain)
+        post_save.connect(reset_zone_trie, sender=TopLevelDomain)
+        post_delete.connect(reset_zone_trie, sender=TopLevelDomain)
+        post_save.connect(invalidate_domain_route, sender=RegisteredDomain)
+        post_delete.connect(invalidate_domain_route, sender=RegisteredDomain)
+        post_save.connect(invalidate_zone_route,
+                          sender=TopLevelDomainProvider)
+        post_delete.connect(invalidate_zone_route,
+                            sender=TopLevelDomainProvider)
+        post_save.connect(registered_domain_access, sender=RegisteredDomain)
+        post_save.connect(domain_contact_access, sender=DomainContact)
+        post_delete.connect(domain_contact_access, sender=DomainContact)
+        post_save.connect(registrant_access, sender=Registrant)
+        post_save.connect(contact_access, sender=Contact)
+        task_prerun.connect(job_step_started)
+        task_success.connect(job_step_succeeded)
+        task_failure.connect(job_step_failed)
         super().ready()
@@ -0,0 +1,28 @@
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+from django.conf import settings
+import logging
+
+from .utilities.roles import set_user_groups
+
+log = logging.getLogger(__name__)
+
+
+class RoleJSONWebTokenAuthentication(JSONWebTokenAuthentication):
+
+    """
+    JWT authentication that takes the user's groups from the token.
+    """
+
+    def authenticate_credentials(self, payload):
+        """
+        Return the user for a token and remember its groups.
+
+        :payload: dict decoded JWT payload
+        :returns: User object
+
+        """
+        user = super().authenticate_credentials(payload)
+        groups = payload.get("groups")
+        if settings.ROLES_FROM_JWT and groups is not None:
+            set_user_groups(user, groups)
+        return user
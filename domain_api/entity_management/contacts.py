@@ -3,6 +3,7 @@ from itertools import chain
 import logging
 from domain_api.epp.actions.contact import Contact as ContactAction
 from ..models import Contact, Registrant
+from ..utilities.info import expire_info
 
 log = logging.getLogger(__name__)
 
@@ -325,6 +326,9 @@ class ContactFactory(object):
         contact = ContactAction()
         response = contact.update(self.provider.slug, update_data)
         log.debug("Received response")
+        expire_info(self.contact_object.__class__.objects.filter(
+            pk=self.contact_object.pk
+        ))
         return response
 
 
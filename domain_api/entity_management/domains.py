@@ -2,8 +2,10 @@ import logging
 from ..models import (
     Registrant,
     ContactType,
-    Contact
+    Contact,
+    RegisteredDomain,
 )
+from ..utilities.domain import synchronise_domain_nameservers
 
 log = logging.getLogger(__name__)
 
@@ -44,6 +46,7 @@ class DomainManager(object):
         """
         if add:
             self.add_domain_contacts(add.pop("contact", None))
+            self.add_domain_nameservers(add.pop("ns", None))
 
     def add_domain_contacts(self, contacts=None):
         """
@@ -74,6 +77,7 @@ class DomainManager(object):
         """
         if rem:
             self.remove_domain_contacts(rem.pop("contact", None))
+            self.remove_domain_nameservers(rem.pop("ns", None))
 
     def remove_domain_contacts(self, contacts=None):
         """
@@ -96,6 +100,48 @@ class DomainManager(object):
                                                                registry_id,
                                                                str(self._registered_domain)))
 
+    def set_domain_nameservers(self, nameservers):
+        """
+        Store the nameservers of the domain.
+
+        :nameservers: list of ns hosts
+
+        """
+        RegisteredDomain.objects.filter(
+            pk=self._registered_domain.pk
+        ).update(nameservers=nameservers)
+        self._registered_domain.nameservers = nameservers
+        synchronise_domain_nameservers(self._registered_domain.pk,
+                                       nameservers)
+
+    def add_domain_nameservers(self, nameservers=None):
+        """
+        Add nameservers to the registered domain
+
+        :nameservers: list of ns hosts
+        """
+        if nameservers:
+            if not isinstance(nameservers, list):
+                nameservers = [nameservers]
+            current = self._registered_domain.nameservers or []
+            self.set_domain_nameservers(
+                current + [i for i in nameservers if i not in current]
+            )
+
+    def remove_domain_nameservers(self, nameservers=None):
+        """
+        Remove nameservers from the registered domain
+
+        :nameservers: list of ns hosts
+        """
+        if nameservers:
+            if not isinstance(nameservers, list):
+                nameservers = [nameservers]
+            current = self._registered_domain.nameservers or []
+            self.set_domain_nameservers(
+                [i for i in current if i not in nameservers]
+            )
+
     def connect_domain_to_registrant(self, registry_id):
         """
         Connect a domain and a new registrant based on registry id.
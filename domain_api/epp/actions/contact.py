@@ -1,5 +1,5 @@
 import logging
-from ..entity import EppEntity
+from ..entity import EppEntity, AsyncEppEntity
 from application.settings import get_logzio_sender
 
 log = logging.getLogger(__name__)
@@ -26,7 +26,16 @@ class Contact(EppEntity):
 
         """
         result = self.rpc_client.call(registry, 'createContact', contact_data)
+        return self.process_create(result)
 
+    def process_create(self, result):
+        """
+        Process a create contact response.
+
+        :result: dict EPP response
+        :returns: dict with id and create date of contact
+
+        """
         create_data = result["contact:creData"]
         return {
             "id": create_data["contact:id"],
@@ -44,3 +53,22 @@ class Contact(EppEntity):
         """
         result = self.rpc_client.call(registry, 'updateContact', update_data)
         return result
+
+
+class AsyncContact(AsyncEppEntity, Contact):
+
+    """
+    Manage EPP actions for contact entities as coroutines.
+    """
+
+    async def create(self, registry, contact_data):
+        result = await self.rpc_client.call(registry,
+                                            'createContact',
+                                            contact_data)
+        return self.process_create(result)
+
+    async def update(self, registry, update_data):
+        result = await self.rpc_client.call(registry,
+                                            'updateContact',
+                                            update_data)
+        return result
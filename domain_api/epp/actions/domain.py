@@ -1,5 +1,5 @@
 import logging
-from ..entity import EppEntity
+from ..entity import EppEntity, AsyncEppEntity
 
 log = logging.getLogger(__name__)
 
@@ -27,6 +27,16 @@ class Domain(EppEntity):
         """
         log.debug("Create a domain at %s" % registry)
         result = self.rpc_client.call(registry, 'createDomain', data)
+        return self.process_create(result)
+
+    def process_create(self, result):
+        """
+        Process a create domain response.
+
+        :result: dict EPP response
+        :returns: dict with create and expiration dates
+
+        """
         log.debug("{!r}".format(result))
         create_data = result["domain:creData"]
         return {
@@ -47,3 +57,21 @@ class Domain(EppEntity):
         result = self.rpc_client.call(registry, 'updateDomain', data)
         log.debug("{!r}".format(result))
         return {}
+
+
+class AsyncDomain(AsyncEppEntity, Domain):
+
+    """
+    Manage EPP actions for domain entities as coroutines.
+    """
+
+    async def create(self, registry, data):
+        log.debug("Create a domain at %s" % registry)
+        result = await self.rpc_client.call(registry, 'createDomain', data)
+        return self.process_create(result)
+
+    async def update(self, registry, data):
+        log.debug("Update a domain at %s" % registry)
+        result = await self.rpc_client.call(registry, 'updateDomain', data)
+        log.debug("{!r}".format(result))
+        return {}
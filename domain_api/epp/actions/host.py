@@ -1,6 +1,6 @@
 import logging
 from ...utilities.domain import get_domain_registry
-from ..entity import EppEntity
+from ..entity import EppEntity, AsyncEppEntity
 
 log = logging.getLogger(__name__)
 
@@ -28,10 +28,35 @@ class Host(EppEntity):
         registry = get_domain_registry(host_data["idn_host"])
         host_data["name"] = host_data["idn_host"]
         result = self.rpc_client.call(registry.slug, 'createHost', host_data)
+        return self.process_create(result)
 
+    def process_create(self, result):
+        """
+        Process a create host response.
+
+        :result: dict EPP response
+        :returns: dict with host name and create date
+
+        """
         create_data = result["host:creData"]
         log.debug("{!r}".format(result))
         return {
             "host": create_data["host:name"],
             "create_date": create_data["host:crDate"]
         }
+
+
+class AsyncHost(AsyncEppEntity, Host):
+
+    """
+    Manage EPP actions for host entities as coroutines.
+    """
+
+    async def create(self, host_data):
+        registry = await self.run_sync(get_domain_registry,
+                                       host_data["idn_host"])
+        host_data["name"] = host_data["idn_host"]
+        result = await self.rpc_client.call(registry.slug,
+                                            'createHost',
+                                            host_data)
+        return self.process_create(result)
@@ -1,5 +1,8 @@
+import asyncio
 import logging
+from django.db import connection
 from ..utilities.rpc_client import EppRpcClient
+from ..utilities.async_rpc_client import get_async_rpc_client
 from application import settings
 
 log = logging.getLogger(__name__)
@@ -13,7 +16,7 @@ class EppEntity(object):
 
     def __init__(self, queryset=None):
         """
-        Set up rabbitmq connection.
+        Set up rpc client. Connections come from the per-process pool.
         """
         self.queryset = queryset
         self.rpc_client = EppRpcClient(host=settings.RABBITMQ_HOST)
@@ -60,3 +63,39 @@ class EppEntity(object):
             if reason_key in check_data:
                 response["reason"] = check_data[reason_key]
         return response
+
+
+class AsyncEppEntity(EppEntity):
+
+    """
+    Represent an EPP Entity whose registry calls are coroutines.
+
+    Subclasses mix this in ahead of the synchronous entity so they share its
+    request and response processing.
+    """
+
+    def __init__(self, queryset=None, rpc_client=None, loop=None):
+        """
+        Use the given client or the one shared by the event loop.
+        """
+        self.queryset = queryset
+        self.loop = loop or asyncio.get_event_loop()
+        self.rpc_client = rpc_client or get_async_rpc_client(self.loop)
+
+    async def run_sync(self, func, *args):
+        """
+        Run blocking code, such as a registry lookup that may hit the
+        database, in the loop's executor rather than on the loop itself.
+
+        :func: function to call
+        :*args: arguments for func
+        :returns: what func returns
+
+        """
+        def run():
+            try:
+                return func(*args)
+            finally:
+                # Django opens a connection per thread; do not leave it behind.
+                connection.close()
+        return await self.loop.run_in_executor(None, run)
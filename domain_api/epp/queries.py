@@ -1,7 +1,7 @@
 import logging
 from ..utilities.domain import parse_domain, get_domain_registry
-import idna
-from .entity import EppEntity
+from ..utilities import idn
+from .entity import EppEntity, AsyncEppEntity
 
 log = logging.getLogger(__name__)
 
@@ -46,19 +46,27 @@ class Domain(EppEntity):
             return processed
         return None
 
-    def check_domain(self, *args):
+    def check_domain_request(self, *args):
         """
-        Send a check domain request to the registry.
+        Prepare a check domain request.
 
         :*args: one or more domain names
-        :returns: dict with set of results indicating availability
+        :returns: tuple of registry slug and EPP data
 
         """
         registry = get_domain_registry(args[0])
-        data = {"domain": [idna.encode(i, uts46=True).decode('ascii')
-                           for i in args]}
+        data = {"domain": idn.encode_many(args)}
         log.debug("{!r}".format(data))
-        response_data = self.rpc_client.call(registry.slug, 'checkDomain', data)
+        return registry.slug, data
+
+    def process_check_domain(self, response_data):
+        """
+        Process a check domain response.
+
+        :response_data: dict EPP response
+        :returns: dict with set of results indicating availability
+
+        """
         log.debug("response data {!r}".format(response_data))
         check_data = response_data["domain:chkData"]["domain:cd"]
         results = []
@@ -73,6 +81,33 @@ class Domain(EppEntity):
         }
         return availability
 
+    def check_domain(self, *args):
+        """
+        Send a check domain request to the registry.
+
+        :*args: one or more domain names
+        :returns: dict with set of results indicating availability
+
+        """
+        registry, data = self.check_domain_request(*args)
+        response_data = self.rpc_client.call(registry, 'checkDomain', data)
+        return self.process_check_domain(response_data)
+
+    def check_registry_domain(self, registry, *args):
+        """
+        Send a check domain request for names already known to be at a
+        registry, without looking the registry up again.
+
+        :registry: str registry slug
+        :*args: one or more ascii domain names
+        :returns: dict with set of results indicating availability
+
+        """
+        response_data = self.rpc_client.call(registry,
+                                             'checkDomain',
+                                             {"domain": list(args)})
+        return self.process_check_domain(response_data)
+
     def process_nameservers(self, raw_ns):
         """
         Process nameserver information in info domain
@@ -94,12 +129,13 @@ class Domain(EppEntity):
                 nameservers.append(host_obj["domain:hostObj"])
         return nameservers
 
-    def info(self, domain, user=None):
+    def info(self, domain, user=None, timeout=None):
         """
         Get info for a domain
 
         :registry: str registry to query
         :domain: str domain name to query
+        :timeout: float seconds to wait for the registry
         :returns: dict with info about domain
 
         """
@@ -114,7 +150,36 @@ class Domain(EppEntity):
         if registered_domain_set.exists():
             registered_domain = registered_domain_set.first()
         data = {"domain": domain}
-        response_data = self.rpc_client.call(registry.slug, 'infoDomain', data)
+        response_data = self.rpc_client.call(registry.slug, 'infoDomain', data,
+                                             timeout=timeout)
+        return self.process_info_domain(response_data)
+
+    def created_info(self, registry, domain):
+        """
+        Look up a domain at a registry for what creating it returned.
+
+        :registry: str registry slug
+        :domain: str domain name
+        :returns: dict with registrant, create and expiration dates
+
+        """
+        response_data = self.rpc_client.call(registry, 'infoDomain',
+                                             {"domain": domain})
+        info_data = response_data["domain:infData"]
+        return {
+            "registrant": info_data["domain:registrant"],
+            "create_date": info_data["domain:crDate"],
+            "expiration_date": info_data["domain:exDate"]
+        }
+
+    def process_info_domain(self, response_data):
+        """
+        Process an info domain response.
+
+        :response_data: dict EPP response
+        :returns: dict with info about domain
+
+        """
         info_data = response_data["domain:infData"]
         return_data = {
             "domain": info_data["domain:name"],
@@ -210,12 +275,13 @@ class ContactQuery(EppEntity):
                 processed_data.append(v)
         return processed_data
 
-    def info(self, contact):
+    def info(self, contact, timeout=None):
         """
         Fetch info for a contact
 
         :registry: Registry to query
         :contact: ID of contact
+        :timeout: float seconds to wait for the registry
         :returns: dict of contact information
 
         """
@@ -223,7 +289,18 @@ class ContactQuery(EppEntity):
         # Fetch contact from registry.
         data = {"contact": contact.registry_id}
         registry = contact.provider.slug
-        response_data = self.rpc_client.call(registry, 'infoContact', data)
+        response_data = self.rpc_client.call(registry, 'infoContact', data,
+                                             timeout=timeout)
+        return self.process_info_contact(response_data)
+
+    def process_info_contact(self, response_data):
+        """
+        Process an info contact response.
+
+        :response_data: dict EPP response
+        :returns: dict of contact information
+
+        """
         log.debug("Received info response")
         info_data = response_data["contact:infData"]
         processed_postal_info = self.process_postal_info(
@@ -279,14 +356,34 @@ class HostQuery(EppEntity):
         :returns: dict EPP check host response
 
         """
-        registry = get_domain_registry(args[0])
-        data = {"host": [idna.encode(i, uts46=True).decode('ascii')
-                         for i in args]}
+        registry, data = self.check_host_request(*args)
         response_data = self.rpc_client.call(
-            registry.slug,
+            registry,
             'checkHost',
             data
         )
+        return self.process_check_host(response_data)
+
+    def check_host_request(self, *args):
+        """
+        Prepare a check host request.
+
+        :*args: list of host names to check
+        :returns: tuple of registry slug and EPP data
+
+        """
+        registry = get_domain_registry(args[0])
+        data = {"host": idn.encode_many(args)}
+        return registry.slug, data
+
+    def process_check_host(self, response_data):
+        """
+        Process a check host response.
+
+        :response_data: dict EPP response
+        :returns: dict with set of results indicating availability
+
+        """
         check_data = response_data["host:chkData"]["host:cd"]
         results = []
         if isinstance(check_data, list):
@@ -326,18 +423,30 @@ class HostQuery(EppEntity):
             return [self.process_addr_item(i) for i in addresses]
         return [self.process_addr_item(addresses)]
 
-    def info(self, registered_host, user=None):
+    def info(self, registered_host, user=None, timeout=None):
         """
         Get info for a host
 
         :host: str host name to query
+        :timeout: float seconds to wait for the registry
         :returns: dict with info about host
 
         """
 
         data = {"name": registered_host.host}
         registry = registered_host.tld_provider.provider
-        response_data = self.rpc_client.call(registry.slug, 'infoHost', data)
+        response_data = self.rpc_client.call(registry.slug, 'infoHost', data,
+                                             timeout=timeout)
+        return self.process_info_host(response_data)
+
+    def process_info_host(self, response_data):
+        """
+        Process an info host response.
+
+        :response_data: dict EPP response
+        :returns: dict with info about host
+
+        """
         info_data = response_data["host:infData"]
         return_data = {
             "idn_host": info_data["host:name"],
@@ -348,3 +457,63 @@ class HostQuery(EppEntity):
         if "host:authInfo" in info_data:
             return_data["authcode"] = info_data["host:authInfo"]["host:pw"]
         return return_data
+
+
+class AsyncDomain(AsyncEppEntity, Domain):
+
+    """
+    Query operations for domains as coroutines.
+    """
+
+    async def check_domain(self, *args):
+        registry, data = await self.run_sync(self.check_domain_request,
+                                             *args)
+        response_data = await self.rpc_client.call(registry,
+                                                   'checkDomain',
+                                                   data)
+        return self.process_check_domain(response_data)
+
+    async def info(self, domain, user=None):
+        registry = await self.run_sync(get_domain_registry, domain)
+        data = {"domain": domain}
+        response_data = await self.rpc_client.call(registry.slug,
+                                                   'infoDomain',
+                                                   data)
+        return self.process_info_domain(response_data)
+
+
+class AsyncContactQuery(AsyncEppEntity, ContactQuery):
+
+    """
+    Contact EPP operations as coroutines.
+    """
+
+    async def info(self, contact):
+        data = {"contact": contact.registry_id}
+        registry = await self.run_sync(lambda: contact.provider.slug)
+        response_data = await self.rpc_client.call(registry,
+                                                   'infoContact',
+                                                   data)
+        return self.process_info_contact(response_data)
+
+
+class AsyncHostQuery(AsyncEppEntity, HostQuery):
+
+    """
+    Nameserver EPP operations as coroutines.
+    """
+
+    async def check_host(self, *args):
+        registry, data = await self.run_sync(self.check_host_request, *args)
+        response_data = await self.rpc_client.call(registry, 'checkHost', data)
+        return self.process_check_host(response_data)
+
+    async def info(self, registered_host, user=None):
+        data = {"name": registered_host.host}
+        registry = await self.run_sync(
+            lambda: registered_host.tld_provider.provider
+        )
+        response_data = await self.rpc_client.call(registry.slug,
+                                                   'infoHost',
+                                                   data)
+        return self.process_info_host(response_data)
@@ -46,3 +46,17 @@ class UnknownRegistry(Exception):
 
 class UpdateEmpty(Exception):
     pass
+
+
+class RpcPoolExhausted(Exception):
+    """
+    No connection to the EPP gateway became free in time.
+    """
+    pass
+
+
+class EppTimeout(EppError):
+    """
+    No reply from the registry before the command deadline.
+    """
+    pass
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('domain_api', '0054_auto_20170628_0759'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='registereddomain',
+            unique_together=set([('name', 'tld', 'active'), ('fqdn', 'active')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='registereddomain',
+            index_together=set([('registrant', 'active')]),
+        ),
+    ]
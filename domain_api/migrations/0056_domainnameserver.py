@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import idna
+
+
+def backfill_domain_nameservers(apps, schema_editor):
+    RegisteredDomain = apps.get_model('domain_api', 'RegisteredDomain')
+    DomainNameserver = apps.get_model('domain_api', 'DomainNameserver')
+    domains = RegisteredDomain.objects.exclude(
+        nameservers=None
+    ).values_list('id', 'nameservers')
+    batch = []
+    for domain_id, nameservers in domains.iterator():
+        if not isinstance(nameservers, list):
+            nameservers = [nameservers]
+        hosts = set(idna.encode(i, uts46=True).decode('ascii')
+                    for i in nameservers if i)
+        for host in hosts:
+            batch.append(DomainNameserver(registered_domain_id=domain_id,
+                                          idn_host=host))
+        if len(batch) >= 5000:
+            DomainNameserver.objects.bulk_create(batch)
+            batch = []
+    DomainNameserver.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('domain_api', '0055_registereddomain_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DomainNameserver',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idn_host', models.CharField(db_index=True, max_length=255)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('registered_domain', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='domain_nameservers', to='domain_api.RegisteredDomain')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='domainnameserver',
+            unique_together=set([('registered_domain', 'idn_host')]),
+        ),
+        migrations.RunPython(backfill_domain_nameservers,
+                             reverse_code=migrations.RunPython.noop),
+    ]
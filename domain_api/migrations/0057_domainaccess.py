@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_domain_access(apps, schema_editor):
+    RegisteredDomain = apps.get_model('domain_api', 'RegisteredDomain')
+    DomainContact = apps.get_model('domain_api', 'DomainContact')
+    DomainAccess = apps.get_model('domain_api', 'DomainAccess')
+    rows = set(
+        (user_id, domain_id, 'registrant')
+        for domain_id, user_id in RegisteredDomain.objects.values_list(
+            'id', 'registrant__user_id'
+        ).iterator()
+    )
+    rows.update(
+        DomainContact.objects.filter(active=True).values_list(
+            'contact__user_id', 'registered_domain_id', 'contact_type__name'
+        ).iterator()
+    )
+    DomainAccess.objects.bulk_create(
+        [DomainAccess(user_id=user_id,
+                      registered_domain_id=domain_id,
+                      role=role)
+         for user_id, domain_id, role in rows],
+        batch_size=5000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('domain_api', '0056_domainnameserver'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DomainAccess',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(max_length=100)),
+                ('registered_domain', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access', to='domain_api.RegisteredDomain')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='domain_access', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='domainaccess',
+            unique_together=set([('user', 'registered_domain', 'role')]),
+        ),
+        migrations.RunPython(backfill_domain_access,
+                             reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('domain_api', '0057_domainaccess'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contact',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='nameserver',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='registrant',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterIndexTogether(
+            name='contact',
+            index_together=set([('user', 'created')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='nameserver',
+            index_together=set([('user', 'created')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='registereddomain',
+            index_together=set([('registrant', 'active'), ('active', 'created')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='registrant',
+            index_together=set([('user', 'created')]),
+        ),
+    ]
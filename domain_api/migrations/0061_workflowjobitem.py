@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_mysql.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('domain_api', '0060_workflowjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkflowJobItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('result', django_mysql.models.JSONField(default=None, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('error_status', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='domain_api.WorkflowJob')),
+            ],
+            options={
+                'ordering': ('id',),
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='workflowjobitem',
+            unique_together=set([('job', 'name')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='workflowjobitem',
+            index_together=set([('job', 'status')]),
+        ),
+    ]
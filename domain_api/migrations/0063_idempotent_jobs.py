@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django_mysql.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('domain_api', '0062_workflowjob_parameters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workflowjob',
+            name='fingerprint',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name='workflowjob',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='workflowjobstep',
+            name='output',
+            field=django_mysql.models.JSONField(default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='workflowjobstep',
+            name='signature',
+            field=django_mysql.models.JSONField(default=None, null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='workflowjob',
+            unique_together=set([('user', 'idempotency_key')]),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('domain_api', '0063_idempotent_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='workflowjobitem',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed'), ('created', 'Created, not connected')], default='pending', max_length=20),
+        ),
+    ]
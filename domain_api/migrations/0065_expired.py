@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('domain_api', '0064_workflowjobitem_created'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='expired',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='nameserver',
+            name='expired',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='registereddomain',
+            name='expired',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='registrant',
+            name='expired',
+            field=models.BooleanField(default=False),
+        ),
+    ]
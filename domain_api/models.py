@@ -1,6 +1,6 @@
 from django.db import models
 from django_mysql.models import JSONField
-import idna
+from .utilities import idn
 import re
 import uuid
 
@@ -77,7 +77,7 @@ class TopLevelDomain(models.Model):
         return self.tld
 
     def _get_tld(self):
-        return idna.decode(self.zone)
+        return idn.decode(self.zone)
 
     def _get_slug(self):
         return re.sub('\.', '', self.zone)
@@ -85,7 +85,7 @@ class TopLevelDomain(models.Model):
     tld = property(_get_tld)
 
     def save(self, *args, **kwargs):
-        self.zone = idna.encode(self.zone, uts46=True).decode('ascii')
+        self.zone = idn.encode(self.zone)
         self.slug = re.sub('\.', '', self.zone)
         super(TopLevelDomain, self).save(*args, **kwargs)
 
@@ -143,8 +143,12 @@ class Registrant(models.Model):
     roid = models.CharField(max_length=100, null=True, blank=True)
     non_disclose = JSONField(default=None, null=True)
     account_template = models.ForeignKey(AccountDetail)
-    created = models.DateTimeField(auto_now_add=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
     updated = models.DateTimeField(auto_now=True)
+    # Last time the local copy was refreshed from the registry.
+    synchronised = models.DateTimeField(null=True, blank=True)
+    # Changed at the registry by us since; the next info syncs it live.
+    expired = models.BooleanField(default=False)
 
     def __str__(self):
         return "%s - %s  provider: %s account_template: %s" % (self.pk,
@@ -152,6 +156,12 @@ class Registrant(models.Model):
                                                                self.provider.slug,
                                                                self.account_template.id)
 
+    class Meta:
+        # Keyset pagination of a user's list orders by created.
+        index_together = (
+            ('user', 'created',),
+        )
+
 
 class Contact(models.Model):
     """
@@ -190,8 +200,12 @@ class Contact(models.Model):
                              related_name='contacts',
                              on_delete=models.CASCADE)
     account_template = models.ForeignKey(AccountDetail)
-    created = models.DateTimeField(auto_now_add=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
     updated = models.DateTimeField(auto_now=True)
+    # Last time the local copy was refreshed from the registry.
+    synchronised = models.DateTimeField(null=True, blank=True)
+    # Changed at the registry by us since; the next info syncs it live.
+    expired = models.BooleanField(default=False)
 
     def __str__(self):
         return "%s - %s  provider: %s account_template: %s" % (self.pk,
@@ -199,6 +213,12 @@ class Contact(models.Model):
                                                                self.provider.slug,
                                                                self.account_template.id)
 
+    class Meta:
+        # Keyset pagination of a user's list orders by created.
+        index_together = (
+            ('user', 'created',),
+        )
+
 
 class TopLevelDomainProvider(models.Model):
     """
@@ -248,6 +268,10 @@ class RegisteredDomain(models.Model):
     nameservers = JSONField(default=None, null=True)
     expiration = models.DateTimeField(null=True)
     created = models.DateTimeField(auto_now_add=True)
+    # Last time the local copy was refreshed from the registry.
+    synchronised = models.DateTimeField(null=True, blank=True)
+    # Changed at the registry by us since; the next info syncs it live.
+    expired = models.BooleanField(default=False)
     updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
@@ -257,7 +281,7 @@ class RegisteredDomain(models.Model):
         return self.name + "." + self.tld.zone
 
     def _get_domain(self):
-        return idna.decode(self.name)
+        return idn.decode(self.name)
 
     domain = property(_get_domain)
 
@@ -265,14 +289,43 @@ class RegisteredDomain(models.Model):
         """
         Override the save method
         """
-        self.name = idna.encode(self.name, uts46=True).decode('ascii')
+        self.name = idn.encode(self.name)
         self.tld = self.tld_provider.zone
         self.fqdn = self.name + "." + self.tld.zone
         super(RegisteredDomain, self).save(*args, **kwargs)
 
     class Meta:
-        unique_together = ('name', 'tld', 'active',)
+        # The fqdn constraint also serves as the index for lookups by fqdn.
+        unique_together = (
+            ('name', 'tld', 'active',),
+            ('fqdn', 'active',),
+        )
+        index_together = (
+            ('registrant', 'active',),
+            ('active', 'created',),
+        )
+
+
+
+class DomainNameserver(models.Model):
+    """
+    Host a registered domain is delegated to.
+
+    Mirrors RegisteredDomain.nameservers so that the domains using a host can
+    be found through an index. The host need not be one of our Nameserver
+    objects.
+    """
+    registered_domain = models.ForeignKey(RegisteredDomain,
+                                          related_name='domain_nameservers',
+                                          on_delete=models.CASCADE)
+    idn_host = models.CharField(max_length=255, db_index=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.idn_host
 
+    class Meta:
+        unique_together = ('registered_domain', 'idn_host',)
 
 
 class DomainContact(models.Model):
@@ -292,6 +345,30 @@ class DomainContact(models.Model):
                            'active')
 
 
+class DomainAccess(models.Model):
+    """
+    Record of who may see a registered domain and in which role.
+
+    Derived from the registrant and active contacts of the domain and kept
+    up to date by signal handlers (see utilities.access), so ownership
+    checks are a lookup here instead of a join over registrants and
+    contacts.
+    """
+    REGISTRANT = 'registrant'
+
+    user = models.ForeignKey('auth.User',
+                             related_name='domain_access',
+                             on_delete=models.CASCADE)
+    registered_domain = models.ForeignKey(RegisteredDomain,
+                                          related_name='access',
+                                          on_delete=models.CASCADE)
+    # "registrant" or the contact type name
+    role = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = ('user', 'registered_domain', 'role',)
+
+
 class Nameserver(models.Model):
 
     """
@@ -301,8 +378,12 @@ class Nameserver(models.Model):
     addr = JSONField(default=None, null=True)
     tld_provider = models.ForeignKey(TopLevelDomainProvider)
     default = models.BooleanField(default=False)
-    created = models.DateTimeField(auto_now_add=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
     updated = models.DateTimeField(auto_now=True)
+    # Last time the local copy was refreshed from the registry.
+    synchronised = models.DateTimeField(null=True, blank=True)
+    # Changed at the registry by us since; the next info syncs it live.
+    expired = models.BooleanField(default=False)
     status = JSONField(default=None, null=True)
     roid = models.CharField(max_length=100, null=True)
     user = models.ForeignKey('auth.User',
@@ -315,14 +396,19 @@ class Nameserver(models.Model):
         :returns: str
 
         """
-        return idna.decode(self.idn_host)
+        return idn.decode(self.idn_host)
 
     host = property(_get_nameserver)
 
     def save(self, *args, **kwargs):
-        self.idn_host = idna.encode(self.idn_host, uts46=True).decode('ascii')
+        self.idn_host = idn.encode(self.idn_host)
         super(Nameserver, self).save(*args, **kwargs)
 
+    class Meta:
+        index_together = (
+            ('user', 'created',),
+        )
+
 
 class DefaultAccountTemplate(models.Model):
 
@@ -361,3 +447,116 @@ class DefaultAccountContact(models.Model):
     class Meta:
         unique_together = ('user', 'contact_type', 'account_template',
                            'provider', 'mandatory',)
+
+
+class WorkflowJob(models.Model):
+    """
+    Registry workflow run in the background for an asynchronous request.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey('auth.User',
+                             related_name='workflow_jobs',
+                             on_delete=models.CASCADE)
+    # i.e. create_domain, update_domain, create_host
+    action = models.CharField(max_length=50)
+    # Domain or host the workflow acts on.
+    name = models.CharField(max_length=255)
+    # Request data a bulk job applies to each of its items.
+    parameters = JSONField(default=None, null=True)
+    # Idempotency-Key header of the request that started the job, and a
+    # hash of the request so the key cannot be reused for another one.
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True)
+    fingerprint = models.CharField(max_length=40, null=True, blank=True)
+    status = models.CharField(max_length=20,
+                              choices=STATUS_CHOICES,
+                              default=PENDING)
+    result = JSONField(default=None, null=True)
+    error = models.TextField(null=True, blank=True)
+    # HTTP status the synchronous request would have answered with.
+    error_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return "%s %s %s" % (self.action, self.name, self.status)
+
+    class Meta:
+        index_together = (
+            ('user', 'created',),
+        )
+        unique_together = ('user', 'idempotency_key',)
+
+
+class WorkflowJobStep(models.Model):
+    """
+    Celery task of a WorkflowJob, in the order the chain runs them.
+    """
+    job = models.ForeignKey(WorkflowJob,
+                            related_name='steps',
+                            on_delete=models.CASCADE)
+    position = models.PositiveSmallIntegerField()
+    task_id = models.CharField(max_length=255, unique=True)
+    task = models.CharField(max_length=255)
+    # Serialised celery signature, to run the step again on resume.
+    signature = JSONField(default=None, null=True)
+    status = models.CharField(max_length=20,
+                              choices=WorkflowJob.STATUS_CHOICES,
+                              default=WorkflowJob.PENDING)
+    # What the step returned, passed on to the next step on resume.
+    output = JSONField(default=None, null=True)
+    error = models.TextField(null=True, blank=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return "%s %s" % (self.task, self.status)
+
+    class Meta:
+        ordering = ('position',)
+        unique_together = ('job', 'position',)
+
+
+class WorkflowJobItem(models.Model):
+    """
+    Domain handled by a bulk WorkflowJob, with its own outcome.
+    """
+    # Created at the registry but not connected in our database yet. The
+    # result holds what connecting it needs.
+    CREATED = 'created'
+    STATUS_CHOICES = WorkflowJob.STATUS_CHOICES + (
+        (CREATED, 'Created, not connected'),
+    )
+
+    job = models.ForeignKey(WorkflowJob,
+                            related_name='items',
+                            on_delete=models.CASCADE)
+    name = models.CharField(max_length=255)
+    status = models.CharField(max_length=20,
+                              choices=STATUS_CHOICES,
+                              default=WorkflowJob.PENDING)
+    result = JSONField(default=None, null=True)
+    error = models.TextField(null=True, blank=True)
+    # HTTP status a single request for this domain would have answered with.
+    error_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return "%s %s" % (self.name, self.status)
+
+    class Meta:
+        ordering = ('id',)
+        unique_together = ('job', 'name',)
+        index_together = (
+            ('job', 'status',),
+        )
@@ -0,0 +1,68 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class DomainPagination(PageNumberPagination):
+
+    """
+    Page through lists of domains.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+
+class OrderedCursorPagination(CursorPagination):
+
+    """
+    Keyset pagination over one of a fixed set of indexed orderings.
+
+    Clients choose an ordering by its first field with ?ordering=. Anything
+    else falls back to the first entry of orderings.
+    """
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+    ordering_query_param = 'ordering'
+    orderings = (
+        ('-created', '-id'),
+        ('created', 'id'),
+    )
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Return the ordering asked for, if it is one we have an index for.
+
+        :request: HTTP request
+        :queryset: queryset being paginated
+        :view: view being paginated
+        :returns: tuple of field names
+
+        """
+        requested = request.query_params.get(self.ordering_query_param)
+        for ordering in self.orderings:
+            if ordering[0] == requested:
+                return ordering
+        return self.orderings[0]
+
+
+class RegisteredDomainCursorPagination(OrderedCursorPagination):
+
+    orderings = OrderedCursorPagination.orderings + (
+        ('fqdn',),
+        ('-fqdn',),
+    )
+
+
+class ContactCursorPagination(OrderedCursorPagination):
+
+    orderings = OrderedCursorPagination.orderings + (
+        ('registry_id',),
+    )
+
+
+class NameserverCursorPagination(OrderedCursorPagination):
+
+    orderings = OrderedCursorPagination.orderings + (
+        ('idn_host',),
+    )
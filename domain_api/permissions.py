@@ -1,6 +1,8 @@
 from rest_framework import permissions
 import logging
 
+from .utilities.roles import is_admin
+
 log = logging.getLogger(__name__)
 
 
@@ -21,7 +23,7 @@ class IsAdmin(permissions.BasePermission):
 
         """
         log.debug("Checking if %s has admin permissions" % request.user)
-        if request.user.groups.filter(name='admin').exists():
+        if is_admin(request.user):
             return True
         return False
 
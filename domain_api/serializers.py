@@ -16,6 +16,9 @@ from domain_api.models import (
     DefaultAccountTemplate,
     DefaultAccountContact,
     Nameserver,
+    WorkflowJob,
+    WorkflowJobItem,
+    WorkflowJobStep,
 )
 from . import schemas
 import jsonschema
@@ -327,7 +330,12 @@ class PrivateInfoDomainSerializer(serializers.ModelSerializer):
         return obj.registrant.registry_id
 
     def get_contacts(self, obj):
-        active_contacts = obj.contacts.filter(active=True)
+        # Prefetched by views.with_domain_relations
+        active_contacts = getattr(obj, 'active_contacts', None)
+        if active_contacts is None:
+            active_contacts = obj.contacts.filter(
+                active=True
+            ).select_related('contact', 'contact_type')
         return [{i.contact_type.name: i.contact.registry_id}
                 for i in active_contacts]
 
@@ -432,3 +440,35 @@ class AdminInfoRegistrantSerializer(PrivateInfoRegistrantSerializer):
                   'state', 'country', 'postcode',
                   'postal_info_type', 'non_disclose',
                   'status', 'authcode', 'roid', 'user', 'provider')
+
+
+class WorkflowJobStepSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = WorkflowJobStep
+        fields = ('position', 'task', 'status', 'error', 'started',
+                  'finished')
+
+
+class WorkflowJobItemSerializer(serializers.ModelSerializer):
+    result = serializers.JSONField(read_only=True)
+
+    class Meta:
+        model = WorkflowJobItem
+        fields = ('name', 'status', 'result', 'error', 'error_status',
+                  'updated')
+
+
+class WorkflowJobSerializer(serializers.ModelSerializer):
+    url = serializers.HyperlinkedIdentityField(
+        view_name="domain_api:job-detail",
+        lookup_field="pk"
+    )
+    result = serializers.JSONField(read_only=True)
+    steps = WorkflowJobStepSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = WorkflowJob
+        fields = ('url', 'id', 'action', 'name', 'idempotency_key', 'status',
+                  'steps', 'result', 'error', 'error_status', 'created',
+                  'updated')
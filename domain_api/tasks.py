@@ -1,7 +1,9 @@
 from __future__ import absolute_import, unicode_literals
-import idna
-from celery import shared_task
+from concurrent.futures import ThreadPoolExecutor
+from celery import shared_task, signature
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 import logging
 from .models import (
     Contact,
@@ -19,7 +21,20 @@ from .entity_management.domains import DomainManager
 from .epp.actions.domain import Domain as DomainAction
 from .epp.actions.host import Host as HostAction
 from .epp.queries import Domain as DomainQuery, HostQuery
+from .utilities import idn
+from .utilities.availability import (
+    check_availability,
+    invalidate_availability,
+)
 from .utilities.domain import parse_domain, get_domain_registry
+from .utilities.bulk import create_domains, update_domains
+from .utilities.info import (
+    INFO_MODELS,
+    expire_info,
+    refresh_lock_key,
+    synchronise_info,
+)
+from .utilities.jobs import get_job_step
 from .exceptions import (
     DomainNotAvailable,
 )
@@ -40,12 +55,10 @@ def check_bulk_domain(domains):
     """
     log.info("Executing bulk check domain")
     get_logzio_sender().append(domains)
-    query = DomainQuery()
-    availability = query.check_domain(*domains)
-    return availability["result"]
+    return check_availability(domains)
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def check_domain(domain):
     """
     Check if a domain exists.
@@ -96,7 +109,7 @@ def _create_registrant(person_id=None,
     return contact
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def create_registrant(epp,
                       person_id=None,
                       registry=None,
@@ -107,7 +120,7 @@ def create_registrant(epp,
     return epp
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def update_domain_registrant(epp,
                              person_id=None,
                              registry=None,
@@ -157,6 +170,23 @@ def _create_registry_contact(person_id=None,
 
 
 @shared_task
+def workflow_result(result):
+    """
+    Hand the result of a workflow to the caller waiting on it.
+
+    Workflow steps are declared with ignore_result, so they never publish
+    their results; a per call ignore_result is not honoured by celery 4.0.
+    A chain that is waited on ends with this task, the only one of the
+    chain to publish its result.
+
+    :result: result of the last step
+    :returns: the result unchanged
+
+    """
+    return result
+
+
+@shared_task(ignore_result=True)
 def init_update_domain(epp):
     """
     Init an update_domain workflow
@@ -171,7 +201,7 @@ def init_update_domain(epp):
     return epp
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def update_domain_registry_contact(epp,
                                    person_id=None,
                                    registry=None,
@@ -201,7 +231,7 @@ def update_domain_registry_contact(epp,
     return epp
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def create_registry_contact(epp,
                             person_id=None,
                             registry=None,
@@ -219,7 +249,68 @@ def create_registry_contact(epp,
     return epp
 
 
-@shared_task
+def _run_prerequisite(prerequisite):
+    """
+    Run a create domain prerequisite in the current thread.
+
+    :prerequisite: celery signature
+    :returns: result of the task
+
+    """
+    try:
+        return prerequisite.apply(throw=True).get()
+    finally:
+        # Django opens a connection per thread; do not leave it behind.
+        connection.close()
+
+
+def _merge_create_domain_epp(epp, results):
+    """
+    Merge the results of the create domain prerequisites into the create
+    command.
+
+    :epp: dict create domain command
+    :results: list of prerequisite results; dict fragments with a
+              registrant or contacts, anything else is ignored
+    :returns: dict create domain command
+
+    """
+    for result in results:
+        if not isinstance(result, dict):
+            continue
+        if "registrant" in result:
+            epp["registrant"] = result["registrant"]
+        if "contact" in result:
+            contacts = epp.get("contact", [])
+            contacts.extend(result["contact"])
+            epp["contact"] = contacts
+    return epp
+
+
+@shared_task(bind=True, ignore_result=True)
+def create_domain_prerequisites(self, epp, prerequisites):
+    """
+    Check a domain and create its registrant and contacts side by side.
+
+    The prerequisites do not depend on each other, so they run in a thread
+    pool in the worker rather than one after another. If any of them fails
+    the first failure, in workflow order, is raised once all have finished.
+
+    :epp: dict create domain command with anything already known
+    :prerequisites: list of celery signatures
+    :returns: dict create domain command
+
+    """
+    # Bind to this app here; pool threads have no current app of their own.
+    prerequisites = [signature(i, app=self.app) for i in prerequisites]
+    with ThreadPoolExecutor(max_workers=len(prerequisites)) as executor:
+        futures = [executor.submit(_run_prerequisite, i)
+                   for i in prerequisites]
+    results = [future.result() for future in futures]
+    return _merge_create_domain_epp(epp, results)
+
+
+@shared_task(ignore_result=True)
 def create_domain(epp, registry):
     """
     Create a domain at a given registry
@@ -231,11 +322,12 @@ def create_domain(epp, registry):
     """
     domain = DomainAction()
     result = domain.create(registry, epp)
+    invalidate_availability(epp["name"])
     result.update(epp)
     return result
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def update_domain(epp=None, registry=None):
     """
     Update a domain at a registry
@@ -249,6 +341,11 @@ def update_domain(epp=None, registry=None):
     if epp:
         domain = DomainAction()
         action = domain.update(registry, epp)
+        invalidate_availability(epp["name"])
+        expire_info(RegisteredDomain.objects.filter(
+            fqdn=idn.encode(epp["name"]),
+            active=True
+        ))
         update_data = {"message": "Sending update domain"}
         update_data.update(epp)
         get_logzio_sender().append(update_data)
@@ -258,7 +355,7 @@ def update_domain(epp=None, registry=None):
     return {}
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def local_update_domain(update_data, user=None):
     """
     Modify connected domain data to reflect successful update.
@@ -280,7 +377,7 @@ def local_update_domain(update_data, user=None):
     return update_data
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def connect_domain(create_data, registry, user=None):
     """
     Connect the newly created domain in our database.
@@ -327,7 +424,7 @@ def connect_domain(create_data, registry, user=None):
         raise e
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def check_host(host):
     """
     Check if a host exists.
@@ -337,9 +434,7 @@ def check_host(host):
 
     """
     query = HostQuery()
-    availability = query.check_host(
-        idna.encode(host, uts46=True).decode('ascii')
-    )
+    availability = query.check_host(idn.encode(host))
     available = availability["result"][0]["available"]
     log.info("host=%s available=%s" % (host, available))
     if str(available) == "1" or str(available) == "true" or available is True:
@@ -347,14 +442,14 @@ def check_host(host):
     raise DomainNotAvailable("%s not available" % host)
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def create_host(epp):
     action = HostAction()
     result = action.create(epp)
     return result
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def connect_host(host_data, user=None):
     user_obj = User.objects.get(pk=user)
     host = host_data["idn_host"]
@@ -371,3 +466,57 @@ def connect_host(host_data, user=None):
         user=user_obj
     )
     return host_data
+
+
+@shared_task(ignore_result=True)
+def refresh_info(kind, pk):
+    """
+    Refresh the local copy of a registry object in the background.
+
+    :kind: str key of utilities.info.INFO_MODELS
+    :pk: int primary key of the object
+
+    """
+    try:
+        instance = INFO_MODELS[kind].objects.filter(pk=pk).first()
+        if instance is not None:
+            synchronise_info(instance)
+            log.debug("Refreshed %s %s" % (kind, pk))
+    finally:
+        cache.delete(refresh_lock_key(kind, pk))
+
+
+def _bulk_job(task):
+    """
+    Return the WorkflowJob a bulk task runs for.
+
+    :task: bound celery task
+    :returns: WorkflowJob object
+
+    """
+    step = get_job_step(task.request.id)
+    if step is None:
+        raise ValueError("%s must run as part of a job" % task.name)
+    return step.job
+
+
+@shared_task(bind=True, ignore_result=True)
+def bulk_create_domains(self):
+    """
+    Register the unfinished domains of a bulk job.
+
+    :returns: dict of domain counts by status
+
+    """
+    return create_domains(_bulk_job(self))
+
+
+@shared_task(bind=True, ignore_result=True)
+def bulk_update_domains(self):
+    """
+    Update the unfinished domains of a bulk job.
+
+    :returns: dict of domain counts by status
+
+    """
+    return update_domains(_bulk_job(self))
@@ -0,0 +1,126 @@
+from unittest.mock import MagicMock, patch
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from domain_api.utilities.availability import (
+    check_availability,
+    get_availability_query,
+    get_availability_stats,
+    invalidate_availability,
+    normalise_fqdn,
+    reset_availability_stats,
+)
+
+
+def check_response(*results):
+    return {
+        "result": [
+            {"domain": fqdn, "available": available}
+            for fqdn, available in results
+        ]
+    }
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    },
+    AVAILABILITY_CACHE_AVAILABLE_TTL=60,
+    AVAILABILITY_CACHE_TAKEN_TTL=3600
+)
+class TestAvailabilityCache(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.query = MagicMock()
+
+    def test_normalise_fqdn(self):
+        self.assertEqual(normalise_fqdn("TEST.xyz."), "test.xyz")
+        self.assertEqual(normalise_fqdn("tëst.xyz"), "xn--tst-jma.xyz")
+
+    def test_read_through(self):
+        """
+        A second check is answered from the cache.
+        """
+        self.query.check_domain.return_value = check_response(
+            ("test.xyz", True)
+        )
+        first = check_availability(["test.xyz"], self.query)
+        second = check_availability(["Test.XYZ"], self.query)
+        self.assertEqual(first, second, "Same result from cache")
+        self.query.check_domain.assert_called_once_with("test.xyz")
+        stats = get_availability_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1),
+                         "Hit and miss counted")
+
+    def test_only_misses_sent(self):
+        """
+        Only names that are not cached go to the registry, and results come
+        back in the order requested.
+        """
+        self.query.check_domain.return_value = check_response(
+            ("cached.xyz", False)
+        )
+        check_availability(["cached.xyz"], self.query)
+        self.query.check_domain.return_value = check_response(
+            ("new.xyz", True)
+        )
+        results = check_availability(["new.xyz", "cached.xyz"], self.query)
+        self.query.check_domain.assert_called_with("new.xyz")
+        self.assertEqual([i["domain"] for i in results],
+                         ["new.xyz", "cached.xyz"], "Request order kept")
+
+    @override_settings(AVAILABILITY_CACHE_AVAILABLE_TTL=0)
+    def test_ttl_per_result(self):
+        """
+        Available and taken results have their own lifetime.
+        """
+        self.query.check_domain.return_value = check_response(
+            ("free.xyz", True),
+            ("taken.xyz", False)
+        )
+        check_availability(["free.xyz", "taken.xyz"], self.query)
+        self.query.check_domain.return_value = check_response(
+            ("free.xyz", True)
+        )
+        check_availability(["free.xyz", "taken.xyz"], self.query)
+        self.query.check_domain.assert_called_with("free.xyz")
+
+    def test_invalidate(self):
+        self.query.check_domain.return_value = check_response(
+            ("test.xyz", True)
+        )
+        check_availability(["test.xyz"], self.query)
+        invalidate_availability("test.xyz")
+        check_availability(["test.xyz"], self.query)
+        self.assertEqual(self.query.check_domain.call_count, 2,
+                         "Checked again after invalidation")
+
+    def test_reset_stats(self):
+        self.query.check_domain.return_value = check_response(
+            ("test.xyz", True)
+        )
+        check_availability(["test.xyz"], self.query)
+        reset_availability_stats()
+        self.assertEqual(get_availability_stats()["misses"], 0,
+                         "Counters reset")
+
+
+class TestAvailabilityQuery(SimpleTestCase):
+
+    @override_settings(AVAILABILITY_BATCH_WINDOW=5)
+    @patch('domain_api.utilities.check_batcher.get_check_batcher')
+    def test_only_single_names_batched(self, mock_batcher):
+        self.assertIs(get_availability_query(["one.xyz"]),
+                      mock_batcher.return_value,
+                      "Single name goes through the batcher")
+        self.assertIsNot(get_availability_query(["one.xyz", "two.xyz"]),
+                         mock_batcher.return_value,
+                         "A batch is sent as it is")
+
+    @override_settings(AVAILABILITY_BATCH_WINDOW=0)
+    @patch('domain_api.utilities.check_batcher.get_check_batcher')
+    def test_batcher_off(self, mock_batcher):
+        get_availability_query(["one.xyz"])
+        mock_batcher.assert_not_called()
@@ -0,0 +1,85 @@
+import json
+from unittest.mock import patch, MagicMock
+from django.test import override_settings
+from .test_setup import TestSetup
+from ..views import DomainAvailabilityViewSet
+
+
+class MockResult(object):
+
+    def __init__(self, result=None, ready_after=0, failed=False):
+        self.result = result
+        self.ready_after = ready_after
+        self.failed = failed
+
+    def ready(self):
+        if self.ready_after is None:
+            return False
+        self.ready_after -= 1
+        return self.ready_after < 0
+
+    def successful(self):
+        return not self.failed
+
+
+def check(registry, fqdn_list, result):
+    task = MagicMock()
+    task.apply_async.return_value = result
+    return (registry, fqdn_list, task)
+
+
+@override_settings(BULK_AVAILABILITY_DEADLINE=0.2,
+                   BULK_AVAILABILITY_POLL_INTERVAL=0.01)
+class TestStreamingBulkAvailability(TestSetup):
+
+    def setUp(self):
+        super().setUp()
+        self.checks = [
+            check("slow-registry", ["whatever.slow"],
+                  MockResult([{"domain": "whatever.slow", "available": True}],
+                             ready_after=3)),
+            check("fast-registry", ["whatever.fast"],
+                  MockResult([{"domain": "whatever.fast",
+                               "available": False}])),
+            check("hung-registry", ["whatever.hung"],
+                  MockResult(ready_after=None)),
+            check("broken-registry", ["whatever.broken"],
+                  MockResult(Exception("FAIL"), failed=True)),
+        ]
+
+    def stream(self, url, **kwargs):
+        with patch.object(DomainAvailabilityViewSet, 'bulk_check_tasks',
+                          return_value=self.checks):
+            response = self.client.get(url, **kwargs)
+            content = b"".join(response.streaming_content).decode("utf-8")
+        return response, content
+
+    def test_ndjson(self):
+        """
+        Registry results are written in the order they complete and hung
+        registries are reported once the deadline passes.
+        """
+        response, content = self.stream('/v1/available/whatever/?stream=ndjson')
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = [json.loads(i) for i in content.splitlines()]
+        self.assertEqual(
+            [(i["registry"], i["status"]) for i in lines],
+            [("fast-registry", "ok"),
+             ("broken-registry", "error"),
+             ("slow-registry", "ok"),
+             ("hung-registry", "timeout")],
+            "Results streamed as they arrive"
+        )
+        self.assertEqual(lines[0]["result"][0]["domain"], "whatever.fast")
+        self.assertEqual(lines[3]["domains"], ["whatever.hung"])
+
+    def test_server_sent_events(self):
+        response, content = self.stream('/v1/available/whatever/',
+                                        HTTP_ACCEPT="text/event-stream")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = [i.split("\n")[0] for i in content.strip().split("\n\n")]
+        self.assertEqual(events, ["event: ok",
+                                  "event: error",
+                                  "event: ok",
+                                  "event: timeout",
+                                  "event: end"])
@@ -0,0 +1,185 @@
+from unittest.mock import patch
+import json
+from django.test import SimpleTestCase, override_settings
+from .test_setup import TestSetup
+from ..exceptions import EppError
+from ..models import WorkflowJob, WorkflowJobItem
+from ..utilities.bulk import (
+    bulk_domain_names,
+    create_domains,
+    run_concurrently,
+)
+
+
+class TestBulkHelpers(SimpleTestCase):
+
+    def test_bulk_domain_names(self):
+        self.assertEqual(
+            bulk_domain_names({"domains": ["a.xyz", " b.xyz", "a.xyz"]}),
+            ["a.xyz", "b.xyz"],
+            "Duplicates dropped, request order kept"
+        )
+        self.assertEqual(
+            bulk_domain_names({"domains": ["A.xyz", "a.xyz.", "ü.xyz"]}),
+            ["a.xyz", "xn--tda.xyz"],
+            "Names normalised before duplicates are dropped"
+        )
+        for data in ({"domains": []},
+                     {"domains": "a.xyz"},
+                     {"domains": ["a.xyz", 1]}):
+            with self.assertRaises(ValueError):
+                bulk_domain_names(data)
+        with self.assertRaises(KeyError):
+            bulk_domain_names({})
+
+    @override_settings(BULK_MAX_DOMAINS=2)
+    def test_bulk_domain_limit(self):
+        with self.assertRaises(ValueError):
+            bulk_domain_names({"domains": ["a.xyz", "b.xyz", "c.xyz"]})
+
+    def test_run_concurrently_keeps_order(self):
+        with patch('domain_api.utilities.bulk.connection'):
+            results = run_concurrently(lambda a, b: a * b,
+                                       [(i, 2) for i in range(10)],
+                                       4)
+        self.assertEqual(results, [i * 2 for i in range(10)])
+
+
+class TestBulkCreate(TestSetup):
+
+    def setUp(self):
+        super().setUp()
+        self.domains = ["bulk-free.xyz", "bulk-taken.xyz", "bulk-error.xyz"]
+
+    def availability(self, registry, fqdns):
+        return {fqdn: fqdn != "bulk-taken.xyz" for fqdn in fqdns}
+
+    def create_domain(self, epp, registry):
+        if epp["name"] == "bulk-error.xyz":
+            raise EppError("Registry error")
+        return dict(epp, create_date="2017-01-01T12:00:01")
+
+    @patch('domain_api.utilities.jobs.chain')
+    def test_bulk_create_returns_job(self, mock_chain):
+        jwt_header = self.api_login()
+        response = self.client.post(
+            '/v1/domains/bulk/',
+            data=json.dumps({"domains": self.domains, "period": 2}),
+            content_type='application/json',
+            HTTP_AUTHORIZATION=jwt_header
+        )
+        self.assertEqual(response.status_code, 202)
+        job = WorkflowJob.objects.get(pk=response.data["id"])
+        self.assertEqual(job.action, "bulk_create_domain")
+        self.assertEqual(list(job.items.values_list('name', flat=True)),
+                         self.domains)
+        self.assertEqual(job.parameters, {"period": 2})
+        workflow = mock_chain.call_args[0][0]
+        self.assertEqual(workflow[0].task,
+                         "domain_api.tasks.bulk_create_domains")
+
+    def test_bulk_create_unsupported_tld(self):
+        jwt_header = self.api_login()
+        response = self.client.post(
+            '/v1/domains/bulk/',
+            data=json.dumps({"domains": ["bulk.notatld"]}),
+            content_type='application/json',
+            HTTP_AUTHORIZATION=jwt_header
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WorkflowJob.objects.exists())
+
+    @override_settings(BULK_CREATE_CONCURRENCY=1)
+    @patch('domain_api.tasks.connect_domain', side_effect=lambda r, s: r)
+    @patch('domain_api.utilities.bulk.shared_create_epp',
+           return_value={"registrant": "registrant-123"})
+    def test_create_domains(self, mock_shared, mock_connect):
+        job = WorkflowJob.objects.create(user=self.test_customer_user,
+                                         action="bulk_create_domain",
+                                         name="3 domains",
+                                         parameters={})
+        for domain in self.domains:
+            job.items.create(name=domain)
+        with patch('domain_api.utilities.bulk.check_registry_availability',
+                   side_effect=self.availability) as mock_check, \
+                patch('domain_api.tasks.create_domain',
+                      side_effect=self.create_domain):
+            counts = create_domains(job)
+        mock_check.assert_called_once_with("centralnic-test", self.domains)
+        self.assertEqual(mock_shared.call_count, 1,
+                         "Registrant and contacts resolved once")
+        self.assertEqual(counts[WorkflowJob.SUCCEEDED], 1)
+        self.assertEqual(counts[WorkflowJob.FAILED], 2)
+        items = {i.name: i for i in job.items.all()}
+        self.assertEqual(items["bulk-free.xyz"].status, WorkflowJob.SUCCEEDED)
+        self.assertEqual(items["bulk-free.xyz"].result["registrant"],
+                         "registrant-123")
+        self.assertEqual(items["bulk-taken.xyz"].error,
+                         "Domain not available")
+        self.assertEqual(items["bulk-error.xyz"].error_status, 400)
+
+    @override_settings(BULK_CREATE_CONCURRENCY=1)
+    @patch('domain_api.utilities.bulk.shared_create_epp',
+           return_value={"registrant": "registrant-123"})
+    def test_connect_failure_resumed(self, mock_shared):
+        """
+        A domain created at the registry but not connected is only connected
+        when the job is resumed.
+        """
+        job = WorkflowJob.objects.create(user=self.test_customer_user,
+                                         action="bulk_create_domain",
+                                         name="1 domains",
+                                         parameters={})
+        job.items.create(name="bulk-free.xyz")
+        with patch('domain_api.utilities.bulk.check_registry_availability',
+                   side_effect=self.availability), \
+                patch('domain_api.tasks.create_domain',
+                      side_effect=self.create_domain), \
+                patch('domain_api.tasks.connect_domain',
+                      side_effect=Exception("Database went away")):
+            create_domains(job)
+        item = job.items.get()
+        self.assertEqual(item.status, WorkflowJobItem.CREATED)
+        self.assertEqual(item.result["name"], "bulk-free.xyz")
+        self.assertEqual(item.error, "Database went away")
+        with patch('domain_api.utilities.bulk.check_registry_availability') \
+                as mock_check, \
+                patch('domain_api.tasks.create_domain') as mock_create, \
+                patch('domain_api.tasks.connect_domain',
+                      side_effect=lambda r, s: r) as mock_connect:
+            counts = create_domains(job)
+        mock_check.assert_not_called()
+        mock_create.assert_not_called()
+        self.assertEqual(mock_connect.call_args[0][0]["name"],
+                         "bulk-free.xyz", "Connect gets the create result")
+        self.assertEqual(counts[WorkflowJob.SUCCEEDED], 1)
+        item = job.items.get()
+        self.assertEqual(item.status, WorkflowJob.SUCCEEDED)
+        self.assertIsNone(item.error)
+
+    @override_settings(BULK_CREATE_CONCURRENCY=1)
+    @patch('domain_api.utilities.bulk.check_registry_availability')
+    def test_create_domains_skips_finished(self, mock_check):
+        job = WorkflowJob.objects.create(user=self.test_customer_user,
+                                         action="bulk_create_domain",
+                                         name="1 domains",
+                                         parameters={})
+        job.items.create(name="bulk-free.xyz", status=WorkflowJob.SUCCEEDED)
+        create_domains(job)
+        mock_check.assert_not_called()
+
+    def test_job_items(self):
+        job = WorkflowJob.objects.create(user=self.test_customer_user,
+                                         action="bulk_create_domain",
+                                         name="3 domains")
+        for domain in self.domains:
+            job.items.create(name=domain)
+        job.items.filter(name="bulk-taken.xyz").update(
+            status=WorkflowJob.FAILED
+        )
+        jwt_header = self.api_login()
+        response = self.client.get('/v1/jobs/%s/items/?status=failed' % job.pk,
+                                   HTTP_AUTHORIZATION=jwt_header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([i["name"] for i in response.data["results"]],
+                         ["bulk-taken.xyz"])
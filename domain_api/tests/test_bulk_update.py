@@ -0,0 +1,168 @@
+from unittest.mock import patch
+import json
+from datetime import timedelta
+from django.test import override_settings
+from django.utils import timezone
+from .test_setup import TestSetup
+from ..models import RegisteredDomain, WorkflowJob, WorkflowJobItem
+from ..utilities.bulk import update_domains
+
+
+class TestBulkUpdate(TestSetup):
+
+    def setUp(self):
+        super().setUp()
+        self.jwt_header = self.api_login()
+
+    def patch(self, data, query=""):
+        return self.client.patch('/v1/domains/bulk/' + query,
+                                 data=json.dumps(data),
+                                 content_type='application/json',
+                                 HTTP_AUTHORIZATION=self.jwt_header)
+
+    @patch('domain_api.utilities.jobs.chain')
+    def test_bulk_update_listed_domains(self, mock_chain):
+        response = self.patch({"domains": ["test-something.bar"],
+                               "nameservers": ["ns1.test-08.com"]})
+        self.assertEqual(response.status_code, 202)
+        job = WorkflowJob.objects.get(pk=response.data["id"])
+        self.assertEqual(job.action, "bulk_update_domain")
+        self.assertEqual(job.parameters, {"nameservers": ["ns1.test-08.com"]})
+        self.assertEqual(list(job.items.values_list('name', flat=True)),
+                         ["test-something.bar"])
+        workflow = mock_chain.call_args[0][0]
+        self.assertEqual(workflow[0].task,
+                         "domain_api.tasks.bulk_update_domains")
+
+    @patch('domain_api.utilities.jobs.chain')
+    def test_bulk_update_filtered_domains(self, mock_chain):
+        response = self.patch({"nameservers": ["ns1.test-08.com"]},
+                              "?registrant=registrant-123")
+        self.assertEqual(response.status_code, 202)
+        job = WorkflowJob.objects.get(pk=response.data["id"])
+        expected = RegisteredDomain.objects.filter(
+            registrant__registry_id="registrant-123",
+            active=True
+        ).order_by('fqdn').values_list('fqdn', flat=True)
+        self.assertEqual(list(job.items.values_list('name', flat=True)),
+                         list(expected))
+
+    @override_settings(BULK_MAX_DOMAINS=1)
+    @patch('domain_api.utilities.jobs.chain')
+    def test_bulk_update_filter_not_capped(self, mock_chain):
+        """
+        BULK_MAX_DOMAINS limits listed domains, not filtered ones.
+        """
+        response = self.patch({"nameservers": ["ns1.test-08.com"]},
+                              "?registrant=registrant-123")
+        self.assertEqual(response.status_code, 202)
+        job = WorkflowJob.objects.get(pk=response.data["id"])
+        self.assertGreater(job.items.count(), 1)
+
+    @patch('domain_api.utilities.jobs.chain')
+    def test_bulk_update_listed_names_normalised(self, mock_chain):
+        response = self.patch({"domains": ["Test-Something.BAR."],
+                               "nameservers": ["ns1.test-08.com"]})
+        self.assertEqual(response.status_code, 202)
+        job = WorkflowJob.objects.get(pk=response.data["id"])
+        self.assertEqual(list(job.items.values_list('name', flat=True)),
+                         ["test-something.bar"])
+
+    def test_bulk_update_rejected(self):
+        for data, query in (
+            ({"nameservers": ["ns1.test-08.com"]}, ""),
+            ({"domains": ["test-something.bar"]}, ""),
+            ({"domains": ["not-mine.bar"],
+              "nameservers": ["ns1.test-08.com"]}, ""),
+            ({"nameservers": ["ns1.test-08.com"]}, "?registrant=nobody"),
+        ):
+            response = self.patch(data, query)
+            self.assertEqual(response.status_code, 400, (data, query))
+        self.assertFalse(WorkflowJob.objects.exists())
+
+    @override_settings(BULK_UPDATE_CONCURRENCY=1)
+    @patch('domain_api.utilities.bulk.run_inline',
+           return_value={"name": "test-something.bar"})
+    def test_update_domains(self, mock_run):
+        job = WorkflowJob.objects.create(
+            user=self.test_customer_user,
+            action="bulk_update_domain",
+            name="1 domains",
+            parameters={"nameservers": ["ns1.newnameserver.com"]}
+        )
+        job.items.create(name="test-something.bar")
+        counts = update_domains(job)
+        self.assertEqual(counts[WorkflowJob.SUCCEEDED], 1)
+        workflow = mock_run.call_args[0][0]
+        self.assertEqual(workflow[0].task,
+                         "domain_api.tasks.init_update_domain")
+        self.assertEqual(workflow[0].args[0]["add"]["ns"],
+                         ["ns1.newnameserver.com"],
+                         "Delta worked out against the current nameservers")
+
+
+class TestResumeJob(TestSetup):
+
+    def setUp(self):
+        super().setUp()
+        self.job = WorkflowJob.objects.create(user=self.test_customer_user,
+                                              action="bulk_update_domain",
+                                              name="2 domains",
+                                              status=WorkflowJob.FAILED,
+                                              parameters={})
+        self.job.steps.create(position=0,
+                              task_id="task-0",
+                              task="domain_api.tasks.bulk_update_domains",
+                              status=WorkflowJob.FAILED)
+        self.job.items.create(name="test-something.bar",
+                              status=WorkflowJob.SUCCEEDED)
+        self.job.items.create(name="test-something-3.xyz",
+                              status=WorkflowJob.FAILED)
+        self.jwt_header = self.api_login()
+
+    def resume(self, data):
+        return self.client.post('/v1/jobs/%s/resume/' % self.job.pk,
+                                data=json.dumps(data),
+                                content_type='application/json',
+                                HTTP_AUTHORIZATION=self.jwt_header)
+
+    @patch('domain_api.utilities.jobs.chain')
+    def test_resume(self, mock_chain):
+        response = self.resume({"retry_failed": True})
+        self.assertEqual(response.status_code, 202)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, WorkflowJob.PENDING)
+        step = self.job.steps.get(position=1)
+        self.assertEqual(step.task, "domain_api.tasks.bulk_update_domains")
+        self.assertEqual(
+            sorted(self.job.items.values_list('status', flat=True)),
+            [WorkflowJob.PENDING, WorkflowJob.SUCCEEDED],
+            "Failed domain retried, finished one left alone"
+        )
+        workflow = mock_chain.call_args[0][0]
+        self.assertEqual(workflow[0].options["task_id"], step.task_id)
+
+    @patch('domain_api.utilities.jobs.chain')
+    def test_running_job_not_resumed(self, mock_chain):
+        WorkflowJob.objects.filter(pk=self.job.pk).update(
+            status=WorkflowJob.RUNNING
+        )
+        response = self.resume({})
+        self.assertEqual(response.status_code, 409)
+        mock_chain.assert_not_called()
+
+    @patch('domain_api.utilities.jobs.chain')
+    def test_stalled_job_resumed(self, mock_chain):
+        WorkflowJob.objects.filter(pk=self.job.pk).update(
+            status=WorkflowJob.RUNNING
+        )
+        WorkflowJobItem.objects.filter(job=self.job).update(
+            updated=timezone.now() - timedelta(hours=1)
+        )
+        response = self.resume({})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(
+            self.job.items.get(name="test-something-3.xyz").status,
+            WorkflowJob.FAILED,
+            "Failed domains are only retried when asked to"
+        )
@@ -1,13 +1,15 @@
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
+from django.test import SimpleTestCase
 from .test_setup import TestSetup
 from ..tasks import (
     check_domain,
+    create_domain_prerequisites,
     create_registrant,
     create_registry_contact,
     ContactManager,
     RegistrantManager
 )
-from ..exceptions import EppError
+from ..exceptions import DomainNotAvailable, EppError
 from ..models import (
     Contact,
     Registrant,
@@ -208,3 +210,65 @@ class TestCreateContact(TestSetup):
                                         'centralnic-test',
                                         'admin',
                                         self.test_customer_user.id)
+
+
+@patch('domain_api.tasks.get_domain_registry')
+class TestCreateDomainPrerequisites(SimpleTestCase):
+
+    """
+    Check, registrant and contacts run together before a domain is created.
+    """
+
+    def setUp(self):
+        self.prerequisites = [
+            check_domain.si("test-new-domain.xyz"),
+            create_registrant.si({},
+                                 person_id=1,
+                                 registry="centralnic-test",
+                                 user=2),
+            create_registry_contact.si({},
+                                       person_id=2,
+                                       registry="centralnic-test",
+                                       contact_type="admin",
+                                       user=2),
+            create_registry_contact.si({},
+                                       person_id=3,
+                                       registry="centralnic-test",
+                                       contact_type="tech",
+                                       user=2),
+        ]
+        self.epp = {
+            "name": "test-new-domain.xyz",
+            "contact": [{"billing": "contact-123"}]
+        }
+
+    def run_prerequisites(self, check_response):
+        def create_contact(person_id, registry, contact_type, user, force):
+            return {contact_type: "new-%s" % contact_type}
+        registrant = MagicMock(registry_id="new-registrant")
+        with patch('domain_api.tasks.DomainQuery') as query, \
+                patch('domain_api.tasks._create_registrant',
+                      return_value=registrant), \
+                patch('domain_api.tasks._create_registry_contact',
+                      side_effect=create_contact):
+            query.return_value.check_domain.return_value = check_response
+            return create_domain_prerequisites(self.epp, self.prerequisites)
+
+    def test_merges_results_into_epp(self, mock_registry):
+        """
+        Created registrant and contacts end up in the create command.
+        """
+        epp = self.run_prerequisites({"result": [{"available": True}]})
+        self.assertEqual(epp["registrant"], "new-registrant")
+        self.assertEqual(epp["contact"],
+                         [{"billing": "contact-123"},
+                          {"admin": "new-admin"},
+                          {"tech": "new-tech"}],
+                         "New contacts follow existing ones in order")
+
+    def test_domain_not_available(self, mock_registry):
+        """
+        An unavailable domain fails the whole step.
+        """
+        with self.assertRaises(DomainNotAvailable):
+            self.run_prerequisites({"result": [{"available": False}]})
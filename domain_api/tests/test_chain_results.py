@@ -0,0 +1,80 @@
+import threading
+import time
+from celery import Celery, states
+from celery.app.task import Context
+from celery.exceptions import TimeoutError as CeleryTimeoutError
+from django.test import SimpleTestCase
+from ..utilities.chain_results import wait_for_chain
+
+
+class TestWaitForChain(SimpleTestCase):
+
+    """
+    Wait on chains against a real rpc backend, over the in memory transport,
+    with the replies a worker would send.
+    """
+
+    def setUp(self):
+        self.app = Celery('test-chain-results',
+                          broker='memory://',
+                          backend='rpc://')
+        self.backend = self.app.backend
+        # Sending a task declares the reply queue; nothing is sent here.
+        with self.app.producer_or_acquire() as producer:
+            self.backend.on_task_call(producer, 'declare')
+
+    def chain(self, *task_ids):
+        node = None
+        for task_id in task_ids:
+            node = self.app.AsyncResult(task_id, parent=node)
+        return node
+
+    def request(self, task_id):
+        return Context(id=task_id,
+                       reply_to=self.backend.oid,
+                       correlation_id=task_id)
+
+    def reply(self, task_id, result):
+        self.backend.store_result(task_id, result, states.SUCCESS,
+                                  request=self.request(task_id))
+
+    def fail(self, task_id, message):
+        self.backend.mark_as_failure(task_id, ValueError(message),
+                                     request=self.request(task_id))
+
+    def test_result(self):
+        chained_workflow = self.chain('a-1', 'a-2', 'a-3')
+        self.reply('a-3', {"domain": "a.xyz"})
+        self.assertEqual(wait_for_chain(chained_workflow, 5),
+                         {"domain": "a.xyz"})
+
+    def test_failed_step_ends_wait(self):
+        """
+        The error of a middle step ends the wait when it comes in, not when
+        the wait times out.
+        """
+        chained_workflow = self.chain('b-1', 'b-2', 'b-3')
+        failure = threading.Timer(0.2, self.fail, ('b-2', "Registry error"))
+        failure.start()
+        started = time.monotonic()
+        try:
+            with self.assertRaisesRegex(Exception, "Registry error"):
+                wait_for_chain(chained_workflow, 30)
+        finally:
+            failure.join()
+        self.assertLess(time.monotonic() - started, 10)
+
+    def test_failed_step_set_aside(self):
+        """
+        An error consumed while waiting on something else still counts.
+        """
+        chained_workflow = self.chain('c-1', 'c-2')
+        self.fail('c-1', "Registry error")
+        self.reply('other', 1)
+        self.assertEqual(self.app.AsyncResult('other').get(timeout=5), 1)
+        with self.assertRaisesRegex(Exception, "Registry error"):
+            wait_for_chain(chained_workflow, 5)
+
+    def test_timeout(self):
+        with self.assertRaises(CeleryTimeoutError):
+            wait_for_chain(self.chain('d-1', 'd-2'), 0.5)
@@ -0,0 +1,91 @@
+import threading
+from unittest.mock import patch, MagicMock
+from django.test import SimpleTestCase
+from domain_api.utilities.check_batcher import CheckDomainBatcher
+from ..exceptions import EppError
+
+
+def registry_for(fqdn):
+    return MagicMock(slug=fqdn.split(".")[-1] + "-registry")
+
+
+def check_registry_domain(registry, *args):
+    return {
+        "result": [{"domain": i, "available": True} for i in args]
+    }
+
+
+@patch('domain_api.utilities.check_batcher.get_domain_registry',
+       new=registry_for)
+class TestCheckDomainBatcher(SimpleTestCase):
+
+    def setUp(self):
+        self.query = MagicMock()
+        self.query.check_registry_domain.side_effect = check_registry_domain
+        self.batcher = CheckDomainBatcher(window=50,
+                                          max_batch=20,
+                                          query_factory=lambda: self.query)
+
+    def check_concurrently(self, names):
+        results = {}
+
+        def check(name):
+            results[name] = self.batcher.check_domain(name)["result"][0]
+
+        threads = [threading.Thread(target=check, args=(name,))
+                   for name in names]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_checks_coalesced(self):
+        """
+        Checks for the same registry within the window share one command.
+        """
+        names = ["one.xyz", "two.xyz", "three.xyz", "one.ote"]
+        results = self.check_concurrently(names)
+        self.assertEqual({name: results[name]["domain"] for name in names},
+                         {name: name for name in names},
+                         "Each caller got its own result")
+        calls = sorted(
+            (i[0][0], sorted(i[0][1:]))
+            for i in self.query.check_registry_domain.call_args_list
+        )
+        self.assertEqual(
+            calls,
+            [("ote-registry", ["one.ote"]),
+             ("xyz-registry", ["one.xyz", "three.xyz", "two.xyz"])],
+            "One command per registry"
+        )
+
+    def test_duplicate_names_sent_once(self):
+        self.check_concurrently(["one.xyz", "one.xyz"])
+        self.query.check_registry_domain.assert_called_once_with(
+            "xyz-registry", "one.xyz"
+        )
+
+    def test_full_batch_sent_at_once(self):
+        self.batcher.window = 10000
+        self.batcher.max_batch = 2
+        result = self.batcher.check_domain("one.xyz", "two.xyz")
+        self.assertEqual(len(result["result"]), 2, "Sent without waiting")
+
+    def test_error_passed_to_every_caller(self):
+        self.query.check_registry_domain.side_effect = EppError("FAIL")
+        errors = []
+
+        def check(name):
+            try:
+                self.batcher.check_domain(name)
+            except EppError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=check, args=(name,))
+                   for name in ["one.xyz", "two.xyz"]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(errors), 2, "Both callers got the error")
@@ -63,3 +63,28 @@ class TestCreateDomainNonDefaultContacts(TestSetup):
                                          self.test_customer_user)
         self.assertEqual(2, len(mock2.mock_calls), "2 orders appended")
         mock1.assert_not_called()
+
+    def test_prerequisites_run_together(self):
+        """
+        Test that the check and new contacts make up a single first step.
+
+        """
+        epp_request = {
+            "domain": "test-new-domain.xyz",
+            "contacts": [{"admin": 2}, {"tech": 1}]
+        }
+        workflow_class = workflow_factory('centralnic-test')
+        workflow = workflow_class().create_domain(epp_request,
+                                                  self.test_customer_user)
+        self.assertEqual(["domain_api.tasks.create_domain_prerequisites",
+                          "domain_api.tasks.create_domain",
+                          "domain_api.tasks.connect_domain"],
+                         [i.task for i in workflow])
+        epp, prerequisites = workflow[0].args
+        self.assertEqual("domain_api.tasks.check_domain",
+                         prerequisites[0].task)
+        contacts = [i for i in prerequisites
+                    if i.task == "domain_api.tasks.create_registry_contact"]
+        self.assertEqual(2, len(contacts), "2 new contacts")
+        for prerequisite in prerequisites[1:]:
+            self.assertEqual(({},), prerequisite.args[:1])
@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from .test_setup import TestSetup
+from ..entity_management.domains import DomainManager
+from ..models import Contact, DomainAccess, RegisteredDomain, Registrant
+from ..views import get_registered_domain_queryset
+
+
+class TestDomainAccess(TestSetup):
+
+    def setUp(self):
+        super().setUp()
+        self.registered_domain = RegisteredDomain.objects.get(
+            fqdn="test-something.bar"
+        )
+        self.admin = User.objects.get(username="testadmin")
+        self.customer = User.objects.get(username="testcustomer")
+
+    def access(self):
+        return set(DomainAccess.objects.filter(
+            registered_domain=self.registered_domain
+        ).values_list('user__username', 'role'))
+
+    def test_customer_queryset(self):
+        self.assertEqual(
+            get_registered_domain_queryset(self.customer).count(),
+            3,
+            "Registrant sees all three domains"
+        )
+        # testadmin is only a contact on the first domain.
+        self.assertEqual(
+            [i.fqdn for i in get_registered_domain_queryset(self.admin)],
+            ["test-something.bar"],
+            "Contact sees one domain"
+        )
+
+    def test_contact_removed(self):
+        manager = DomainManager(self.registered_domain)
+        manager.update({"rem": {"contact": [{"tech": "contact-321"}]}})
+        self.assertEqual(self.access(), {("testcustomer", "registrant"),
+                                         ("testadmin", "admin")},
+                         "Tech access revoked")
+
+    def test_registrant_changed(self):
+        manager = DomainManager(self.registered_domain)
+        registrant = Registrant.objects.get(pk=2)
+        registrant.user = self.admin
+        registrant.save()
+        manager.update({"chg": {"registrant": registrant.registry_id}})
+        self.assertIn(("testadmin", "registrant"), self.access())
+        self.assertNotIn(("testcustomer", "registrant"), self.access())
+
+    def test_contact_handed_over(self):
+        for registry_id in ("contact-123", "contact-321"):
+            contact = Contact.objects.get(registry_id=registry_id)
+            contact.user = self.customer
+            contact.save()
+        self.assertEqual(self.access(), {("testcustomer", "registrant"),
+                                         ("testcustomer", "admin"),
+                                         ("testcustomer", "tech")})
@@ -0,0 +1,80 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from .test_setup import TestSetup
+from ..entity_management.domains import DomainManager
+from ..models import DomainNameserver, RegisteredDomain
+from ..utilities.domain import (
+    synchronise_domain,
+    synchronise_domain_nameservers,
+)
+
+
+class TestDomainNameservers(TestSetup):
+
+    def setUp(self):
+        super().setUp()
+        self.registered_domain = RegisteredDomain.objects.get(
+            fqdn="test-something.bar"
+        )
+
+    def hosts(self):
+        return set(DomainNameserver.objects.filter(
+            registered_domain=self.registered_domain
+        ).values_list('idn_host', flat=True))
+
+    def test_domains_using_host(self):
+        """
+        Domains delegated to a host are listed under the nameserver.
+        """
+        self.login_client()
+        response = self.client.get(
+            '/v1/nameservers/ns1.test-08.com/domains/'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 1, "One domain uses host")
+        self.assertEqual(response.data["results"][0]["domain"],
+                         "test-something.bar")
+
+    def test_filter_domains_by_nameserver(self):
+        self.login_client()
+        response = self.client.get('/v1/domains/?nameserver=ns1.test-09.com')
+        self.assertEqual([i["domain"] for i in response.data["results"]],
+                         ["test-something.bar"])
+        response = self.client.get('/v1/domains/?nameserver=ns9.other.com')
+        self.assertEqual(response.data["results"], [], "No domain uses host")
+
+    def test_synchronise_domain(self):
+        synchronise_domain({"nameservers": ["ns1.test-08.com",
+                                            "ns3.test-11.com"]},
+                           self.registered_domain.id)
+        self.assertEqual(self.hosts(), {"ns1.test-08.com", "ns3.test-11.com"},
+                         "Rows follow the registry")
+
+    def test_synchronise_locks_domain(self):
+        """
+        The domain row is locked before its nameserver rows are read, so
+        concurrent syncs do not insert the same host twice.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            synchronise_domain_nameservers(self.registered_domain.id,
+                                           ["ns3.test-11.com"])
+        statements = [i["sql"] for i in queries.captured_queries
+                      if "SAVEPOINT" not in i["sql"]]
+        self.assertIn("FOR UPDATE", statements[0], "Domain locked first")
+        self.assertEqual(self.hosts(), {"ns3.test-11.com"})
+        synchronise_domain_nameservers(self.registered_domain.id,
+                                       ["ns3.test-11.com"])
+        self.assertEqual(self.hosts(), {"ns3.test-11.com"},
+                         "A repeated sync changes nothing")
+
+    def test_update_domain_nameservers(self):
+        manager = DomainManager(self.registered_domain)
+        manager.update({
+            "add": {"ns": ["ns3.test-11.com"]},
+            "rem": {"ns": ["ns1.test-09.com", "ns2.test-10.com"]},
+        })
+        self.assertEqual(self.hosts(), {"ns1.test-08.com", "ns3.test-11.com"},
+                         "Rows follow the update")
+        self.registered_domain.refresh_from_db()
+        self.assertEqual(self.registered_domain.nameservers,
+                         ["ns1.test-08.com", "ns3.test-11.com"])
@@ -0,0 +1,66 @@
+from django.core.cache import cache
+from django.test import override_settings
+from .test_setup import TestSetup
+from ..exceptions import UnsupportedTld
+from ..models import RegisteredDomain
+from ..utilities.domain import get_domain_registry, get_domain_registries
+from ..utilities.zones import get_zone_trie
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+)
+class TestDomainRouting(TestSetup):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        get_zone_trie()
+
+    def test_registered_and_default_routes(self):
+        registries = get_domain_registries([
+            "test-something.bar",
+            "test-something-3.ote",
+            "new-domain.ote",
+            "example.co.nz",
+        ])
+        self.assertEqual(
+            {fqdn: provider.slug for fqdn, provider in registries.items()},
+            {"test-something.bar": "centralnic-test",
+             "test-something-3.ote": "cocca-test",
+             "new-domain.ote": "cocca-test",
+             "example.co.nz": "nzrs-test"},
+            "Domains routed to their providers"
+        )
+
+    def test_cold_and_warm_cache(self):
+        """
+        A batch costs at most two queries, after which it is served from
+        the cache.
+        """
+        fqdns = ["test-something.bar", "new-domain.bar", "new-domain.xyz"]
+        with self.assertNumQueries(2):
+            get_domain_registries(fqdns)
+        with self.assertNumQueries(0):
+            get_domain_registries(fqdns)
+            get_domain_registry("new-domain.bar")
+
+    def test_route_invalidated_on_save(self):
+        self.assertEqual(get_domain_registry("test-something.bar").slug,
+                         "centralnic-test")
+        registered_domain = RegisteredDomain.objects.get(
+            fqdn="test-something.bar"
+        )
+        registered_domain.active = None
+        registered_domain.save()
+        # Looked up again, now routed to the zone's default provider.
+        with self.assertNumQueries(2):
+            get_domain_registry("test-something.bar")
+
+    def test_unsupported_tld(self):
+        with self.assertRaises(UnsupportedTld):
+            get_domain_registry("example.org.nz")
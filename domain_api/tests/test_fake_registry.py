@@ -0,0 +1,141 @@
+import asyncio
+from django.test import SimpleTestCase, override_settings
+from domain_api.utilities import fake_registry
+from domain_api.utilities.async_rpc_client import get_async_rpc_client
+from domain_api.utilities.fake_registry import (
+    FakeAsyncRpcClient,
+    FakeRegistry,
+    FakeRegistryTransport,
+)
+from domain_api.utilities.rpc_client import EppRpcClient
+from ..exceptions import EppError, EppObjectDoesNotExist, EppTimeout
+
+
+@override_settings(EPP_RPC_TRANSPORT="fake")
+class TestFakeRegistry(SimpleTestCase):
+
+    def setUp(self):
+        fake_registry.reset_fake_registry()
+        self.client = EppRpcClient()
+
+    def tearDown(self):
+        fake_registry.reset_fake_registry()
+
+    def test_transport_selected(self):
+        self.assertIsInstance(self.client.transport, FakeRegistryTransport,
+                              "Fake transport used")
+
+    def test_create_and_check_domain(self):
+        """
+        A created domain is reported as taken and can be queried.
+        """
+        self.client.call("centralnic-test", "createDomain", {
+            "name": "test.xyz",
+            "registrant": "registrant-1",
+            "contact": [{"admin": "admin-1"}, {"tech": "tech-1"}],
+            "period": 1,
+        })
+        check = self.client.call("centralnic-test", "checkDomain",
+                                 {"domain": ["test.xyz", "other.xyz"]})
+        availability = {
+            i["domain:name"]["$t"]: i["domain:name"]["avail"]
+            for i in check["domain:chkData"]["domain:cd"]
+        }
+        self.assertEqual(availability, {"test.xyz": 0, "other.xyz": 1},
+                         "Created domain unavailable")
+        info = self.client.call("centralnic-test", "infoDomain",
+                                {"domain": "test.xyz"})
+        self.assertEqual(info["domain:infData"]["domain:registrant"],
+                         "registrant-1", "Registrant stored")
+
+    def test_object_does_not_exist(self):
+        with self.assertRaises(EppObjectDoesNotExist):
+            self.client.call("centralnic-test", "infoDomain",
+                             {"domain": "missing.xyz"})
+
+    def test_registries_separate(self):
+        """
+        Each routing key has its own objects.
+        """
+        self.client.call("centralnic-test", "createHost",
+                         {"name": "ns1.test.xyz"})
+        with self.assertRaises(EppObjectDoesNotExist):
+            self.client.call("rrpproxy-test", "infoHost",
+                             {"name": "ns1.test.xyz"})
+
+    def test_async_client(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            client = get_async_rpc_client(loop)
+            self.assertIsInstance(client, FakeAsyncRpcClient,
+                                  "Fake async client used")
+            result = loop.run_until_complete(client.call(
+                "centralnic-test", "checkHost", {"host": "ns1.test.xyz"}
+            ))
+        finally:
+            loop.close()
+            asyncio.set_event_loop(None)
+        self.assertEqual(
+            result["host:chkData"]["host:cd"]["host:name"]["avail"], 1,
+            "Host available"
+        )
+
+
+class TestFakeRegistryInjection(SimpleTestCase):
+
+    def rpc_client(self, registry):
+        client = EppRpcClient.__new__(EppRpcClient)
+        client.transport = FakeRegistryTransport(registry)
+        client.connection = None
+        return client
+
+    def test_configured_error(self):
+        client = self.rpc_client(FakeRegistry(errors={"createDomain": 2400}))
+        with self.assertRaises(EppError):
+            client.call("centralnic-test", "createDomain",
+                        {"name": "test.xyz"})
+
+    def test_error_rate(self):
+        client = self.rpc_client(FakeRegistry(error_rate=1.0))
+        with self.assertRaises(EppError):
+            client.call("centralnic-test", "checkDomain",
+                        {"domain": "test.xyz"})
+
+    def test_lost_reply_times_out(self):
+        client = self.rpc_client(FakeRegistry(timeout_rate=1.0))
+        with self.assertRaises(EppTimeout):
+            client.call("centralnic-test", "checkDomain",
+                        {"domain": "test.xyz"}, timeout=0.01)
+
+    def test_latency_beyond_deadline(self):
+        client = self.rpc_client(FakeRegistry(latency=1))
+        with self.assertRaises(EppTimeout):
+            client.call("centralnic-test", "checkDomain",
+                        {"domain": "test.xyz"}, timeout=0.01)
+
+    def test_replies_in_flight_together(self):
+        """
+        Latency applies per command, not per command in sequence.
+        """
+        registry = FakeRegistry(latency=0.05)
+        client = self.rpc_client(registry)
+        replies = client.call_many([
+            ("centralnic-test", "checkDomain", {"domain": "a.xyz"}, 1),
+            ("centralnic-test", "checkDomain", {"domain": "b.xyz"}, 1),
+            ("centralnic-test", "checkDomain", {"domain": "c.xyz"}, 1),
+        ])
+        client.wait(replies)
+        self.assertTrue(all(i.done() for i in replies), "All replies in")
+        self.assertEqual(len(registry.commands), 3, "Three commands sent")
+
+    def test_latency_per_command(self):
+        registry = FakeRegistry(latency={"default": 0.5, "checkDomain": 0})
+        self.assertEqual(registry.command_latency("checkDomain"), 0)
+        self.assertEqual(registry.command_latency("createDomain"), 0.5)
+        client = self.rpc_client(registry)
+        client.call("centralnic-test", "checkDomain",
+                    {"domain": "test.xyz"}, timeout=0.1)
+        with self.assertRaises(EppTimeout):
+            client.call("centralnic-test", "infoDomain",
+                        {"domain": "test.xyz"}, timeout=0.01)
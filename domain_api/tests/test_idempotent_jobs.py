@@ -0,0 +1,252 @@
+from unittest.mock import MagicMock, patch
+import json
+from datetime import timedelta
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from .test_setup import TestSetup
+from ..exceptions import EppObjectDoesNotExist
+from ..models import WorkflowJob
+from ..tasks import connect_domain, create_domain
+from ..utilities.jobs import (
+    idempotency_key,
+    job_stalled,
+    request_fingerprint,
+    resume_job_steps,
+)
+
+
+class TestIdempotencyHelpers(SimpleTestCase):
+
+    def test_idempotency_key(self):
+        for header, expected in (("abc-123", "abc-123"),
+                                 (" abc-123 ", "abc-123"),
+                                 ("", None)):
+            request = MagicMock(META={"HTTP_IDEMPOTENCY_KEY": header})
+            self.assertEqual(idempotency_key(request), expected)
+        self.assertIsNone(idempotency_key(MagicMock(META={})))
+        request = MagicMock(META={"HTTP_IDEMPOTENCY_KEY": "k" * 256})
+        with self.assertRaises(ValueError):
+            idempotency_key(request)
+
+    def test_request_fingerprint(self):
+        self.assertEqual(
+            request_fingerprint("create_domain", "a.xyz", {"a": 1, "b": 2}),
+            request_fingerprint("create_domain", "a.xyz", {"b": 2, "a": 1})
+        )
+        self.assertNotEqual(
+            request_fingerprint("create_domain", "a.xyz", {"a": 1}),
+            request_fingerprint("create_domain", "a.xyz", {"a": 2})
+        )
+
+
+class TestIdempotentRequests(TestSetup):
+
+    def setUp(self):
+        super().setUp()
+        self.jwt_header = self.api_login()
+        self.data = {"domain": "test-new-domain.xyz"}
+
+    def post(self, data, key="key-1", **headers):
+        return self.client.post('/v1/domains/',
+                                data=json.dumps(data),
+                                content_type='application/json',
+                                HTTP_AUTHORIZATION=self.jwt_header,
+                                HTTP_IDEMPOTENCY_KEY=key,
+                                **headers)
+
+    @patch('domain_api.utilities.jobs.chain')
+    def test_repeated_request_gets_same_job(self, mock_chain):
+        first = self.post(self.data, HTTP_PREFER='respond-async')
+        self.assertEqual(first.status_code, 202)
+        job = WorkflowJob.objects.get(pk=first.data["id"])
+        self.assertEqual(job.idempotency_key, "key-1")
+        self.assertTrue(all(job.steps.values_list('signature', flat=True)),
+                        "Steps keep their signature for a resume")
+        second = self.post(self.data, HTTP_PREFER='respond-async')
+        self.assertEqual(second.status_code, 202)
+        self.assertEqual(second.data["id"], first.data["id"])
+        self.assertEqual(mock_chain.call_count, 1, "Workflow sent once")
+
+    @patch('domain_api.utilities.jobs.chain')
+    def test_key_reused_for_other_request(self, mock_chain):
+        self.post(self.data, HTTP_PREFER='respond-async')
+        response = self.post({"domain": "test-other-domain.xyz"},
+                             HTTP_PREFER='respond-async')
+        self.assertEqual(response.status_code, 422)
+
+    @patch('domain_api.views.run_workflow_chain')
+    @patch('domain_api.utilities.jobs.chain')
+    def test_succeeded_request_answered_again(self, mock_chain, mock_run):
+        data = {"domain": "test-something.bar"}
+        WorkflowJob.objects.create(
+            user=self.test_customer_user,
+            action="create_domain",
+            name="test-something.bar",
+            status=WorkflowJob.SUCCEEDED,
+            idempotency_key="key-1",
+            fingerprint=request_fingerprint("create_domain",
+                                            "test-something.bar",
+                                            data)
+        )
+        response = self.post(data)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["domain"], "test-something.bar")
+        mock_chain.assert_not_called()
+        mock_run.assert_not_called()
+
+    @patch('domain_api.views.run_workflow_chain')
+    @patch('domain_api.views.workflow_factory')
+    def test_succeeded_update_answered_again(self, mock_factory, mock_run):
+        """
+        A repeated update is answered from its job even though the domain
+        has the changes by now.
+        """
+        data = {"domain": "test-something.bar",
+                "registrant": 1,
+                "contacts": [{"admin": 3}, {"tech": 4}]}
+        WorkflowJob.objects.create(
+            user=self.test_customer_user,
+            action="update_domain",
+            name="test-something.bar",
+            status=WorkflowJob.SUCCEEDED,
+            result={},
+            idempotency_key="key-1",
+            fingerprint=request_fingerprint("update_domain",
+                                            "test-something.bar",
+                                            data)
+        )
+        response = self.client.patch('/v1/domains/test-something.bar/',
+                                     data=json.dumps(data),
+                                     content_type='application/json',
+                                     HTTP_AUTHORIZATION=self.jwt_header,
+                                     HTTP_IDEMPOTENCY_KEY="key-1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["domain"], "test-something.bar")
+        mock_factory.return_value.return_value.update_domain.\
+            assert_not_called()
+        mock_run.assert_not_called()
+
+    @override_settings(JOB_STALL_TIMEOUT=60)
+    def test_job_stalled(self):
+        job = WorkflowJob.objects.create(user=self.test_customer_user,
+                                         action="create_domain",
+                                         name="test-new-domain.xyz",
+                                         status=WorkflowJob.RUNNING)
+        self.assertFalse(job_stalled(job))
+        job.steps.create(position=0,
+                         task_id="task-0",
+                         task="domain_api.tasks.create_domain",
+                         status=WorkflowJob.RUNNING,
+                         started=timezone.now())
+        WorkflowJob.objects.filter(pk=job.pk).update(
+            updated=timezone.now() - timedelta(seconds=120)
+        )
+        job.refresh_from_db()
+        self.assertFalse(job_stalled(job), "Step started recently")
+        job.steps.update(started=timezone.now() - timedelta(seconds=120))
+        self.assertTrue(job_stalled(job))
+        job.status = WorkflowJob.FAILED
+        self.assertFalse(job_stalled(job), "Only unfinished jobs stall")
+
+
+class TestResumeJobSteps(TestSetup):
+
+    def setUp(self):
+        super().setUp()
+        self.job = WorkflowJob.objects.create(user=self.test_customer_user,
+                                              action="create_domain",
+                                              name="test-new-domain.xyz",
+                                              status=WorkflowJob.FAILED)
+        self.created = {"name": "test-new-domain.xyz",
+                        "registrant": "registrant-123",
+                        "create_date": "2017-01-01T12:00:01",
+                        "expiration_date": "2018-01-01T12:00:01"}
+        self.job.steps.create(
+            position=0,
+            task_id="task-0",
+            task="domain_api.tasks.create_domain",
+            signature=create_domain.si({"name": "test-new-domain.xyz",
+                                        "registrant": "registrant-123"},
+                                       "centralnic-test"),
+            status=WorkflowJob.SUCCEEDED,
+            output=self.created
+        )
+        self.job.steps.create(
+            position=1,
+            task_id="task-1",
+            task="domain_api.tasks.connect_domain",
+            signature=connect_domain.s("centralnic-test"),
+            status=WorkflowJob.FAILED,
+            error="Database went away"
+        )
+
+    @patch('domain_api.utilities.jobs.chain')
+    def test_resume_from_failed_step(self, mock_chain):
+        resume_job_steps(self.job)
+        workflow = mock_chain.call_args[0][0]
+        self.assertEqual([i.task for i in workflow],
+                         ["domain_api.tasks.connect_domain"],
+                         "The domain is not created at the registry again")
+        self.assertEqual(workflow[0].args,
+                         (self.created, "centralnic-test"),
+                         "Connect gets the recorded create result")
+        self.assertEqual(self.job.status, WorkflowJob.PENDING)
+        self.assertEqual(self.job.steps.get(position=0).status,
+                         WorkflowJob.SUCCEEDED)
+        step = self.job.steps.get(position=1)
+        self.assertEqual(step.status, WorkflowJob.PENDING)
+        self.assertEqual(workflow[0].options["task_id"], step.task_id)
+
+    @patch('domain_api.utilities.jobs.chain')
+    def test_nothing_left_to_resume(self, mock_chain):
+        self.job.steps.filter(position=1).update(
+            status=WorkflowJob.SUCCEEDED,
+            output={"domain": "test-new-domain.xyz"}
+        )
+        self.assertIsNone(resume_job_steps(self.job))
+        mock_chain.assert_not_called()
+        self.assertEqual(self.job.status, WorkflowJob.SUCCEEDED)
+        self.assertEqual(self.job.result, {"domain": "test-new-domain.xyz"})
+
+    @patch('domain_api.utilities.jobs.DomainQuery')
+    @patch('domain_api.utilities.jobs.chain')
+    def test_lost_create_reply(self, mock_chain, mock_query):
+        """
+        A create whose reply was lost but which created the domain is not
+        sent again.
+        """
+        self.job.steps.filter(position=0).update(status=WorkflowJob.FAILED,
+                                                 output=None,
+                                                 error="No reply")
+        self.job.steps.filter(position=1).update(status=WorkflowJob.PENDING,
+                                                 error=None)
+        mock_query.return_value.created_info.return_value = {
+            "registrant": "registrant-123",
+            "create_date": "2017-01-01T12:00:01",
+            "expiration_date": "2018-01-01T12:00:01"
+        }
+        resume_job_steps(self.job)
+        mock_query.return_value.created_info.assert_called_once_with(
+            "centralnic-test",
+            "test-new-domain.xyz"
+        )
+        workflow = mock_chain.call_args[0][0]
+        self.assertEqual([i.task for i in workflow],
+                         ["domain_api.tasks.connect_domain"])
+        self.assertEqual(workflow[0].args[0], self.created)
+        self.assertEqual(self.job.steps.get(position=0).status,
+                         WorkflowJob.SUCCEEDED)
+
+    @patch('domain_api.utilities.jobs.DomainQuery')
+    @patch('domain_api.utilities.jobs.chain')
+    def test_failed_create_sent_again(self, mock_chain, mock_query):
+        self.job.steps.filter(position=0).update(status=WorkflowJob.FAILED,
+                                                 output=None)
+        self.job.steps.filter(position=1).update(status=WorkflowJob.PENDING)
+        mock_query.return_value.created_info.side_effect = \
+            EppObjectDoesNotExist("Object does not exist")
+        resume_job_steps(self.job)
+        workflow = mock_chain.call_args[0][0]
+        self.assertEqual([i.task for i in workflow],
+                         ["domain_api.tasks.create_domain",
+                          "domain_api.tasks.connect_domain"])
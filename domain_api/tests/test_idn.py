@@ -0,0 +1,25 @@
+from django.test import SimpleTestCase
+from domain_api.utilities import idn
+
+
+class TestIdn(SimpleTestCase):
+
+    def setUp(self):
+        idn.cache_clear()
+
+    def test_encode_decode(self):
+        self.assertEqual(idn.encode("Tëst.xyz"), "xn--tst-jma.xyz")
+        self.assertEqual(idn.decode("xn--tst-jma.xyz"), "tëst.xyz")
+
+    def test_batch(self):
+        self.assertEqual(idn.encode_many(["tëst.xyz", "test.xyz"]),
+                         ["xn--tst-jma.xyz", "test.xyz"])
+        self.assertEqual(idn.decode_many(["xn--tst-jma.xyz", "test.xyz"]),
+                         ["tëst.xyz", "test.xyz"])
+
+    def test_cache_info(self):
+        idn.encode_many(["tëst.xyz", "tëst.xyz", "tëst.xyz", "test.xyz"])
+        stats = idn.cache_info()["encode"]
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]),
+                         (2, 2, 2), "Repeated names served from cache")
+        self.assertEqual(stats["ratio"], 0.5)
@@ -0,0 +1,157 @@
+from datetime import timedelta
+from unittest.mock import patch
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
+from .test_setup import TestSetup
+from ..exceptions import EppError, EppTimeout
+from ..models import Contact, Nameserver, RegisteredDomain
+from ..tasks import refresh_info, update_domain
+from ..utilities.info import refresh_lock_key
+
+
+@override_settings(
+    INFO_MAX_AGE=300,
+    INFO_STALE_TIMEOUT=3,
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+)
+class TestInfoFreshness(TestSetup):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.login_client()
+        self.registered_domain = RegisteredDomain.objects.get(
+            fqdn="test-something.bar"
+        )
+
+    def synchronised(self, seconds_ago):
+        RegisteredDomain.objects.filter(pk=self.registered_domain.id).update(
+            synchronised=timezone.now() - timedelta(seconds=seconds_ago)
+        )
+
+    @patch('domain_api.tasks.refresh_info.delay')
+    @patch('domain_api.utilities.info.synchronise_domain_info')
+    def test_fresh_domain_from_database(self, mock_sync, mock_refresh):
+        self.synchronised(10)
+        response = self.client.get('/v1/domains/test-something.bar/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(mock_sync.called, "Registry not queried")
+        self.assertFalse(mock_refresh.called, "No refresh queued")
+
+    @patch('domain_api.tasks.refresh_info.delay')
+    @patch('domain_api.utilities.info.synchronise_domain_info')
+    def test_stale_domain_refreshed_once(self, mock_sync, mock_refresh):
+        self.synchronised(3600)
+        for _ in range(2):
+            response = self.client.get('/v1/domains/test-something.bar/')
+            self.assertEqual(response.status_code, 200)
+        self.assertFalse(mock_sync.called, "Stale copy served")
+        mock_refresh.assert_called_once_with("domain",
+                                             self.registered_domain.id)
+
+    @patch('domain_api.tasks.refresh_info.delay')
+    @patch('domain_api.utilities.info.synchronise_domain_info', return_value={})
+    def test_forced_refresh(self, mock_sync, mock_refresh):
+        self.synchronised(10)
+        response = self.client.get(
+            '/v1/domains/test-something.bar/?refresh=true'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(mock_sync.called, "Live sync forced")
+
+    @patch('domain_api.tasks.refresh_info.delay')
+    @patch('domain_api.utilities.info.synchronise_contact_info')
+    def test_stale_contact(self, mock_sync, mock_refresh):
+        Contact.objects.filter(registry_id="contact-123").update(
+            synchronised=timezone.now() - timedelta(hours=1)
+        )
+        self.client.force_login(self.user)
+        response = self.client.get('/v1/contacts/contact-123/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(mock_sync.called, "Stale copy served")
+        self.assertEqual(mock_refresh.call_args[0][0], "contact")
+
+    @patch('domain_api.tasks.refresh_info.delay')
+    @patch('domain_api.utilities.info.synchronise_host_info')
+    def test_fresh_host(self, mock_sync, mock_refresh):
+        Nameserver.objects.filter(idn_host="ns1.test-01.cx").update(
+            synchronised=timezone.now()
+        )
+        self.client.force_login(self.user)
+        response = self.client.get('/v1/nameservers/ns1.test-01.cx/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(mock_sync.called, "Registry not queried")
+
+    @patch('domain_api.utilities.info.synchronise_domain_info',
+           side_effect=EppTimeout("No reply"))
+    def test_stale_on_registry_failure(self, mock_sync):
+        self.synchronised(600)
+        response = self.client.get(
+            '/v1/domains/test-something.bar/?refresh=true'
+        )
+        self.assertEqual(response.status_code, 200, "Local copy served")
+        self.assertGreaterEqual(int(response["Age"]), 600)
+        self.assertEqual(response["Warning"], '111 - "Revalidation Failed"')
+        self.assertEqual(mock_sync.call_args[0][1], 3,
+                         "Live sync given the short budget")
+
+    @patch('domain_api.utilities.info.synchronise_domain_info',
+           side_effect=EppError("Registry down"))
+    def test_never_synced_registry_failure(self, mock_sync):
+        response = self.client.get('/v1/domains/test-something.bar/')
+        self.assertEqual(response.status_code, 400,
+                         "Nothing to fall back on")
+
+    @patch('domain_api.utilities.info.synchronise_domain_info', return_value={})
+    def test_expired_domain_synced(self, mock_sync):
+        self.synchronised(10)
+        RegisteredDomain.objects.filter(pk=self.registered_domain.id).update(
+            expired=True
+        )
+        response = self.client.get('/v1/domains/test-something.bar/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(mock_sync.called, "Changed domain synced live")
+
+    @patch('domain_api.utilities.info.synchronise_domain_info',
+           side_effect=EppError("Registry down"))
+    def test_expired_domain_registry_failure(self, mock_sync):
+        self.synchronised(10)
+        RegisteredDomain.objects.filter(pk=self.registered_domain.id).update(
+            expired=True
+        )
+        response = self.client.get('/v1/domains/test-something.bar/')
+        self.assertEqual(response.status_code, 200, "Local copy served")
+        self.assertGreaterEqual(int(response["Age"]), 10)
+        self.assertEqual(response["Warning"], '111 - "Revalidation Failed"')
+
+    @patch('domain_api.tasks.refresh_info.delay')
+    def test_stale_warning(self, mock_refresh):
+        self.synchronised(3600)
+        response = self.client.get('/v1/domains/test-something.bar/')
+        self.assertEqual(response["Warning"], '110 - "Response is Stale"')
+
+    @patch('domain_api.tasks.synchronise_info')
+    def test_refresh_task_releases_lock(self, mock_sync):
+        key = refresh_lock_key("domain", self.registered_domain.id)
+        cache.set(key, True)
+        refresh_info("domain", self.registered_domain.id)
+        self.assertEqual(mock_sync.call_args[0][0], self.registered_domain)
+        self.assertIsNone(cache.get(key), "Lock released")
+
+    @patch('domain_api.tasks.DomainAction')
+    def test_update_expires_local_copy(self, mock_action):
+        mock_action.return_value.update.return_value = {}
+        self.synchronised(10)
+        update_domain({"name": "test-something.bar",
+                       "add": {"ns": ["ns1.test-08.com"]}},
+                      "centralnic-test")
+        self.registered_domain.refresh_from_db()
+        self.assertTrue(self.registered_domain.expired,
+                        "Next info syncs the changed domain")
+        self.assertIsNotNone(self.registered_domain.synchronised,
+                             "Last sync kept to fall back on")
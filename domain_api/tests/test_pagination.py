@@ -0,0 +1,70 @@
+from unittest.mock import patch
+from .test_setup import TestSetup
+from ..models import RegisteredDomain
+from ..pagination import RegisteredDomainCursorPagination
+
+
+class TestDomainCursorPagination(TestSetup):
+
+    def setUp(self):
+        super().setUp()
+        self.login_client()
+        domain = RegisteredDomain.objects.get(fqdn="test-something.bar")
+        for i in range(5):
+            domain.pk = None
+            domain.name = "paged-%d" % i
+            domain.save()
+
+    def fetch_all(self, url):
+        """
+        Follow next links until the last page.
+
+        :url: str first page
+        :returns: list of fqdns in the order they were served
+
+        """
+        fqdns = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data["results"]), 2)
+            fqdns.extend(i["domain"] for i in response.data["results"])
+            url = response.data["next"]
+        return fqdns
+
+    def test_fqdn_ordering(self):
+        fqdns = self.fetch_all('/v1/domains/?ordering=fqdn&page_size=2')
+        self.assertEqual(fqdns, sorted(fqdns), "Pages follow fqdn order")
+        self.assertEqual(
+            len(fqdns),
+            RegisteredDomain.objects.filter(
+                registrant__user=self.test_customer_user,
+                active=True
+            ).count(),
+            "Every domain served exactly once"
+        )
+
+    def test_newest_first(self):
+        fqdns = self.fetch_all('/v1/domains/?page_size=2')
+        self.assertEqual(fqdns[0], "paged-4.bar", "Newest domain first")
+        self.assertEqual(len(fqdns), len(set(fqdns)), "No domain repeated")
+
+    def test_filters_kept(self):
+        fqdns = self.fetch_all(
+            '/v1/domains/?ordering=fqdn&page_size=2&registrant=registrant-123'
+        )
+        self.assertIn("paged-0.bar", fqdns)
+        self.assertEqual(
+            set(fqdns),
+            set(RegisteredDomain.objects.filter(
+                registrant__registry_id="registrant-123",
+                active=True
+            ).values_list('fqdn', flat=True)),
+            "Filter applies to every page"
+        )
+
+    def test_page_size_capped(self):
+        with patch.object(RegisteredDomainCursorPagination, 'max_page_size',
+                          2):
+            response = self.client.get('/v1/domains/?page_size=1000')
+        self.assertEqual(len(response.data["results"]), 2)
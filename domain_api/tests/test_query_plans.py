@@ -0,0 +1,262 @@
+import os
+from unittest import skipUnless
+from unittest.mock import MagicMock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import QueryDict
+from .test_setup import TestSetup
+from ..models import (
+    Contact,
+    ContactType,
+    DomainAccess,
+    DomainContact,
+    DomainNameserver,
+    RegisteredDomain,
+    Registrant,
+    TopLevelDomainProvider,
+)
+from ..pagination import (
+    ContactCursorPagination,
+    RegisteredDomainCursorPagination,
+)
+from ..views import (
+    ContactViewSet,
+    RegisteredDomainViewSet,
+    RegistrantViewSet,
+    get_registered_domain_queryset,
+)
+
+# Number of domains to seed. The default keeps the suite quick. Set
+# QUERY_PLAN_FULL=1 to check plans against a production sized table of a
+# million domains, or QUERY_PLAN_DOMAINS to any other size.
+if os.environ.get("QUERY_PLAN_FULL", "").lower() in ("1", "true"):
+    SEED_DOMAINS = 1000000
+else:
+    SEED_DOMAINS = int(os.environ.get("QUERY_PLAN_DOMAINS", 20000))
+SEED_REGISTRANTS = max(SEED_DOMAINS // 20, 1)
+# Every this many domains belong to the test customer.
+CUSTOMER_DOMAIN_INTERVAL = 10
+# Query parameters of the domain list, one filter at a time.
+DOMAIN_FILTERS = (
+    "",
+    "registrant=plan-registrant-7",
+    "admin=plan-contact-7",
+    "tech=plan-contact-8",
+    "nameserver=ns1.plan-host-7.com",
+    "provider=centralnic-test",
+    "active=false",
+)
+CONTACT_FILTERS = (
+    "",
+    "provider=centralnic-test",
+)
+# Scans of tables smaller than this are left to the optimiser.
+SCAN_THRESHOLD = 1000
+
+
+@skipUnless(connection.vendor == "mysql", "EXPLAIN output is MySQL specific")
+class TestRegisteredDomainQueryPlans(TestSetup):
+
+    """
+    Run EXPLAIN on the queries behind the domain endpoints and registry
+    routing, and fail if any of them scans a large table.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        template = Registrant.objects.get(registry_id="registrant-123")
+        fields = {
+            field.attname: getattr(template, field.attname)
+            for field in Registrant._meta.concrete_fields
+            if not field.primary_key
+        }
+        Registrant.objects.bulk_create(
+            [Registrant(**dict(fields, registry_id="plan-registrant-%d" % i))
+             for i in range(SEED_REGISTRANTS)],
+            batch_size=5000
+        )
+        registrant_ids = list(
+            Registrant.objects.filter(
+                registry_id__startswith="plan-registrant-"
+            ).values_list("id", flat=True)
+        )
+        template = Contact.objects.get(registry_id="contact-123")
+        fields = {
+            field.attname: getattr(template, field.attname)
+            for field in Contact._meta.concrete_fields
+            if not field.primary_key
+        }
+        Contact.objects.bulk_create(
+            [Contact(**dict(fields, registry_id="plan-contact-%d" % i))
+             for i in range(SEED_REGISTRANTS)],
+            batch_size=5000
+        )
+        contact_ids = list(
+            Contact.objects.filter(
+                registry_id__startswith="plan-contact-"
+            ).values_list("id", flat=True)
+        )
+        tld_provider = TopLevelDomainProvider.objects.get(zone__zone="xyz")
+        batch = []
+        for i in range(SEED_DOMAINS):
+            name = "plan-domain-%d" % i
+            batch.append(RegisteredDomain(
+                name=name,
+                fqdn=name + ".xyz",
+                tld=tld_provider.zone,
+                tld_provider=tld_provider,
+                registrant_id=registrant_ids[i % len(registrant_ids)],
+                registration_period=1,
+                active=True
+            ))
+            if len(batch) == 5000:
+                # bulk_create skips save(), so fqdn and tld are set above.
+                RegisteredDomain.objects.bulk_create(batch)
+                batch = []
+        RegisteredDomain.objects.bulk_create(batch)
+        # bulk_create skips the signals keeping contacts, nameservers and
+        # access rows in step, so they are seeded here as well.
+        admin = ContactType.objects.get(name="admin")
+        tech = ContactType.objects.get(name="tech")
+        customer = User.objects.get(username="testcustomer")
+        domains = RegisteredDomain.objects.filter(
+            fqdn__startswith="plan-domain-"
+        ).values_list("id", flat=True).iterator()
+        related = {DomainContact: [], DomainNameserver: [], DomainAccess: []}
+        for i, domain_id in enumerate(domains):
+            contact_id = contact_ids[i % len(contact_ids)]
+            related[DomainContact] += [
+                DomainContact(registered_domain_id=domain_id,
+                              contact_id=contact_id,
+                              contact_type=contact_type,
+                              active=True)
+                for contact_type in (admin, tech)
+            ]
+            related[DomainNameserver].append(DomainNameserver(
+                registered_domain_id=domain_id,
+                idn_host="ns1.plan-host-%d.com" % (i % len(contact_ids))
+            ))
+            if i % CUSTOMER_DOMAIN_INTERVAL == 0:
+                related[DomainAccess].append(DomainAccess(
+                    user=customer,
+                    registered_domain_id=domain_id,
+                    role=DomainAccess.REGISTRANT
+                ))
+            if len(related[DomainContact]) >= 10000:
+                for model, objects in related.items():
+                    model.objects.bulk_create(objects)
+                    objects.clear()
+        for model, objects in related.items():
+            model.objects.bulk_create(objects)
+        with connection.cursor() as cursor:
+            for model in (RegisteredDomain, Registrant, Contact,
+                          DomainContact, DomainNameserver, DomainAccess):
+                cursor.execute("ANALYZE TABLE %s" % model._meta.db_table)
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN " + sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def assertNoTableScan(self, queryset):
+        for row in self.explain(queryset):
+            self.assertFalse(
+                row["type"] == "ALL" and (row["rows"] or 0) > SCAN_THRESHOLD,
+                "Full scan of %s (%s rows): %s" % (row["table"],
+                                                   row["rows"],
+                                                   queryset.query)
+            )
+
+    def viewset_queryset(self, viewset_class, username, params):
+        view = viewset_class()
+        view.request = MagicMock(user=User.objects.get(username=username),
+                                 query_params=QueryDict(params))
+        return view.get_queryset()
+
+    def assertPagesIndexed(self, viewset_class, pagination_class, filters):
+        """
+        Check the first page of every ordering a list endpoint offers, for
+        each of its filters and for both an admin and a customer.
+        """
+        page_size = settings.API_PAGE_SIZE
+        for username in ("testadmin", "testcustomer"):
+            for params in filters:
+                queryset = self.viewset_queryset(viewset_class,
+                                                 username,
+                                                 params)
+                for ordering in pagination_class.orderings:
+                    with self.subTest(user=username,
+                                      params=params,
+                                      ordering=ordering):
+                        self.assertNoTableScan(
+                            queryset.order_by(*ordering)[:page_size + 1]
+                        )
+
+    def test_domain_list_pages(self):
+        self.assertPagesIndexed(RegisteredDomainViewSet,
+                                RegisteredDomainCursorPagination,
+                                DOMAIN_FILTERS)
+
+    def test_registrant_list_pages(self):
+        self.assertPagesIndexed(RegistrantViewSet,
+                                ContactCursorPagination,
+                                CONTACT_FILTERS)
+
+    def test_contact_list_pages(self):
+        self.assertPagesIndexed(ContactViewSet,
+                                ContactCursorPagination,
+                                CONTACT_FILTERS)
+
+    def test_retrieve_by_fqdn(self):
+        self.assertNoTableScan(
+            RegisteredDomain.objects.filter(fqdn="plan-domain-42.xyz",
+                                            active=True)
+        )
+
+    def test_customer_retrieve_by_fqdn(self):
+        user = User.objects.get(username="testcustomer")
+        self.assertNoTableScan(
+            get_registered_domain_queryset(user).filter(
+                fqdn="plan-domain-42.xyz",
+                active=True
+            )
+        )
+
+    def test_customer_list(self):
+        user = User.objects.get(username="testcustomer")
+        self.assertNoTableScan(get_registered_domain_queryset(user))
+
+    def test_filter_by_registrant(self):
+        self.assertNoTableScan(
+            RegisteredDomain.objects.filter(
+                registrant__registry_id="plan-registrant-7",
+                active=True
+            )
+        )
+
+    def test_lookup_by_name_and_zone(self):
+        self.assertNoTableScan(
+            RegisteredDomain.objects.filter(name="plan-domain-42",
+                                            tld__zone="xyz",
+                                            active=True)
+        )
+
+    def test_domain_registry_routing(self):
+        self.assertNoTableScan(
+            RegisteredDomain.objects.filter(
+                fqdn__in=["plan-domain-1.xyz", "plan-domain-2.xyz"],
+                active=True
+            ).select_related('tld_provider__provider')
+        )
+
+    def test_domains_using_host(self):
+        self.assertNoTableScan(
+            RegisteredDomain.objects.filter(
+                domain_nameservers__idn_host="ns1.test-08.com",
+                active=True
+            )
+        )
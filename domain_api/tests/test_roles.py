@@ -0,0 +1,70 @@
+from unittest.mock import MagicMock, patch
+from django.contrib.auth.models import AnonymousUser, Group, User
+from django.test import SimpleTestCase, override_settings
+from .test_setup import TestSetup
+from ..authentication import RoleJSONWebTokenAuthentication
+from ..utilities.roles import (
+    get_user_groups,
+    is_admin,
+    jwt_payload_handler,
+    set_user_groups,
+)
+
+
+class TestRoleResolver(SimpleTestCase):
+
+    def setUp(self):
+        self.user = MagicMock(spec=['is_authenticated', 'groups'],
+                              is_authenticated=True)
+        self.user.groups.values_list.return_value = ["admin", "customer"]
+
+    def test_groups_loaded_once(self):
+        self.assertTrue(is_admin(self.user))
+        self.assertEqual(get_user_groups(self.user),
+                         frozenset(["admin", "customer"]))
+        self.assertEqual(self.user.groups.values_list.call_count, 1,
+                         "Groups queried once")
+
+    def test_anonymous(self):
+        self.assertFalse(is_admin(AnonymousUser()))
+
+    @override_settings(ROLES_FROM_JWT=True)
+    def test_groups_from_token(self):
+        authentication = RoleJSONWebTokenAuthentication()
+        with patch('rest_framework_jwt.authentication.'
+                   'JSONWebTokenAuthentication.authenticate_credentials',
+                   return_value=self.user):
+            user = authentication.authenticate_credentials(
+                {"username": "testadmin", "groups": ["customer"]}
+            )
+        self.assertFalse(is_admin(user), "Token claim used")
+        self.user.groups.values_list.assert_not_called()
+
+    @override_settings(ROLES_FROM_JWT=False)
+    def test_token_claim_ignored(self):
+        authentication = RoleJSONWebTokenAuthentication()
+        with patch('rest_framework_jwt.authentication.'
+                   'JSONWebTokenAuthentication.authenticate_credentials',
+                   return_value=self.user):
+            user = authentication.authenticate_credentials(
+                {"username": "testadmin", "groups": ["customer"]}
+            )
+        self.assertTrue(is_admin(user), "Groups read from the database")
+
+
+class TestRequestRoles(TestSetup):
+
+    def test_one_group_query(self):
+        user = User.objects.get(username="testadmin")
+        with self.assertNumQueries(1):
+            for _ in range(5):
+                is_admin(user)
+
+    def test_group_claim(self):
+        user = User.objects.get(username="testadmin")
+        user.groups.add(Group.objects.get(name="admin"))
+        with override_settings(ROLES_FROM_JWT=True):
+            payload = jwt_payload_handler(user)
+        self.assertEqual(payload["groups"], ["admin", "customer"])
+        set_user_groups(user, [])
+        self.assertFalse(is_admin(user))
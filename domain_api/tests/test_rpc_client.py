@@ -0,0 +1,321 @@
+import asyncio
+from unittest.mock import patch, MagicMock
+from django.test import SimpleTestCase, override_settings
+from pika.exceptions import ConnectionClosed
+from domain_api.utilities import rpc_client
+from domain_api.utilities.async_rpc_client import AsyncEppRpcClient
+from domain_api.utilities.rpc_client import (
+    EppRpcClient,
+    PendingReply,
+    RpcConnection,
+    RpcConnectionPool,
+    get_command_timeout,
+    get_connection_pool,
+    process_response,
+)
+from ..exceptions import (
+    EppError,
+    EppObjectDoesNotExist,
+    EppTimeout,
+    RpcPoolExhausted,
+)
+
+
+class MockConnection(object):
+
+    def __init__(self, healthy=True, fail_publish=False):
+        self.healthy = healthy
+        self.fail_publish = fail_publish
+        self.closed = False
+        self.published = []
+        self.pending = {}
+
+    def is_healthy(self):
+        return self.healthy
+
+    def publish(self, routing_key, command, data, reply):
+        if self.fail_publish:
+            raise ConnectionClosed()
+        self.published.append(command)
+        self.pending[reply.correlation_id] = reply
+
+    def wait(self, replies):
+        pending, self.pending = self.pending, {}
+        for reply in pending.values():
+            reply.set_result(process_response(
+                b'{"result": {"code": 1000, "msg": "ok"}, "data": {"a": 1}}'
+            ))
+
+    def expire(self, now):
+        for correlation_id, reply in list(self.pending.items()):
+            if reply.deadline <= now:
+                del self.pending[correlation_id]
+                reply.set_exception(EppTimeout())
+
+    def fail_pending(self, exc):
+        pending, self.pending = self.pending, {}
+        for reply in pending.values():
+            reply.set_exception(exc)
+
+    def close(self):
+        self.closed = True
+
+
+class TestRpcConnectionPool(SimpleTestCase):
+
+    def test_connection_reused(self):
+        """
+        A released connection is handed out again.
+        """
+        pool = RpcConnectionPool(size=2)
+        with patch.object(pool, '_connect', side_effect=MockConnection):
+            first = pool.acquire()
+            pool.release(first)
+            second = pool.acquire()
+            self.assertIs(first, second, "Connection reused")
+
+    def test_unhealthy_connection_replaced(self):
+        """
+        A connection failing its health check is closed and replaced.
+        """
+        pool = RpcConnectionPool(size=1)
+        stale = MockConnection(healthy=False)
+        pool._idle.put(stale)
+        with patch.object(pool, '_connect', side_effect=MockConnection):
+            connection = pool.acquire()
+        self.assertIsNot(connection, stale, "Stale connection not used")
+        self.assertTrue(stale.closed, "Stale connection closed")
+
+    def test_pool_exhausted(self):
+        """
+        Checkout fails once every connection is in use.
+        """
+        pool = RpcConnectionPool(size=1, checkout_timeout=0.01)
+        with patch.object(pool, '_connect', side_effect=MockConnection):
+            pool.acquire()
+            with self.assertRaises(RpcPoolExhausted):
+                pool.acquire()
+
+    def test_pool_per_process(self):
+        """
+        A forked process gets its own pool.
+        """
+        params = {"host": "localhost", "exchange": "epp"}
+        pool = get_connection_pool(**params)
+        self.assertIs(pool, get_connection_pool(**params), "Pool shared")
+        with patch.object(rpc_client.os, 'getpid', return_value=-1):
+            self.assertIsNot(pool, get_connection_pool(**params),
+                             "New pool after fork")
+
+
+class TestEppRpcClientPooling(SimpleTestCase):
+
+    def test_retry_publish_on_new_connection(self):
+        """
+        A connection that fails to publish is discarded and the command is
+        sent on a fresh connection.
+        """
+        client = EppRpcClient(host="localhost")
+        stale = MockConnection(fail_publish=True)
+        fresh = MockConnection()
+        client.transport = MagicMock()
+        client.transport.acquire.side_effect = [stale, fresh]
+        result = client.call("registry", "checkDomain", {})
+        self.assertEqual(result, {"a": 1}, "Response returned")
+        client.transport.release.assert_any_call(stale, discard=True)
+        client.transport.release.assert_any_call(fresh, discard=False)
+
+    def test_many_commands_share_connection(self):
+        """
+        Commands sent together are multiplexed over one connection.
+        """
+        client = EppRpcClient(host="localhost")
+        connection = MockConnection()
+        client.transport = MagicMock()
+        client.transport.acquire.return_value = connection
+        replies = client.call_many([
+            ("registry", "checkDomain", {}),
+            ("registry", "infoDomain", {}),
+            ("other-registry", "infoDomain", {}),
+        ])
+        self.assertEqual(len(connection.published), 3, "All commands sent")
+        self.assertEqual([i.result() for i in replies], [{"a": 1}] * 3,
+                         "All replies received")
+        client.transport.acquire.assert_called_once_with()
+        client.transport.release.assert_called_once_with(connection,
+                                                         discard=False)
+
+    def test_dropped_reply_released_after_deadline(self):
+        """
+        A reply nobody waits for holds the connection only until its
+        deadline has passed.
+        """
+        client = EppRpcClient(host="localhost")
+        connection = MockConnection()
+        client.transport = MagicMock()
+        client.transport.acquire.return_value = connection
+        dropped = client.call_async("registry", "createDomain", {},
+                                    timeout=0)
+        self.assertIsNotNone(client.connection, "Connection in use")
+        client.call("registry", "checkDomain", {})
+        self.assertIsInstance(dropped.exception(), EppTimeout,
+                              "Dropped reply failed")
+        self.assertIsNone(client.connection, "Connection released")
+        client.transport.release.assert_called_with(connection,
+                                                    discard=False)
+
+    def test_context_manager_releases(self):
+        """
+        Leaving the client's context fails pending replies and returns the
+        connection to the pool.
+        """
+        connection = MockConnection()
+        with EppRpcClient(host="localhost") as client:
+            client.transport = MagicMock()
+            client.transport.acquire.return_value = connection
+            reply = client.call_async("registry", "checkDomain", {})
+        self.assertIsInstance(reply.exception(), EppError, "Reply failed")
+        self.assertEqual(connection.pending, {}, "Nothing pending")
+        client.transport.release.assert_called_once_with(connection,
+                                                         discard=False)
+
+
+class TestRpcConnectionReplies(SimpleTestCase):
+
+    def setUp(self):
+        self.connection = RpcConnection.__new__(RpcConnection)
+        self.connection.connection = MagicMock()
+        self.connection.pending = {}
+
+    def response(self, correlation_id, body):
+        props = MagicMock(correlation_id=correlation_id)
+        self.connection.on_response(None, None, props, body)
+
+    def test_replies_matched_by_correlation_id(self):
+        """
+        Replies arriving out of order resolve the right future.
+        """
+        first = PendingReply(None)
+        second = PendingReply(None)
+        self.connection.pending[first.correlation_id] = first
+        self.connection.pending[second.correlation_id] = second
+        self.response(
+            second.correlation_id,
+            b'{"result": {"code": 2302, "msg": "Object exists"}}'
+        )
+        self.response(
+            first.correlation_id,
+            b'{"result": {"code": 1000, "msg": "ok"}, "data": {"a": 1}}'
+        )
+        self.assertEqual(first.result(), {"a": 1}, "First reply data")
+        self.assertIsInstance(second.exception(), EppError,
+                              "Second reply mapped to EppError")
+        self.assertEqual(self.connection.pending, {}, "Nothing pending")
+
+    def test_unknown_reply_discarded(self):
+        """
+        A reply nobody is waiting for is dropped.
+        """
+        self.response(
+            "not-pending",
+            b'{"result": {"code": 1000, "msg": "ok"}}'
+        )
+        self.assertEqual(self.connection.pending, {}, "Nothing pending")
+
+    def test_deadline(self):
+        """
+        Waiting past the deadline raises a timeout and forgets the command.
+        """
+        reply = PendingReply(None, "createDomain", 0.01)
+        self.connection.pending[reply.correlation_id] = reply
+        self.connection.wait([reply])
+        self.assertIsInstance(reply.exception(), EppTimeout, "Timed out")
+        self.assertEqual(self.connection.pending, {}, "Nothing pending")
+        # Late reply is dropped without touching the finished future.
+        self.response(
+            reply.correlation_id,
+            b'{"result": {"code": 1000, "msg": "ok"}}'
+        )
+        self.assertIsInstance(reply.exception(), EppTimeout, "Still timeout")
+        _, kwargs = self.connection.connection.process_data_events.call_args
+        self.assertGreater(kwargs["time_limit"], 0, "Blocked on socket")
+
+
+@override_settings(
+    EPP_COMMAND_TIMEOUTS={"default": 30, "checkDomain": 5},
+    EPP_REGISTRY_COMMAND_TIMEOUTS={"slow-registry": {"checkDomain": 20}}
+)
+class TestCommandTimeouts(SimpleTestCase):
+
+    def test_command_timeout(self):
+        self.assertEqual(get_command_timeout("registry", "checkDomain"), 5)
+        self.assertEqual(get_command_timeout("registry", "createDomain"), 30)
+
+    def test_registry_timeout(self):
+        self.assertEqual(get_command_timeout("slow-registry", "checkDomain"),
+                         20)
+        self.assertEqual(get_command_timeout("slow-registry", "infoDomain"),
+                         30)
+
+
+class TestAsyncEppRpcClient(SimpleTestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.client = AsyncEppRpcClient(host="localhost", loop=self.loop)
+        self.published = []
+
+        async def connect():
+            pass
+
+        async def basic_publish(**kwargs):
+            self.published.append(kwargs["properties"]["correlation_id"])
+
+        self.client.connect = connect
+        self.client.channel = MagicMock(basic_publish=basic_publish)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def reply(self, body):
+        async def respond():
+            while not self.published:
+                await asyncio.sleep(0)
+            properties = MagicMock(correlation_id=self.published[0])
+            await self.client.on_response(None, body, None, properties)
+        return respond()
+
+    def test_call(self):
+        """
+        Reply data is returned by the coroutine.
+        """
+        call = self.client.call("registry", "checkDomain", {}, timeout=1)
+        result, _ = self.loop.run_until_complete(asyncio.gather(
+            call,
+            self.reply(b'{"result": {"code": 1000, "msg": "ok"}, '
+                       b'"data": {"a": 1}}')
+        ))
+        self.assertEqual(result, {"a": 1}, "Reply returned")
+
+    def test_error_mapping(self):
+        """
+        Registry errors are raised the same way as the blocking client.
+        """
+        call = self.client.call("registry", "infoDomain", {}, timeout=1)
+        with self.assertRaises(EppObjectDoesNotExist):
+            self.loop.run_until_complete(asyncio.gather(
+                call,
+                self.reply(b'{"result": {"code": 2303, '
+                           b'"msg": "Object does not exist"}}')
+            ))
+
+    def test_timeout(self):
+        """
+        No reply within the deadline raises EppTimeout.
+        """
+        call = self.client.call("registry", "createDomain", {}, timeout=0.01)
+        with self.assertRaises(EppTimeout):
+            self.loop.run_until_complete(call)
+        self.assertEqual(self.client.pending, {}, "Nothing pending")
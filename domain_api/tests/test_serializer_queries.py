@@ -0,0 +1,108 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from .test_setup import TestSetup
+from ..models import (
+    Contact,
+    ContactType,
+    Nameserver,
+    RegisteredDomain,
+    Registrant,
+)
+
+# Extra rows added between two requests to the same list endpoint.
+EXTRA_ROWS = 10
+
+
+def copy(instance, **fields):
+    """
+    Save a copy of a model instance with some fields replaced.
+
+    :instance: model object
+    :returns: new model object
+
+    """
+    values = {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+        if not field.primary_key
+    }
+    values.update(fields)
+    return instance.__class__.objects.create(**values)
+
+
+class TestSerializerQueries(TestSetup):
+
+    """
+    Listing more objects must not cost more queries.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, url, add_rows):
+        before = self.count_queries(url)
+        add_rows()
+        self.assertEqual(self.count_queries(url), before,
+                         "%s queries grow with the number of rows" % url)
+
+    def add_domains(self):
+        domain = RegisteredDomain.objects.get(fqdn="test-something.bar")
+        registrant = Registrant.objects.get(registry_id="registrant-123")
+        admin = ContactType.objects.get(name="admin")
+        tech = ContactType.objects.get(name="tech")
+        for i in range(EXTRA_ROWS):
+            registrant = copy(registrant,
+                              registry_id="query-registrant-%d" % i,
+                              user_id=self.user.id)
+            new_domain = copy(domain,
+                              name="query-count-%d" % i,
+                              registrant_id=registrant.id)
+            for contact_type, registry_id in ((admin, "contact-123"),
+                                              (tech, "contact-321")):
+                new_domain.contacts.create(
+                    contact=Contact.objects.get(registry_id=registry_id),
+                    contact_type=contact_type,
+                    active=True
+                )
+
+    def add_contacts(self):
+        contact = Contact.objects.get(registry_id="contact-123")
+        for i in range(EXTRA_ROWS):
+            copy(contact, registry_id="query-contact-%d" % i)
+
+    def add_nameservers(self):
+        nameserver = Nameserver.objects.get(idn_host="ns1.test-01.cx")
+        for i in range(EXTRA_ROWS):
+            copy(nameserver, idn_host="ns1.query-count-%d.cx" % i)
+
+    def test_domain_list(self):
+        self.assertConstantQueries('/v1/domains/', self.add_domains)
+
+    def test_contact_list(self):
+        self.assertConstantQueries('/v1/contacts/', self.add_contacts)
+
+    def test_registrant_list(self):
+        self.assertConstantQueries('/v1/registrants/', self.add_domains)
+
+    def test_domain_contact_list(self):
+        self.assertConstantQueries('/v1/domain-contacts/', self.add_domains)
+
+    def test_nameserver_list(self):
+        self.assertConstantQueries('/v1/nameservers/', self.add_nameservers)
+
+    def test_nameserver_domains(self):
+        def add_domains():
+            self.add_domains()
+            for domain in RegisteredDomain.objects.filter(
+                name__startswith="query-count-"
+            ):
+                domain.domain_nameservers.create(idn_host="ns1.test-08.com")
+        self.assertConstantQueries('/v1/nameservers/ns1.test-08.com/domains/',
+                                   add_domains)
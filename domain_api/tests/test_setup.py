@@ -20,6 +20,8 @@ class TestSetup(TestCase):
                 "test_nameservers.json",
                 "test_domain_contacts.json",
                 "test_registered_domains.json",
+                "test_domain_nameservers.json",
+                "test_domain_access.json",
                 ]
 
     """
@@ -0,0 +1,142 @@
+from unittest.mock import MagicMock, patch
+from celery.app.trace import build_tracer
+from celery.exceptions import TimeoutError as CeleryTimeoutError
+from django.test import SimpleTestCase, TestCase, override_settings
+from application.celery import app
+from .test_setup import TestSetup
+from ..exceptions import DomainNotAvailable, EppError, EppTimeout
+from ..tasks import (
+    init_update_domain,
+    local_update_domain,
+    update_domain,
+    workflow_result,
+)
+from ..views import (
+    process_workflow_chain,
+    run_workflow_chain,
+    workflow_timeout,
+)
+
+
+class TestWorkflowChain(SimpleTestCase):
+
+    @patch('domain_api.views.chain')
+    def test_last_result_only(self, mock_chain):
+        workflow = [MagicMock(), MagicMock(), MagicMock()]
+        result = mock_chain.return_value.return_value
+        result.parent = None
+        result.get.return_value = {"domain": "test-new-domain.xyz"}
+        self.assertEqual(run_workflow_chain(workflow),
+                         {"domain": "test-new-domain.xyz"})
+        self.assertEqual(result.get.call_args[1]["timeout"],
+                         workflow_timeout(workflow))
+        sent = mock_chain.call_args[0][0]
+        self.assertEqual(sent[:3], workflow)
+        self.assertEqual(sent[3].task, "domain_api.tasks.workflow_result",
+                         "Chain ends with the task publishing the result")
+
+    def test_parent_error_mapped(self):
+        # Errors raised in the worker come back as rebuilt exception types.
+        remote_errors = (
+            (type("DomainNotAvailable", (Exception,), {}), DomainNotAvailable),
+            (type("EppError", (Exception,), {}), EppError),
+        )
+        for remote, local in remote_errors:
+            chained_workflow = MagicMock(parent=None)
+            chained_workflow.get.side_effect = remote("failed")
+            with self.assertRaises(local):
+                process_workflow_chain(chained_workflow)
+
+    @override_settings(EPP_COMMAND_TIMEOUTS={"default": 30,
+                                             "createDomain": 60},
+                       EPP_REGISTRY_COMMAND_TIMEOUTS={
+                           "centralnic-test": {"createContact": 40}
+                       },
+                       WORKFLOW_WAIT_TIMEOUT=120)
+    def test_workflow_timeout(self):
+        def steps(*names):
+            return [MagicMock(task="domain_api.tasks." + i) for i in names]
+        self.assertEqual(
+            workflow_timeout(steps("create_domain_prerequisites",
+                                   "create_domain",
+                                   "connect_domain")),
+            100,
+            "Command timeout of each step, the slowest registry's"
+        )
+        self.assertEqual(workflow_timeout(steps("init_update_domain",
+                                                "local_update_domain")),
+                         30, "At least the default command timeout")
+        self.assertEqual(workflow_timeout(steps(*["create_domain"] * 3)),
+                         120, "No more than WORKFLOW_WAIT_TIMEOUT")
+
+    def test_timeout(self):
+        chained_workflow = MagicMock(parent=None)
+        chained_workflow.get.side_effect = CeleryTimeoutError()
+        with self.assertRaises(EppTimeout):
+            process_workflow_chain(chained_workflow, 1)
+
+
+class TestWorkflowResults(TestCase):
+
+    """
+    Run tasks through the tracer a worker runs them with, to see what they
+    publish to the result backend.
+    """
+
+    def trace(self, task, args):
+        backend = MagicMock()
+        with patch.object(task, '_backend', backend):
+            tracer = build_tracer(task.name, task, eager=False, app=app)
+            tracer("task-1", args, {},
+                   request={"id": "task-1", "reply_to": "web-process"})
+        return backend
+
+    def test_step_result_not_published(self):
+        backend = self.trace(init_update_domain,
+                             ({"name": "test-something.bar"},))
+        backend.store_result.assert_not_called()
+        self.assertFalse(backend.mark_as_done.call_args[0][3],
+                         "Result of a step not published")
+
+    @patch('domain_api.tasks.DomainAction')
+    def test_step_error_published(self, mock_action):
+        mock_action.return_value.update.side_effect = EppError("Failed")
+        backend = self.trace(update_domain,
+                             ({"name": "test-something.bar"},
+                              "centralnic-test"))
+        self.assertTrue(backend.mark_as_failure.call_args[1]["store_result"],
+                        "Error of a step published")
+
+    def test_workflow_result_published(self):
+        backend = self.trace(workflow_result, ({"domain": "a.xyz"},))
+        args = backend.mark_as_done.call_args[0]
+        self.assertEqual(args[1], {"domain": "a.xyz"})
+        self.assertTrue(args[3], "Result of the chain published")
+
+
+class TestWorkflowChainEager(TestSetup):
+
+    """
+    Run a real chain, in process, with a step failing halfway.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.always_eager = app.conf.task_always_eager
+        app.conf.task_always_eager = True
+
+    def tearDown(self):
+        app.conf.task_always_eager = self.always_eager
+        super().tearDown()
+
+    @patch('domain_api.tasks.DomainAction')
+    def test_failed_middle_step(self, mock_action):
+        mock_action.return_value.update.side_effect = EppError("Failed")
+        workflow = [
+            init_update_domain.si({"name": "test-something.bar",
+                                   "add": {"ns": ["ns1.test-08.com"]}}),
+            update_domain.s(registry="centralnic-test"),
+            local_update_domain.s(),
+        ]
+        with self.assertRaises(EppError):
+            run_workflow_chain(workflow)
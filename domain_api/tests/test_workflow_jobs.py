@@ -0,0 +1,121 @@
+from unittest.mock import MagicMock, patch
+import json
+from django.test import SimpleTestCase
+from .test_setup import TestSetup
+from ..exceptions import DomainNotAvailable, EppError, EppObjectDoesNotExist
+from ..models import WorkflowJob
+from ..utilities.jobs import (
+    job_error,
+    job_step_failed,
+    job_step_started,
+    job_step_succeeded,
+    prefers_async,
+)
+
+
+class TestJobHelpers(SimpleTestCase):
+
+    def test_prefers_async(self):
+        for prefer, expected in (("respond-async", True),
+                                 ("return=minimal, respond-async", True),
+                                 ("respond-async; wait=10", True),
+                                 ("return=representation", False),
+                                 ("", False)):
+            request = MagicMock(META={"HTTP_PREFER": prefer})
+            self.assertEqual(prefers_async(request), expected, prefer)
+
+    def test_job_error(self):
+        self.assertEqual(job_error(DomainNotAvailable("taken")),
+                         (400, "Domain not available"))
+        self.assertEqual(job_error(EppObjectDoesNotExist("gone")),
+                         (404, "gone"))
+        self.assertEqual(job_error(EppError("Auth error")),
+                         (400, "Auth error"))
+        self.assertEqual(job_error(ValueError("bug")),
+                         (500, "Workflow error"))
+
+
+class TestWorkflowJobs(TestSetup):
+
+    def create_job(self, steps=3):
+        job = WorkflowJob.objects.create(user=self.test_customer_user,
+                                         action="create_domain",
+                                         name="test-new-domain.xyz")
+        for position in range(steps):
+            job.steps.create(position=position,
+                             task_id="task-%d" % position,
+                             task="domain_api.tasks.step_%d" % position)
+        return job
+
+    def task(self, task_id):
+        return MagicMock(request=MagicMock(id=task_id))
+
+    @patch('domain_api.utilities.jobs.chain')
+    def test_create_domain_async(self, mock_chain):
+        jwt_header = self.api_login()
+        response = self.client.post(
+            '/v1/domains/',
+            data=json.dumps({"domain": "test-new-domain.xyz"}),
+            content_type='application/json',
+            HTTP_AUTHORIZATION=jwt_header,
+            HTTP_PREFER='respond-async'
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response["Preference-Applied"], "respond-async")
+        job = WorkflowJob.objects.get(pk=response.data["id"])
+        self.assertTrue(response["Location"].endswith(
+            "/v1/jobs/%s/" % job.pk
+        ))
+        self.assertEqual(job.status, WorkflowJob.PENDING)
+        workflow = mock_chain.call_args[0][0]
+        self.assertEqual(
+            [i.options["task_id"] for i in workflow],
+            list(job.steps.values_list('task_id', flat=True)),
+            "Every task runs under the id of its step"
+        )
+        mock_chain.return_value.apply_async.assert_called_once_with()
+
+    def test_job_succeeds(self):
+        job = self.create_job()
+        job_step_started(task_id="task-0")
+        job.refresh_from_db()
+        self.assertEqual(job.status, WorkflowJob.RUNNING)
+        job_step_succeeded(sender=self.task("task-0"), result=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, WorkflowJob.RUNNING,
+                         "Later steps still to run")
+        job_step_succeeded(sender=self.task("task-1"), result={})
+        job_step_succeeded(sender=self.task("task-2"),
+                           result={"domain": "test-new-domain.xyz"})
+        job.refresh_from_db()
+        self.assertEqual(job.status, WorkflowJob.SUCCEEDED)
+        self.assertEqual(job.result, {"domain": "test-new-domain.xyz"})
+        self.assertEqual(
+            set(job.steps.values_list('status', flat=True)),
+            {WorkflowJob.SUCCEEDED}
+        )
+
+    def test_job_fails(self):
+        job = self.create_job()
+        job_step_failed(task_id="task-0",
+                        exception=DomainNotAvailable("taken"))
+        job.refresh_from_db()
+        self.assertEqual(job.status, WorkflowJob.FAILED)
+        self.assertEqual(job.error_status, 400)
+        self.assertEqual(job.error, "Domain not available")
+        self.assertEqual(job.steps.get(position=0).error, "taken")
+
+    def test_unrelated_task_ignored(self):
+        with self.assertNumQueries(1):
+            job_step_started(task_id="not-a-job-task")
+
+    def test_job_visible_to_owner_only(self):
+        job = self.create_job()
+        self.login_client()
+        response = self.client.get('/v1/jobs/%s/' % job.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([i["task"] for i in response.data["steps"]],
+                         ["domain_api.tasks.step_%d" % i for i in range(3)])
+        self.client.force_login(self.user)
+        response = self.client.get('/v1/jobs/%s/' % job.pk)
+        self.assertEqual(response.status_code, 404)
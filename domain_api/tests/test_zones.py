@@ -0,0 +1,55 @@
+from django.test import SimpleTestCase
+from .test_setup import TestSetup
+from ..exceptions import InvalidTld
+from ..models import TopLevelDomain
+from ..utilities.domain import parse_domain
+from ..utilities.zones import ZoneTrie, get_zone_trie, parse_domains
+
+
+class TestZoneTrie(SimpleTestCase):
+
+    def setUp(self):
+        self.trie = ZoneTrie(["nz", "co.nz", "xyz"])
+
+    def test_longest_match(self):
+        self.assertEqual(self.trie.parse("example.co.nz"),
+                         {"domain": "example", "zone": "co.nz"})
+        self.assertEqual(self.trie.parse("example.nz"),
+                         {"domain": "example", "zone": "nz"})
+
+    def test_zone_needs_name_in_front(self):
+        self.assertEqual(self.trie.parse("co.nz"),
+                         {"domain": "co", "zone": "nz"})
+
+    def test_subdomain_ignored(self):
+        self.assertEqual(self.trie.parse("www.example.xyz"),
+                         {"domain": "example", "zone": "xyz"})
+
+    def test_invalid(self):
+        for fqdn in ("example.com", "nz", "xyz", ".xyz"):
+            with self.assertRaises(InvalidTld):
+                self.trie.parse(fqdn)
+
+
+class TestParseDomains(TestSetup):
+
+    def test_no_queries_once_built(self):
+        get_zone_trie()
+        with self.assertNumQueries(0):
+            parsed = parse_domains(["example.co.nz", "Test.XYZ", "täst.ote"])
+        self.assertEqual(
+            parsed,
+            [{"domain": "example", "zone": "co.nz"},
+             {"domain": "test", "zone": "xyz"},
+             {"domain": "xn--tst-qla", "zone": "ote"}],
+            "Batch of names parsed"
+        )
+
+    def test_rebuilt_on_save(self):
+        """
+        A new zone can be used straight after it is saved.
+        """
+        with self.assertRaises(InvalidTld):
+            parse_domain("example.ac.nz")
+        TopLevelDomain.objects.create(zone="ac.nz", description="Academic")
+        self.assertEqual(parse_domain("example.ac.nz")["zone"], "ac.nz")
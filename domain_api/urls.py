@@ -18,6 +18,7 @@ router.register(
 router.register(r'nameservers', views.NameserverViewSet, 'nameserver')
 router.register(r'domain-contacts', views.DomainContactViewSet, "domaincontact")
 router.register(r'users', views.UserViewSet)
+router.register(r'jobs', views.WorkflowJobViewSet, 'job')
 router.register(r'default-templates', views.DefaultAccountTemplateViewSet,
                 'defaultaccounttemplate')
 router.register(r'default-contacts', views.DefaultAccountContactViewSet,
@@ -0,0 +1,140 @@
+"""
+Maintain the DomainAccess table.
+
+Each registered domain gets one row for the user owning its registrant and
+one per active contact, keyed by the contact type. The rows are recomputed
+from the registrant and contacts whenever either side changes, so views can
+check ownership with a single indexed lookup.
+"""
+import logging
+
+from django.db.models import Q
+
+from ..models import (
+    DomainAccess,
+    DomainContact,
+    RegisteredDomain,
+)
+
+log = logging.getLogger(__name__)
+
+
+def expected_domain_access(registered_domain_id):
+    """
+    Work out who should have access to a domain.
+
+    :registered_domain_id: int id of RegisteredDomain
+    :returns: set of (user_id, role) tuples
+
+    """
+    access = set(
+        (user_id, DomainAccess.REGISTRANT)
+        for user_id in RegisteredDomain.objects.filter(
+            pk=registered_domain_id
+        ).values_list('registrant__user_id', flat=True)
+    )
+    access.update(
+        DomainContact.objects.filter(
+            registered_domain_id=registered_domain_id,
+            active=True
+        ).values_list('contact__user_id', 'contact_type__name')
+    )
+    return access
+
+
+def synchronise_domain_access(registered_domain_id):
+    """
+    Bring the access rows of a domain in line with its registrant and
+    contacts.
+
+    :registered_domain_id: int id of RegisteredDomain
+
+    """
+    expected = expected_domain_access(registered_domain_id)
+    existing = set(
+        DomainAccess.objects.filter(
+            registered_domain_id=registered_domain_id
+        ).values_list('user_id', 'role')
+    )
+    stale = existing - expected
+    if stale:
+        condition = Q()
+        for user_id, role in stale:
+            condition |= Q(user_id=user_id, role=role)
+        DomainAccess.objects.filter(
+            condition,
+            registered_domain_id=registered_domain_id
+        ).delete()
+    missing = expected - existing
+    if missing:
+        DomainAccess.objects.bulk_create([
+            DomainAccess(user_id=user_id,
+                         registered_domain_id=registered_domain_id,
+                         role=role)
+            for user_id, role in missing
+        ])
+    if stale or missing:
+        log.debug({"registered_domain": registered_domain_id,
+                   "removed": len(stale),
+                   "added": len(missing)})
+
+
+def registered_domain_access(sender, instance, raw=False, **kwargs):
+    """
+    Signal handler for saved RegisteredDomain objects.
+    """
+    if raw:
+        return
+    synchronise_domain_access(instance.pk)
+
+
+def domain_contact_access(sender, instance, raw=False, **kwargs):
+    """
+    Signal handler for saved or deleted DomainContact objects.
+    """
+    if raw:
+        return
+    synchronise_domain_access(instance.registered_domain_id)
+
+
+def registrant_access(sender, instance, raw=False, **kwargs):
+    """
+    Signal handler for saved Registrant objects.
+
+    Only does work when the registrant has been handed to another user.
+    """
+    if raw:
+        return
+    stale = DomainAccess.objects.filter(
+        registered_domain__registrant=instance,
+        role=DomainAccess.REGISTRANT
+    ).exclude(user_id=instance.user_id).values_list('registered_domain_id',
+                                                    flat=True)
+    for registered_domain_id in set(stale):
+        synchronise_domain_access(registered_domain_id)
+
+
+def contact_access(sender, instance, raw=False, **kwargs):
+    """
+    Signal handler for saved Contact objects.
+
+    Only does work when the contact has been handed to another user.
+    """
+    if raw:
+        return
+    roles = set(
+        DomainContact.objects.filter(
+            contact=instance,
+            active=True
+        ).values_list('registered_domain_id', 'contact_type__name')
+    )
+    if not roles:
+        return
+    granted = set(
+        DomainAccess.objects.filter(
+            registered_domain_id__in=set(i for i, _ in roles),
+            user_id=instance.user_id
+        ).values_list('registered_domain_id', 'role')
+    )
+    for registered_domain_id in set(i for i, _ in roles - granted):
+        synchronise_domain_access(registered_domain_id)
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import logging
+import uuid
+import weakref
+
+from django.conf import settings
+
+from ..exceptions import EppTimeout
+from .rpc_client import get_command_timeout, process_response
+
+log = logging.getLogger(__name__)
+
+
+class AsyncEppRpcClient(object):
+    """
+    asyncio counterpart of EppRpcClient.
+
+    One client keeps a single AMQP connection and callback queue open and
+    can have any number of commands in flight on it; each ``call`` is a
+    coroutine that resolves when the matching reply arrives.
+    """
+    def __init__(self,
+                 host=None,
+                 port=None,
+                 login=None,
+                 password=None,
+                 vhost=None,
+                 exchange="epp",
+                 loop=None):
+        self.host = host or settings.RABBITMQ_HOST
+        self.port = int(port or settings.RABBITMQ_PORT)
+        self.login = login or settings.RABBITMQ_USER
+        self.password = password or settings.RABBITMQ_PASSWORD
+        self.vhost = vhost or settings.RABBITMQ_VHOST
+        self.exchange = exchange
+        self.loop = loop or asyncio.get_event_loop()
+        self.transport = None
+        self.protocol = None
+        self.channel = None
+        self.callback_queue = None
+        self.pending = {}
+        self._connect_lock = asyncio.Lock(loop=self.loop)
+
+    async def connect(self):
+        """
+        Open the connection and callback queue if not already open.
+        """
+        async with self._connect_lock:
+            if self.channel is not None and self.channel.is_open:
+                return
+            import aioamqp
+            self.transport, self.protocol = await aioamqp.connect(
+                host=self.host,
+                port=self.port,
+                login=self.login,
+                password=self.password,
+                virtualhost=self.vhost,
+                loop=self.loop
+            )
+            self.channel = await self.protocol.channel()
+            result = await self.channel.queue_declare(queue_name='',
+                                                      exclusive=True)
+            self.callback_queue = result['queue']
+            await self.channel.basic_consume(self.on_response,
+                                             no_ack=True,
+                                             queue_name=self.callback_queue)
+
+    async def on_response(self, channel, body, envelope, properties):
+        future = self.pending.pop(properties.correlation_id, None)
+        if future is None or future.done():
+            log.debug("Discarding reply for unknown correlation id %s"
+                      % properties.correlation_id)
+            return
+        try:
+            future.set_result(process_response(body))
+        except Exception as e:
+            future.set_exception(e)
+
+    async def call(self, routing_key, command, data, timeout=None):
+        """
+        Send a command and wait for the reply.
+
+        :routing_key: str registry slug
+        :command: str EPP command
+        :data: dict EPP payload
+        :timeout: float seconds to wait for the reply
+        :returns: dict response data
+
+        """
+        if timeout is None:
+            timeout = get_command_timeout(routing_key, command)
+        await self.connect()
+        correlation_id = str(uuid.uuid4())
+        future = asyncio.Future(loop=self.loop)
+        self.pending[correlation_id] = future
+        try:
+            await self.channel.basic_publish(
+                payload=json.dumps({"command": command, "data": data}),
+                exchange_name=self.exchange,
+                routing_key=routing_key,
+                properties={
+                    "reply_to": self.callback_queue,
+                    "correlation_id": correlation_id,
+                }
+            )
+            return await asyncio.wait_for(future, timeout, loop=self.loop)
+        except asyncio.TimeoutError:
+            raise EppTimeout("No reply to %s within %ss" % (command, timeout))
+        finally:
+            self.pending.pop(correlation_id, None)
+
+    async def close(self):
+        """
+        Close the connection, failing anything still in flight.
+        """
+        pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.cancel()
+        if self.protocol is not None:
+            await self.protocol.close()
+            self.transport.close()
+        self.channel = None
+        self.protocol = None
+        self.transport = None
+
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_rpc_client(loop=None):
+    """
+    Return the shared client for an event loop.
+
+    :loop: asyncio event loop, defaults to the current one
+    :returns: AsyncEppRpcClient object
+
+    """
+    loop = loop or asyncio.get_event_loop()
+    client = _clients.get(loop)
+    if client is None:
+        if settings.EPP_RPC_TRANSPORT == "fake":
+            from .fake_registry import FakeAsyncRpcClient, get_fake_registry
+            client = FakeAsyncRpcClient(get_fake_registry())
+        else:
+            client = AsyncEppRpcClient(loop=loop)
+        _clients[loop] = client
+    return client
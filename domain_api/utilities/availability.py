@@ -0,0 +1,184 @@
+"""
+Read-through cache for domain availability checks.
+
+Results are keyed by the normalised (IDNA encoded, lower case) fqdn and kept
+for AVAILABILITY_CACHE_AVAILABLE_TTL or AVAILABILITY_CACHE_TAKEN_TTL seconds
+depending on the answer. Only names missing from the cache are sent to the
+registry. Anything that registers or changes a domain through us should
+call ``invalidate_availability`` so the next check goes to the registry.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import idn
+
+log = logging.getLogger(__name__)
+
+KEY_PREFIX = "availability"
+HITS_KEY = "availability-stats:hits"
+MISSES_KEY = "availability-stats:misses"
+
+
+def normalise_fqdn(fqdn):
+    """
+    Return the form of a domain name used for cache keys.
+
+    :fqdn: str domain name, possibly unicode
+    :returns: str lower case ascii domain name
+
+    """
+    return idn.encode(fqdn.rstrip(".")).lower()
+
+
+def availability_cache_key(fqdn):
+    """
+    Return the cache key for a normalised fqdn. Hashed so that long names
+    stay inside memcached's key length limit.
+
+    :fqdn: str normalised domain name
+    :returns: str cache key
+
+    """
+    digest = hashlib.sha1(fqdn.encode("utf-8")).hexdigest()
+    return ":".join([KEY_PREFIX, digest])
+
+
+def _count(key, delta):
+    if not delta:
+        return
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Counter not set yet (or memcached is unreachable, in which case
+        # the add fails quietly too).
+        cache.add(key, delta, None)
+
+
+def get_availability_stats():
+    """
+    Return cache hit and miss counts since the counters were last reset.
+
+    :returns: dict with hits, misses and hit ratio
+
+    """
+    counts = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = counts.get(HITS_KEY, 0)
+    misses = counts.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "ratio": hits / total if total else 0.0,
+    }
+
+
+def reset_availability_stats():
+    """
+    Reset the hit and miss counters.
+    """
+    cache.delete_many([HITS_KEY, MISSES_KEY])
+
+
+def get_cached_availability(fqdns):
+    """
+    Look up availability results in the cache.
+
+    :fqdns: list of normalised domain names
+    :returns: tuple of dict fqdn -> cached result and list of names missing
+
+    """
+    keys = {availability_cache_key(fqdn): fqdn for fqdn in fqdns}
+    cached = cache.get_many(list(keys.keys()))
+    found = {keys[key]: result for key, result in cached.items()}
+    misses = [fqdn for fqdn in fqdns if fqdn not in found]
+    return found, misses
+
+
+def cache_availability(results):
+    """
+    Store availability results from a check domain response.
+
+    :results: list of dict results as returned by check_domain
+
+    """
+    for result in results:
+        if result["available"]:
+            ttl = settings.AVAILABILITY_CACHE_AVAILABLE_TTL
+        else:
+            ttl = settings.AVAILABILITY_CACHE_TAKEN_TTL
+        if ttl:
+            fqdn = normalise_fqdn(result["domain"])
+            cache.set(availability_cache_key(fqdn), result, ttl)
+
+
+def invalidate_availability(*fqdns):
+    """
+    Drop cached availability for domains we have just created or changed.
+
+    :*fqdns: one or more domain names
+
+    """
+    cache.delete_many([availability_cache_key(normalise_fqdn(fqdn))
+                       for fqdn in fqdns])
+
+
+def get_availability_query(fqdns):
+    """
+    Return what cache misses are checked with. A single name goes through
+    the shared batcher when AVAILABILITY_BATCH_WINDOW is set, so it can
+    share a command with other requests checking at the same time. Names
+    that already make up a batch are sent in one plain domain query.
+
+    :fqdns: list of normalised domain names to check
+    :returns: object with check_domain(*fqdns)
+
+    """
+    if settings.AVAILABILITY_BATCH_WINDOW and len(fqdns) == 1:
+        from .check_batcher import get_check_batcher
+        return get_check_batcher()
+    from ..epp.queries import Domain as DomainQuery
+    return DomainQuery()
+
+
+def check_availability(fqdns, query=None):
+    """
+    Check availability of domains, asking the registry only for names that
+    are not cached. All names must belong to the same registry.
+
+    :fqdns: list of domain names
+    :query: Domain query object used for cache misses
+    :returns: list of dict results in the order requested
+
+    """
+    names = []
+    for fqdn in fqdns:
+        name = normalise_fqdn(fqdn)
+        if name not in names:
+            names.append(name)
+    results, misses = get_cached_availability(names)
+    _count(HITS_KEY, len(results))
+    _count(MISSES_KEY, len(misses))
+    log.debug({"msg": "Availability cache lookup",
+               "hits": len(results),
+               "misses": len(misses)})
+    if misses:
+        if query is None:
+            query = get_availability_query(misses)
+        availability = query.check_domain(*misses)
+        cache_availability(availability["result"])
+        for result in availability["result"]:
+            results[normalise_fqdn(result["domain"])] = result
+    return [results[name] for name in names if name in results]
+
+
+def invalidate_registered_domain(sender, instance, **kwargs):
+    """
+    Signal handler dropping cached availability when a registered domain
+    is saved or deleted.
+    """
+    if kwargs.get("raw"):
+        return
+    invalidate_availability(instance.fqdn)
@@ -0,0 +1,425 @@
+"""
+Register or update a batch of domains as a single job.
+
+The names are grouped by registry. For registrations each registry gets
+one availability check for all of its names, sent straight to the registry
+rather than answered from the availability cache. The registrant and
+contacts are resolved, or created, once for the registry rather than once
+per domain. The domains are then created at most BULK_CREATE_CONCURRENCY
+at a time per registry. A domain created at the registry is recorded as
+such before it is connected in our database, so a resumed job only
+connects it rather than creating it again.
+
+Updates apply one change set to every domain. Each domain's EPP update is
+worked out against its current state when its turn comes, with the same
+workflow as a single update, and at most BULK_UPDATE_CONCURRENCY run at a
+time per registry.
+
+Every domain has a WorkflowJobItem holding its own outcome, so one failure
+does not fail the batch. Only unfinished items are handled, which makes
+sending the job's task again resume it.
+"""
+import copy
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from ..epp.queries import Domain as DomainQuery
+from ..exceptions import DomainNotAvailable
+from ..models import RegisteredDomain, WorkflowJob, WorkflowJobItem
+from .availability import normalise_fqdn
+from .domain import get_domain_registries
+from .jobs import job_error, json_result
+
+log = logging.getLogger(__name__)
+
+UNFINISHED = (WorkflowJob.PENDING, WorkflowJob.RUNNING,
+              WorkflowJobItem.CREATED)
+
+
+def bulk_domain_names(data):
+    """
+    Return the domains listed in a bulk request, in the form they are
+    stored in (IDNA encoded, lower case). At most BULK_MAX_DOMAINS may be
+    listed.
+
+    :data: dict request data with a domains list
+    :returns: list of str domains without duplicates, in request order
+
+    """
+    domains = data["domains"]
+    if not isinstance(domains, list) or not domains:
+        raise ValueError("domains must be a list of domain names")
+    if len(domains) > settings.BULK_MAX_DOMAINS:
+        raise ValueError("At most %d domains per request" %
+                         settings.BULK_MAX_DOMAINS)
+    names = []
+    for domain in domains:
+        if not isinstance(domain, str) or not domain.strip():
+            raise ValueError("Invalid domain %r" % domain)
+        name = normalise_fqdn(domain.strip())
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def run_concurrently(func, calls, max_workers):
+    """
+    Call a function once per argument tuple, at most max_workers at a time.
+
+    Runs in the calling thread when there is nothing to run side by side.
+
+    :func: function to call
+    :calls: list of argument tuples
+    :max_workers: int number of threads
+    :returns: list of results in the order of calls
+
+    """
+    calls = list(calls)
+    if max_workers <= 1 or len(calls) <= 1:
+        return [func(*args) for args in calls]
+
+    def run(args):
+        try:
+            return func(*args)
+        finally:
+            # Django opens a connection per thread; do not leave it behind.
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=min(max_workers,
+                                            len(calls))) as executor:
+        futures = [executor.submit(run, args) for args in calls]
+    return [future.result() for future in futures]
+
+
+def _available(result):
+    available = result["available"]
+    return str(available) in ("1", "true") or available is True
+
+
+def update_item(job_id, name, status, result=None, exception=None):
+    """
+    Record the outcome of one domain of a bulk job.
+
+    :job_id: uuid of WorkflowJob
+    :name: str domain
+    :status: str WorkflowJob status
+    :result: task result
+    :exception: Exception the domain failed with
+
+    """
+    values = {"status": status,
+              "result": json_result(result),
+              "error_status": None,
+              "error": None,
+              "updated": timezone.now()}
+    if exception is not None:
+        values["error_status"], values["error"] = job_error(exception)
+    WorkflowJobItem.objects.filter(job_id=job_id, name=name).update(**values)
+
+
+def shared_create_epp(registry, data, user):
+    """
+    Resolve the registrant and contacts of a batch once for a registry,
+    creating them at the registry if need be.
+
+    :registry: str registry slug
+    :data: dict request data, as for a single create domain request
+    :user: User object
+    :returns: dict create domain command without the domain name
+
+    """
+    from ..tasks import create_domain_prerequisites
+    from ..workflows import workflow_factory
+    epp = {}
+    if "nameservers" in data:
+        epp["ns"] = data["nameservers"]
+    if "period" in data:
+        epp["period"] = data["period"]
+    workflow_manager = workflow_factory(registry)()
+    workflow_manager.create_registrant_workflow(epp, data, user)
+    workflow_manager.create_contact_workflow(epp, data, user)
+    if workflow_manager.workflow:
+        epp = create_domain_prerequisites(epp, workflow_manager.workflow)
+    return epp
+
+
+def check_registry_availability(registry, fqdns):
+    """
+    Ask a registry whether domains are available, in one command.
+
+    The availability cache and the check batcher are left out: a cached
+    answer may be out of date by the time the domain is registered.
+
+    :registry: str registry slug
+    :fqdns: list of str domains
+    :returns: dict of normalised fqdn -> Boolean
+
+    """
+    names = [normalise_fqdn(fqdn) for fqdn in fqdns]
+    availability = DomainQuery().check_registry_domain(registry, *names)
+    return {normalise_fqdn(i["domain"]): _available(i)
+            for i in availability["result"]}
+
+
+def connect_bulk_domain(job_id, registry, fqdn, created):
+    """
+    Connect a domain of a bulk job that was created at the registry.
+
+    If connecting fails the item stays created, with the error, so that
+    resuming the job connects it again without creating it again.
+
+    :job_id: uuid of WorkflowJob
+    :registry: str registry slug
+    :fqdn: str domain
+    :created: dict create domain result
+
+    """
+    from ..tasks import connect_domain
+    try:
+        result = connect_domain(copy.deepcopy(created), registry)
+    except Exception as e:
+        log.error({"message": "Bulk connect failed",
+                   "domain": fqdn,
+                   "error": str(e)}, exc_info=True)
+        update_item(job_id, fqdn, WorkflowJobItem.CREATED, created, e)
+        return
+    update_item(job_id, fqdn, WorkflowJob.SUCCEEDED, result)
+
+
+def create_bulk_domain(job_id, registry, fqdn, epp):
+    """
+    Create and connect one domain of a bulk job.
+
+    :job_id: uuid of WorkflowJob
+    :registry: str registry slug
+    :fqdn: str domain
+    :epp: dict create domain command shared by the batch
+
+    """
+    from ..tasks import create_domain
+    epp = copy.deepcopy(epp)
+    epp["name"] = fqdn
+    update_item(job_id, fqdn, WorkflowJob.RUNNING)
+    try:
+        created = create_domain(epp, registry)
+    except Exception as e:
+        log.error({"message": "Bulk create failed",
+                   "domain": fqdn,
+                   "error": str(e)}, exc_info=True)
+        update_item(job_id, fqdn, WorkflowJob.FAILED, exception=e)
+        return
+    update_item(job_id, fqdn, WorkflowJobItem.CREATED, created)
+    connect_bulk_domain(job_id, registry, fqdn, created)
+
+
+def create_registry_domains(job_id, registry, fqdns, data, user,
+                            created=None):
+    """
+    Create the domains of a bulk job that belong to one registry.
+
+    :job_id: uuid of WorkflowJob
+    :registry: str registry slug
+    :fqdns: list of str domains
+    :data: dict request data
+    :user: User object
+    :created: dict of fqdn -> create result for domains already created
+              at the registry, which are only connected
+
+    """
+    created = created or {}
+    run_concurrently(connect_bulk_domain,
+                     [(job_id, registry, fqdn, created[fqdn])
+                      for fqdn in fqdns if fqdn in created],
+                     settings.BULK_CREATE_CONCURRENCY)
+    fqdns = [fqdn for fqdn in fqdns if fqdn not in created]
+    if not fqdns:
+        return
+    try:
+        checked = check_registry_availability(registry, fqdns)
+    except Exception as e:
+        log.error(str(e), exc_info=True)
+        for fqdn in fqdns:
+            update_item(job_id, fqdn, WorkflowJob.FAILED, exception=e)
+        return
+    available = []
+    for fqdn in fqdns:
+        if checked.get(normalise_fqdn(fqdn)):
+            available.append(fqdn)
+        else:
+            update_item(job_id, fqdn, WorkflowJob.FAILED,
+                        exception=DomainNotAvailable("%s not available" %
+                                                     fqdn))
+    if not available:
+        return
+    try:
+        epp = shared_create_epp(registry, data, user)
+    except Exception as e:
+        log.error(str(e), exc_info=True)
+        for fqdn in available:
+            update_item(job_id, fqdn, WorkflowJob.FAILED, exception=e)
+        return
+    run_concurrently(create_bulk_domain,
+                     [(job_id, registry, fqdn, epp) for fqdn in available],
+                     settings.BULK_CREATE_CONCURRENCY)
+
+
+def job_item_counts(job_id):
+    """
+    Count the items of a bulk job by status.
+
+    :job_id: uuid of WorkflowJob
+    :returns: dict of status -> int
+
+    """
+    counts = {status: 0 for status, _ in WorkflowJob.STATUS_CHOICES}
+    counts.update(
+        WorkflowJobItem.objects.filter(
+            job_id=job_id
+        ).values_list('status').annotate(Count('id')).order_by()
+    )
+    return counts
+
+
+def group_by_registry(fqdns):
+    """
+    Group domains by the registry they are routed to.
+
+    :fqdns: list of str domains
+    :returns: dict of registry slug -> list of str domains
+
+    """
+    registries = get_domain_registries(fqdns)
+    by_registry = {}
+    for fqdn in fqdns:
+        by_registry.setdefault(registries[fqdn].slug, []).append(fqdn)
+    return by_registry
+
+
+def unfinished_items(job):
+    """
+    Return the domains of a bulk job still to be handled.
+
+    :job: WorkflowJob object
+    :returns: list of str domains
+
+    """
+    return list(WorkflowJobItem.objects.filter(
+        job=job,
+        status__in=UNFINISHED
+    ).values_list('name', flat=True))
+
+
+def create_domains(job):
+    """
+    Create the unfinished domains of a bulk job. Domains already created at
+    the registry are only connected.
+
+    :job: WorkflowJob object, with the request data in parameters
+    :returns: dict of item counts by status
+
+    """
+    created = dict(WorkflowJobItem.objects.filter(
+        job=job,
+        status=WorkflowJobItem.CREATED
+    ).values_list('name', 'result'))
+    by_registry = group_by_registry(unfinished_items(job))
+    run_concurrently(
+        create_registry_domains,
+        [(job.pk, registry, names, job.parameters, job.user, created)
+         for registry, names in by_registry.items()],
+        len(by_registry)
+    )
+    return job_item_counts(job.pk)
+
+
+def run_inline(workflow):
+    """
+    Run a list of signatures one after another in this process, passing
+    each result on like a chain does.
+
+    :workflow: list of celery signatures, in chain order
+    :returns: result of the last signature
+
+    """
+    result = None
+    for position, signature in enumerate(workflow):
+        if position == 0 or signature.immutable:
+            args = ()
+        else:
+            args = (result,)
+        result = signature.apply(args=args, throw=True).get()
+    return result
+
+
+def update_bulk_domain(job_id, registry, fqdn, data, user):
+    """
+    Update one domain of a bulk job.
+
+    :job_id: uuid of WorkflowJob
+    :registry: str registry slug
+    :fqdn: str domain
+    :data: dict change set shared by the batch
+    :user: User object
+
+    """
+    from ..workflows import workflow_factory
+    update_item(job_id, fqdn, WorkflowJob.RUNNING)
+    try:
+        registered_domain = RegisteredDomain.objects.get(fqdn=fqdn,
+                                                         active=True)
+        workflow_manager = workflow_factory(registry)()
+        workflow = workflow_manager.update_domain(dict(data, domain=fqdn),
+                                                  registered_domain,
+                                                  user)
+        if not workflow:
+            result = {"msg": "No change to domain"}
+        else:
+            result = run_inline(workflow)
+    except Exception as e:
+        log.error({"message": "Bulk update failed",
+                   "domain": fqdn,
+                   "error": str(e)}, exc_info=True)
+        update_item(job_id, fqdn, WorkflowJob.FAILED, exception=e)
+        return
+    update_item(job_id, fqdn, WorkflowJob.SUCCEEDED, result)
+
+
+def update_registry_domains(job_id, registry, fqdns, data, user):
+    """
+    Update the domains of a bulk job that belong to one registry.
+
+    :job_id: uuid of WorkflowJob
+    :registry: str registry slug
+    :fqdns: list of str domains
+    :data: dict change set
+    :user: User object
+
+    """
+    run_concurrently(
+        update_bulk_domain,
+        [(job_id, registry, fqdn, data, user) for fqdn in fqdns],
+        settings.BULK_UPDATE_CONCURRENCY
+    )
+
+
+def update_domains(job):
+    """
+    Update the unfinished domains of a bulk job.
+
+    :job: WorkflowJob object, with the change set in parameters
+    :returns: dict of item counts by status
+
+    """
+    by_registry = group_by_registry(unfinished_items(job))
+    run_concurrently(
+        update_registry_domains,
+        [(job.pk, registry, names, job.parameters, job.user)
+         for registry, names in by_registry.items()],
+        len(by_registry)
+    )
+    return job_item_counts(job.pk)
@@ -0,0 +1,74 @@
+"""
+Wait for the result of a workflow chain.
+
+With the rpc:// result backend every task of a chain sent from a process
+replies to that process's one reply queue. Waiting on the last task alone,
+celery consumes the error of a failed earlier step, finds nobody waiting for
+that task and sets the reply aside, so the wait runs into its timeout. Here
+every reply consumed while waiting is looked at, as is any set aside
+before, and the first error of a step of the chain ends the wait.
+"""
+from celery import states
+
+
+def chain_task_ids(chained_workflow):
+    """
+    Return the task ids of a chain.
+
+    :chained_workflow: AsyncResult of the last task
+    :returns: list of str task ids, last task first
+
+    """
+    task_ids = []
+    node = chained_workflow
+    while node is not None:
+        task_ids.append(node.id)
+        node = node.parent
+    return task_ids
+
+
+def raise_step_error(backend, meta):
+    """
+    Raise the error a task result message carries, if any.
+
+    :backend: result backend the message came from
+    :meta: dict task result message, or None
+
+    """
+    if meta and meta.get("status") == states.FAILURE:
+        raise backend.exception_to_python(meta["result"])
+
+
+def wait_for_chain(chained_workflow, timeout):
+    """
+    Wait for the result of the last task of a chain.
+
+    :chained_workflow: AsyncResult of the last task
+    :timeout: float seconds to wait
+    :returns: result of the last task
+    :raises: exception of the first step seen to fail, celery TimeoutError
+             if there is no outcome within the timeout
+
+    """
+    backend = chained_workflow.backend
+    step_ids = set(chain_task_ids(chained_workflow)[1:])
+    # Replies consumed while nobody waited for them; only backends with a
+    # reply consumer (rpc, redis) keep them.
+    set_aside = getattr(backend, "_pending_messages", None)
+    if set_aside is not None:
+        for task_id in step_ids:
+            raise_step_error(backend, set_aside.take(task_id, None))
+
+    def on_message(meta):
+        if meta.get("task_id") in step_ids:
+            raise_step_error(backend, meta)
+
+    try:
+        return chained_workflow.get(follow_parents=False,
+                                    timeout=timeout,
+                                    on_message=on_message)
+    except Exception:
+        # The last task will not publish, or too late for anyone to care.
+        if hasattr(backend, "remove_pending_result"):
+            backend.remove_pending_result(chained_workflow)
+        raise
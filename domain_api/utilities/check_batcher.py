@@ -0,0 +1,145 @@
+"""
+Coalesce concurrent domain availability checks.
+
+EPP check commands take many names at once. Rather than sending one command
+per request, checks arriving within AVAILABILITY_BATCH_WINDOW milliseconds of
+each other are grouped by registry and sent as a single checkDomain. Each
+caller gets back only the results for the names it asked about.
+
+Batching happens per process, so it pays off with threaded workers where
+several requests are in flight in the same process at once.
+"""
+import logging
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+
+from ..exceptions import EppError
+from .domain import get_domain_registry
+
+log = logging.getLogger(__name__)
+
+
+class CheckDomainBatcher(object):
+
+    """
+    Collects names per registry and flushes each batch after a short window
+    or once it reaches the maximum batch size.
+
+    :window: float milliseconds to hold a batch open
+    :max_batch: int most names sent in one command
+    :query_factory: callable returning a Domain query object
+    """
+
+    def __init__(self, window=5, max_batch=20, query_factory=None):
+        self.window = window
+        self.max_batch = max_batch
+        self.query_factory = query_factory
+        self.lock = threading.Lock()
+        # registry slug -> list of (fqdn, Future)
+        self.batches = {}
+
+    def _query(self):
+        if self.query_factory is not None:
+            return self.query_factory()
+        from ..epp.queries import Domain as DomainQuery
+        return DomainQuery()
+
+    def submit(self, fqdn):
+        """
+        Add a name to the batch for its registry.
+
+        :fqdn: str normalised domain name
+        :returns: Future resolving to the availability result for fqdn
+
+        """
+        registry = get_domain_registry(fqdn).slug
+        future = Future()
+        flush_now = False
+        with self.lock:
+            batch = self.batches.get(registry)
+            if batch is None:
+                batch = self.batches[registry] = []
+                timer = threading.Timer(self.window / 1000.0,
+                                        self.flush,
+                                        args=(registry, batch))
+                timer.daemon = True
+                timer.start()
+            batch.append((fqdn, future))
+            if len({name for name, _ in batch}) >= self.max_batch:
+                flush_now = True
+        if flush_now:
+            self.flush(registry, batch)
+        return future
+
+    def flush(self, registry, batch):
+        """
+        Send a batch to its registry and hand out the results. Does nothing
+        if the batch was already sent.
+
+        :registry: str registry slug
+        :batch: list of (fqdn, Future) tuples
+
+        """
+        with self.lock:
+            if self.batches.get(registry) is not batch:
+                return
+            del self.batches[registry]
+        names = []
+        for fqdn, _ in batch:
+            if fqdn not in names:
+                names.append(fqdn)
+        log.debug({"msg": "Sending batched check domain",
+                   "registry": registry,
+                   "names": len(names),
+                   "callers": len(batch)})
+        try:
+            availability = self._query().check_registry_domain(registry,
+                                                               *names)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        results = {i["domain"].lower(): i for i in availability["result"]}
+        for fqdn, future in batch:
+            if fqdn in results:
+                future.set_result(results[fqdn])
+            else:
+                future.set_exception(
+                    EppError("No check result for %s" % fqdn)
+                )
+
+    def check_domain(self, *args):
+        """
+        Check availability of one or more names, sharing registry commands
+        with other callers checking at the same time. Same return value as
+        Domain.check_domain.
+
+        :*args: one or more normalised domain names
+        :returns: dict with set of results indicating availability
+
+        """
+        futures = [self.submit(fqdn) for fqdn in args]
+        return {"result": [future.result() for future in futures]}
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_check_batcher():
+    """
+    Return the batcher shared by this process.
+
+    :returns: CheckDomainBatcher object
+
+    """
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = CheckDomainBatcher(
+                window=settings.AVAILABILITY_BATCH_WINDOW,
+                max_batch=settings.AVAILABILITY_BATCH_SIZE
+            )
+        return _batcher
@@ -1,11 +1,105 @@
-from ..exceptions import InvalidTld, UnsupportedTld
-import idna
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from ..exceptions import UnsupportedTld
 from ..models import (
     TopLevelDomain,
     TopLevelDomainProvider,
     RegisteredDomain,
+    DomainNameserver,
     Nameserver,
 )
+from . import idn
+from .zones import parse_domains
+
+
+NOT_REGISTERED = "not-registered"
+
+
+def routing_cache_key(kind, name):
+    """
+    Return the routing cache key for a zone or registered domain name.
+
+    :kind: str "zone" or "domain"
+    :name: str ascii zone or fqdn
+    :returns: str cache key
+
+    """
+    digest = hashlib.sha1(name.encode("utf-8")).hexdigest()
+    return ":".join(["routing", kind, digest])
+
+
+def get_domain_registries(fqdns):
+    """
+    Fetch the registry for each of a list of domains.
+
+    Domains registered in our system go to the provider they are connected
+    to, anything else to the default provider for its zone. Answers are
+    cached for ROUTING_CACHE_TTL seconds; on a cold cache all domains are
+    resolved with at most one query for registered domains and one for
+    zones.
+
+    :fqdns: list of str domains
+    :returns: dict of fqdn -> DomainProvider object
+
+    """
+    fqdns = list(fqdns)
+    parsed = {
+        fqdn: ".".join([parsed_domain["domain"], parsed_domain["zone"]])
+        for fqdn, parsed_domain in zip(fqdns, parse_domains(fqdns))
+    }
+    zones = {fqdn: parsed[fqdn].split(".", 1)[1] for fqdn in fqdns}
+    keys = [routing_cache_key("domain", i) for i in parsed.values()]
+    keys += [routing_cache_key("zone", i) for i in zones.values()]
+    cached = cache.get_many(keys)
+    domain_routes = {}
+    zone_routes = {}
+    for fqdn, name in parsed.items():
+        key = routing_cache_key("domain", name)
+        if key in cached:
+            domain_routes[name] = cached[key]
+        key = routing_cache_key("zone", zones[fqdn])
+        if key in cached:
+            zone_routes[zones[fqdn]] = cached[key]
+
+    ttl = settings.ROUTING_CACHE_TTL
+    missing_domains = set(parsed.values()) - set(domain_routes.keys())
+    if missing_domains:
+        registered_domains = RegisteredDomain.objects.filter(
+            fqdn__in=missing_domains,
+            active=True
+        ).select_related('tld_provider__provider')
+        for registered_domain in registered_domains:
+            domain_routes[registered_domain.fqdn] = \
+                registered_domain.tld_provider.provider
+        for name in missing_domains:
+            domain_routes.setdefault(name, NOT_REGISTERED)
+        cache.set_many({routing_cache_key("domain", name): domain_routes[name]
+                        for name in missing_domains}, ttl)
+
+    needed_zones = {zones[fqdn] for fqdn, name in parsed.items()
+                    if domain_routes[name] == NOT_REGISTERED}
+    missing_zones = needed_zones - set(zone_routes.keys())
+    if missing_zones:
+        # Lowest id wins should a zone ever have more than one provider.
+        tld_providers = TopLevelDomainProvider.objects.filter(
+            zone__zone__in=missing_zones
+        ).select_related('zone', 'provider').order_by('-id')
+        found = {i.zone.zone: i.provider for i in tld_providers}
+        cache.set_many({routing_cache_key("zone", zone): provider
+                        for zone, provider in found.items()}, ttl)
+        zone_routes.update(found)
+
+    registries = {}
+    for fqdn, name in parsed.items():
+        provider = domain_routes[name]
+        if provider == NOT_REGISTERED:
+            provider = zone_routes.get(zones[fqdn])
+            if provider is None:
+                raise UnsupportedTld(zones[fqdn])
+        registries[fqdn] = provider
+    return registries
 
 
 def get_domain_registry(fqdn):
@@ -19,29 +113,21 @@ def get_domain_registry(fqdn):
     :returns: DomainProvider object
 
     """
-    parsed_domain = parse_domain(fqdn)
-    tld_provider = None
-    try:
-        top_level_domain = TopLevelDomain.objects.get(
-            zone=parsed_domain["zone"]
-        )
-        registered_domain_set = RegisteredDomain.objects.filter(
-            name=parsed_domain["domain"],
-            tld=top_level_domain,
-            active=True
-        )
-        if registered_domain_set.count() > 0:
-            registered_domain = registered_domain_set.first()
-            tld_provider = registered_domain.tld_provider
-        else:
-            tld_provider = TopLevelDomainProvider.objects.get(
-                zone=top_level_domain
-            )
-        return tld_provider.provider
-    except TopLevelDomainProvider.DoesNotExist:
-        raise UnsupportedTld(parsed_domain["zone"])
-    except Exception as e:
-        raise e
+    return get_domain_registries([fqdn])[fqdn]
+
+
+def invalidate_domain_route(sender, instance, **kwargs):
+    """
+    Signal handler dropping the cached route of a registered domain.
+    """
+    cache.delete(routing_cache_key("domain", instance.fqdn))
+
+
+def invalidate_zone_route(sender, instance, **kwargs):
+    """
+    Signal handler dropping the cached default provider of a zone.
+    """
+    cache.delete(routing_cache_key("zone", instance.zone.zone))
 
 
 def parse_domain(fqdn):
@@ -55,23 +141,7 @@ def parse_domain(fqdn):
     :returns: dict containing name and tld
 
     """
-    fqdn = idna.encode(fqdn, uts46=True).decode('ascii')
-    tlds = TopLevelDomain.objects.all()
-    probable_tld = None
-    length = 0
-    domain_name = None
-    for tld in tlds:
-        zone = "." + tld.zone
-        endindex = - (len(zone))
-        if zone == fqdn[endindex:] and len(zone) > length:
-            probable_tld = tld
-            length = len(zone)
-            # Get the actual domain name. Make sure it doesn't have
-            # any subdomain prefixed
-            domain_name = fqdn[:endindex].split(".")[-1]
-    if domain_name is None or len(domain_name) == 0:
-        raise InvalidTld(fqdn)
-    return {"domain": domain_name, "zone": probable_tld.zone}
+    return parse_domains([fqdn])[0]
 
 
 def synchronise_domain_nameserver(registered_domain, nameserver):
@@ -102,9 +172,39 @@ def synchronise_domain(info_data, domain_id):
     registered_domain = filtered_domains.first()
     if registered_domain and 'nameservers' in info_data:
         if isinstance(info_data['nameservers'], list):
-            filtered_domains.update(nameservers=info_data['nameservers'])
+            nameservers = info_data['nameservers']
         else:
-            filtered_domains.update(nameservers=[info_data['nameservers']])
+            nameservers = [info_data['nameservers']]
+        filtered_domains.update(nameservers=nameservers)
+        synchronise_domain_nameservers(domain_id, nameservers)
+
+
+def synchronise_domain_nameservers(domain_id, nameservers):
+    """
+    Make the DomainNameserver rows of a domain match its nameservers.
+
+    The domain row is locked first, so two syncs of the same domain (a
+    background refresh and a live info, say) take turns rather than both
+    inserting the same host.
+
+    :domain_id: int primary key of domain
+    :nameservers: list of str ns hosts
+
+    """
+    hosts = set(idn.encode_many(i for i in nameservers if i))
+    with transaction.atomic():
+        list(RegisteredDomain.objects.select_for_update().filter(
+            pk=domain_id
+        ).values_list('pk', flat=True))
+        domain_nameservers = DomainNameserver.objects.filter(
+            registered_domain_id=domain_id
+        )
+        domain_nameservers.exclude(idn_host__in=hosts).delete()
+        current = set(domain_nameservers.values_list('idn_host', flat=True))
+        DomainNameserver.objects.bulk_create([
+            DomainNameserver(registered_domain_id=domain_id, idn_host=host)
+            for host in hosts - current
+        ])
 
 
 def synchronise_host(info_data, host_id):
@@ -0,0 +1,446 @@
+"""
+In-process stand-in for the EPP gateway and the registries behind it.
+
+Answers the commands the API sends with the same JSON shapes nodepp
+produces, so everything above the transport (queries, actions, workflows,
+views) runs unchanged without RabbitMQ or registry test accounts. Select
+it with ``EPP_RPC_TRANSPORT = "fake"``; latency and error injection are
+configured through ``EPP_FAKE_REGISTRY``.
+"""
+import asyncio
+import datetime
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from ..exceptions import EppTimeout
+from .rpc_client import get_command_timeout, process_response
+
+log = logging.getLogger(__name__)
+
+SUCCESS = (1000, "Command completed successfully")
+OBJECT_EXISTS = (2302, "Object exists")
+OBJECT_DOES_NOT_EXIST = (2303, "Object does not exist")
+COMMAND_FAILED = (2400, "Command failed")
+UNKNOWN_COMMAND = (2000, "Unknown command")
+
+
+def as_list(value):
+    """
+    Return value as a list; nodepp sends single items unwrapped.
+    """
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def unwrap(items):
+    """
+    Return a single item on its own, the way nodepp renders one XML element.
+    """
+    if len(items) == 1:
+        return items[0]
+    return items
+
+
+def epp_date(value):
+    return value.strftime("%Y-%m-%dT%H:%M:%S.0Z")
+
+
+class FakeRegistry(object):
+
+    """
+    Registry simulator keeping domains, contacts and hosts in memory.
+
+    Each registry slug (routing key) has its own set of objects.
+
+    :latency: float seconds before a reply is available, or dict of
+              command -> seconds with an optional "default" entry
+    :error_rate: float probability that a command fails with 2400
+    :timeout_rate: float probability that a command never gets a reply
+    :errors: dict command -> result code to always return for that command
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, timeout_rate=0.0,
+                 errors=None, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.errors = errors or {}
+        self.random = random.Random(seed)
+        self.registries = {}
+        self.commands = []
+        self.lock = threading.Lock()
+
+    def command_latency(self, command):
+        """
+        Return how long a command takes to answer.
+
+        :command: str EPP command
+        :returns: float seconds
+
+        """
+        if isinstance(self.latency, dict):
+            return float(self.latency.get(command,
+                                          self.latency.get("default", 0.0)))
+        return float(self.latency)
+
+    def registry(self, routing_key):
+        return self.registries.setdefault(
+            routing_key,
+            {"domain": {}, "contact": {}, "host": {}}
+        )
+
+    def handle(self, routing_key, command, data):
+        """
+        Run a command against the simulated registry.
+
+        :routing_key: str registry slug
+        :command: str EPP command
+        :data: dict EPP payload
+        :returns: bytes response body, or None if the reply is to be lost
+
+        """
+        with self.lock:
+            self.commands.append((routing_key, command))
+            if self.timeout_rate and self.random.random() < self.timeout_rate:
+                return None
+            if command in self.errors:
+                result, response_data = (self.errors[command], "Error"), None
+            elif self.error_rate and self.random.random() < self.error_rate:
+                result, response_data = COMMAND_FAILED, None
+            else:
+                handler = getattr(self, command, None)
+                if handler is None:
+                    result, response_data = UNKNOWN_COMMAND, None
+                else:
+                    result, response_data = handler(
+                        self.registry(routing_key),
+                        data
+                    )
+        code, msg = result
+        response = {"result": {"code": code, "msg": msg}}
+        if response_data is not None:
+            response["data"] = response_data
+        return json.dumps(response).encode("utf-8")
+
+    def check(self, objects, names, entity_type):
+        name_key = entity_type + ":name"
+        results = []
+        for name in as_list(names):
+            item = {name_key: {"$t": name, "avail": 1}}
+            if name in objects:
+                item[name_key]["avail"] = 0
+                item[entity_type + ":reason"] = "In use"
+            results.append(item)
+        return {
+            entity_type + ":chkData": {
+                entity_type + ":cd": unwrap(results)
+            }
+        }
+
+    def checkDomain(self, registry, data):
+        return SUCCESS, self.check(registry["domain"], data["domain"],
+                                   "domain")
+
+    def createDomain(self, registry, data):
+        name = data["name"]
+        if name in registry["domain"]:
+            return OBJECT_EXISTS, None
+        now = datetime.datetime.utcnow()
+        try:
+            period = int(data.get("period", 1))
+        except (TypeError, ValueError):
+            period = 1
+        registry["domain"][name] = {
+            "roid": "D%s-FAKE" % uuid.uuid4().hex[:10],
+            "registrant": data.get("registrant"),
+            "contacts": list(as_list(data.get("contact"))),
+            "ns": list(as_list(data.get("ns"))),
+            "status": ["ok"],
+            "authcode": uuid.uuid4().hex[:16],
+            "created": now,
+            "expires": now + datetime.timedelta(days=365 * period),
+        }
+        return SUCCESS, {
+            "domain:creData": {
+                "domain:name": name,
+                "domain:crDate": epp_date(now),
+                "domain:exDate": epp_date(
+                    registry["domain"][name]["expires"]
+                ),
+            }
+        }
+
+    def infoDomain(self, registry, data):
+        name = data["domain"]
+        domain = registry["domain"].get(name)
+        if domain is None:
+            return OBJECT_DOES_NOT_EXIST, None
+        contacts = []
+        for contact in domain["contacts"]:
+            (contact_type, registry_id), = contact.items()
+            contacts.append({"type": contact_type, "$t": registry_id})
+        info = {
+            "domain:name": name,
+            "domain:roid": domain["roid"],
+            "domain:status": unwrap([{"s": i} for i in domain["status"]]),
+            "domain:registrant": domain["registrant"],
+            "domain:contact": unwrap(contacts) if contacts else [],
+            "domain:clID": "fake",
+            "domain:crDate": epp_date(domain["created"]),
+            "domain:exDate": epp_date(domain["expires"]),
+            "domain:authInfo": {"domain:pw": domain["authcode"]},
+        }
+        if domain["ns"]:
+            info["domain:ns"] = {"domain:hostObj": unwrap(domain["ns"])}
+        return SUCCESS, {"domain:infData": info}
+
+    def updateDomain(self, registry, data):
+        domain = registry["domain"].get(data["name"])
+        if domain is None:
+            return OBJECT_DOES_NOT_EXIST, None
+        add = data.get("add", {})
+        rem = data.get("rem", {})
+        chg = data.get("chg", {})
+        for ns in as_list(rem.get("ns")):
+            if ns in domain["ns"]:
+                domain["ns"].remove(ns)
+        for contact in as_list(rem.get("contact")):
+            if contact in domain["contacts"]:
+                domain["contacts"].remove(contact)
+        domain["ns"] += [i for i in as_list(add.get("ns"))
+                         if i not in domain["ns"]]
+        domain["contacts"] += [i for i in as_list(add.get("contact"))
+                               if i not in domain["contacts"]]
+        if "registrant" in chg:
+            domain["registrant"] = chg["registrant"]
+        return SUCCESS, None
+
+    def createContact(self, registry, data):
+        contact_id = data["id"]
+        if contact_id in registry["contact"]:
+            return OBJECT_EXISTS, None
+        now = datetime.datetime.utcnow()
+        registry["contact"][contact_id] = dict(
+            data,
+            roid="C%s-FAKE" % uuid.uuid4().hex[:10],
+            authcode=uuid.uuid4().hex[:16],
+            created=now
+        )
+        return SUCCESS, {
+            "contact:creData": {
+                "contact:id": contact_id,
+                "contact:crDate": epp_date(now),
+            }
+        }
+
+    def infoContact(self, registry, data):
+        contact = registry["contact"].get(data["contact"])
+        if contact is None:
+            return OBJECT_DOES_NOT_EXIST, None
+        postal_info = contact.get("postalInfo", {})
+        addr = postal_info.get("addr", {})
+        return SUCCESS, {
+            "contact:infData": {
+                "contact:id": contact["id"],
+                "contact:roid": contact["roid"],
+                "contact:status": {"s": "ok"},
+                "contact:postalInfo": {
+                    "type": postal_info.get("type", "loc"),
+                    "contact:name": postal_info.get("name", ""),
+                    "contact:org": postal_info.get("org") or {},
+                    "contact:addr": {
+                        "contact:street": addr.get("street") or [],
+                        "contact:city": addr.get("city", ""),
+                        "contact:sp": addr.get("sp") or {},
+                        "contact:pc": addr.get("pc") or {},
+                        "contact:cc": addr.get("cc", ""),
+                    },
+                },
+                "contact:voice": contact.get("voice") or {},
+                "contact:fax": contact.get("fax") or {},
+                "contact:email": contact.get("email", ""),
+                "contact:clID": "fake",
+                "contact:crDate": epp_date(contact["created"]),
+                "contact:authInfo": {"contact:pw": contact["authcode"]},
+            }
+        }
+
+    def updateContact(self, registry, data):
+        contact = registry["contact"].get(data["id"])
+        if contact is None:
+            return OBJECT_DOES_NOT_EXIST, None
+        contact.update(data.get("chg", {}))
+        return SUCCESS, None
+
+    def checkHost(self, registry, data):
+        return SUCCESS, self.check(registry["host"], data["host"], "host")
+
+    def createHost(self, registry, data):
+        name = data["name"]
+        if name in registry["host"]:
+            return OBJECT_EXISTS, None
+        now = datetime.datetime.utcnow()
+        registry["host"][name] = {
+            "roid": "H%s-FAKE" % uuid.uuid4().hex[:10],
+            "addr": as_list(data.get("addr")),
+            "created": now,
+        }
+        return SUCCESS, {
+            "host:creData": {
+                "host:name": name,
+                "host:crDate": epp_date(now),
+            }
+        }
+
+    def infoHost(self, registry, data):
+        name = data["name"]
+        host = registry["host"].get(name)
+        if host is None:
+            return OBJECT_DOES_NOT_EXIST, None
+        return SUCCESS, {
+            "host:infData": {
+                "host:name": name,
+                "host:roid": host["roid"],
+                "host:status": {"s": "ok"},
+                "host:addr": unwrap([
+                    {"ip": i.get("type", "v4"), "$t": i["ip"]}
+                    for i in host["addr"]
+                ]),
+                "host:clID": "fake",
+                "host:crDate": epp_date(host["created"]),
+            }
+        }
+
+
+class FakeRegistryConnection(object):
+
+    """
+    Stands in for RpcConnection. Replies become available after the
+    registry's latency, independently of each other, like commands in
+    flight on one AMQP connection.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.pending = {}
+
+    def is_healthy(self):
+        return True
+
+    def publish(self, routing_key, command, data, reply):
+        body = self.registry.handle(routing_key, command, data)
+        ready = time.monotonic() + self.registry.command_latency(command)
+        self.pending[reply.correlation_id] = (reply, ready, body)
+
+    def expire(self, now):
+        for correlation_id, (reply, ready, body) in list(
+                self.pending.items()):
+            if reply.deadline <= now and (body is None or ready > now):
+                del self.pending[correlation_id]
+                reply.set_exception(EppTimeout(
+                    "No reply to %s within %ss" % (reply.command,
+                                                   reply.timeout)
+                ))
+            elif body is not None and ready <= now:
+                del self.pending[correlation_id]
+                try:
+                    reply.set_result(process_response(body))
+                except Exception as e:
+                    reply.set_exception(e)
+
+    def wait(self, replies):
+        while True:
+            now = time.monotonic()
+            self.expire(now)
+            waiting = [reply for reply in replies if not reply.done()]
+            if not waiting:
+                return
+            wake = [reply.deadline for reply in waiting]
+            wake += [ready for (_, ready, body) in self.pending.values()
+                     if body is not None]
+            time.sleep(max(0, min(wake) - now))
+
+    def fail_pending(self, exc):
+        pending, self.pending = self.pending, {}
+        for reply, _, _ in pending.values():
+            reply.set_exception(exc)
+
+    def close(self):
+        pass
+
+
+class FakeRegistryTransport(object):
+
+    """
+    Transport handing out connections to the in-process registry. Has the
+    same acquire/release interface as RpcConnectionPool.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def acquire(self):
+        return FakeRegistryConnection(self.registry)
+
+    def release(self, connection, discard=False):
+        pass
+
+
+class FakeAsyncRpcClient(object):
+
+    """
+    Stands in for AsyncEppRpcClient.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    async def call(self, routing_key, command, data, timeout=None):
+        if timeout is None:
+            timeout = get_command_timeout(routing_key, command)
+        body = self.registry.handle(routing_key, command, data)
+        latency = self.registry.command_latency(command)
+        if body is None or latency > timeout:
+            await asyncio.sleep(timeout)
+            raise EppTimeout("No reply to %s within %ss" % (command, timeout))
+        await asyncio.sleep(latency)
+        return process_response(body)
+
+    async def close(self):
+        pass
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_fake_registry():
+    """
+    Return the registry simulator shared by this process.
+
+    :returns: FakeRegistry object
+
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = FakeRegistry(**settings.EPP_FAKE_REGISTRY)
+        return _registry
+
+
+def reset_fake_registry():
+    """
+    Forget all simulated registry objects and settings.
+    """
+    global _registry
+    with _registry_lock:
+        _registry = None
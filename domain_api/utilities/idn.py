@@ -0,0 +1,85 @@
+"""
+Memoised IDNA conversion of domain and host names.
+
+UTS46 mapping in the idna package is slow pure Python, and the same names
+are converted many times while handling a single request. Results are kept
+in a bounded LRU of IDN_CACHE_SIZE entries per process.
+"""
+from functools import lru_cache
+
+import idna
+from django.conf import settings
+
+
+@lru_cache(maxsize=settings.IDN_CACHE_SIZE)
+def encode(name):
+    """
+    Convert a domain or host name to its ascii (punycode) form.
+
+    :name: str unicode or ascii name
+    :returns: str ascii name
+
+    """
+    return idna.encode(name, uts46=True).decode('ascii')
+
+
+@lru_cache(maxsize=settings.IDN_CACHE_SIZE)
+def decode(name):
+    """
+    Convert an ascii (punycode) name to unicode.
+
+    :name: str ascii name
+    :returns: str unicode name
+
+    """
+    return idna.decode(name)
+
+
+def encode_many(names):
+    """
+    Encode a list of names.
+
+    :names: iterable of str names
+    :returns: list of str ascii names in the same order
+
+    """
+    return [encode(name) for name in names]
+
+
+def decode_many(names):
+    """
+    Decode a list of names.
+
+    :names: iterable of str ascii names
+    :returns: list of str unicode names in the same order
+
+    """
+    return [decode(name) for name in names]
+
+
+def cache_info():
+    """
+    Report how well the conversion caches are doing.
+
+    :returns: dict with hits, misses, size and hit ratio per direction
+
+    """
+    stats = {}
+    for direction, function in (("encode", encode), ("decode", decode)):
+        info = function.cache_info()
+        total = info.hits + info.misses
+        stats[direction] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "ratio": info.hits / total if total else 0.0,
+        }
+    return stats
+
+
+def cache_clear():
+    """
+    Empty both conversion caches.
+    """
+    encode.cache_clear()
+    decode.cache_clear()
@@ -0,0 +1,277 @@
+"""
+Freshness policy for the local copies of registry objects.
+
+Info endpoints serve domains, contacts, registrants and hosts from the
+database while their last sync is younger than INFO_MAX_AGE seconds. Older
+copies are still served, and a background task refreshes them from the
+registry (stale-while-revalidate). Only one refresh per object is queued at
+a time. Clients can force a live sync with ?refresh=true.
+
+Objects we change at the registry are marked expired. The next info
+request syncs them live, whatever their age.
+
+A live sync of an object we already hold a synced copy of gets only
+INFO_STALE_TIMEOUT seconds. If the registry fails or takes longer, the
+local copy is served instead, with Age and Warning headers telling the
+client how old it is. That includes expired objects.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from pika.exceptions import AMQPError
+
+from ..epp.queries import Domain as DomainQuery, ContactQuery, HostQuery
+from ..models import Contact, Nameserver, RegisteredDomain, Registrant
+from ..exceptions import EppError, RpcPoolExhausted
+from .domain import synchronise_domain
+
+log = logging.getLogger(__name__)
+
+INFO_MODELS = {
+    "domain": RegisteredDomain,
+    "contact": Contact,
+    "registrant": Registrant,
+    "host": Nameserver,
+}
+# Failures of a live sync that leave a synced local copy good to serve.
+# EppTimeout is an EppError.
+REGISTRY_UNAVAILABLE = (EppError, RpcPoolExhausted, AMQPError)
+STALE_WARNING = '110 - "Response is Stale"'
+REVALIDATION_FAILED_WARNING = '111 - "Revalidation Failed"'
+
+
+def info_kind(instance):
+    """
+    Return the INFO_MODELS key for an object.
+
+    :instance: RegisteredDomain, Contact, Registrant or Nameserver
+    :returns: str kind
+
+    """
+    for kind, model in INFO_MODELS.items():
+        if type(instance) is model:
+            return kind
+    raise ValueError("No registry info for %r" % instance)
+
+
+def refresh_requested(request):
+    """
+    Determine whether the client asked for a live sync.
+
+    :request: HTTP request
+    :returns: Boolean
+
+    """
+    return request.query_params.get("refresh", "").lower() in ("1", "true")
+
+
+def is_fresh(instance):
+    """
+    Determine whether an object was synced recently enough to serve as is.
+
+    :instance: object with a synchronised timestamp
+    :returns: Boolean
+
+    """
+    if instance.synchronised is None or instance.expired:
+        return False
+    age = timezone.now() - instance.synchronised
+    return age < timedelta(seconds=settings.INFO_MAX_AGE)
+
+
+def info_age(instance):
+    """
+    Return how long ago an object was synced.
+
+    :instance: object with a synchronised timestamp
+    :returns: int seconds
+
+    """
+    age = timezone.now() - instance.synchronised
+    return max(int(age.total_seconds()), 0)
+
+
+def freshness_headers(instance, revalidation_failed=False):
+    """
+    Build the headers of a response served from the local copy.
+
+    :instance: object with a synchronised timestamp
+    :revalidation_failed: Boolean True if the registry could not be reached
+    :returns: dict of headers
+
+    """
+    if instance.synchronised is None:
+        return {}
+    headers = {"Age": str(info_age(instance))}
+    if revalidation_failed:
+        headers["Warning"] = REVALIDATION_FAILED_WARNING
+    elif not is_fresh(instance):
+        headers["Warning"] = STALE_WARNING
+    return headers
+
+
+def info_timeout(instance):
+    """
+    Return how long a live sync of an object may wait for the registry.
+
+    :instance: object with a synchronised timestamp
+    :returns: float seconds, or None for the command default
+
+    """
+    if instance.synchronised is None:
+        return None
+    return settings.INFO_STALE_TIMEOUT
+
+
+def refresh_lock_key(kind, pk):
+    """
+    Cache key marking a queued refresh of an object.
+
+    :kind: str key of INFO_MODELS
+    :pk: int primary key
+    :returns: str cache key
+
+    """
+    return "info-refresh:%s:%s" % (kind, pk)
+
+
+def schedule_refresh(instance):
+    """
+    Queue a background refresh of an object unless one is already queued.
+
+    :instance: RegisteredDomain, Contact, Registrant or Nameserver
+    :returns: Boolean True if a refresh was queued
+
+    """
+    from ..tasks import refresh_info
+    kind = info_kind(instance)
+    key = refresh_lock_key(kind, instance.pk)
+    if not cache.add(key, True, settings.INFO_REFRESH_LOCK_TIMEOUT):
+        return False
+    try:
+        refresh_info.delay(kind, instance.pk)
+    except Exception:
+        cache.delete(key)
+        log.error("Unable to queue refresh of %s %s" % (kind, instance.pk),
+                  exc_info=True)
+        return False
+    return True
+
+
+def expire_info(queryset):
+    """
+    Mark objects we changed at the registry, so the next info request syncs
+    them live rather than serving a copy from before the change. When was
+    last synced is kept, so the copy can still be served if that sync
+    fails.
+
+    :queryset: RegisteredDomain, Contact, Registrant or Nameserver queryset
+
+    """
+    queryset.update(expired=True)
+
+
+def synchronise_domain_info(registered_domain, timeout=None):
+    """
+    Fetch a domain from its registry and store the result.
+
+    :registered_domain: RegisteredDomain object
+    :timeout: float seconds to wait for the registry
+    :returns: dict info data
+
+    """
+    query = DomainQuery(RegisteredDomain.objects.all())
+    info = query.info(registered_domain.fqdn, timeout=timeout)
+    synchronise_domain(info, registered_domain.id)
+    RegisteredDomain.objects.filter(pk=registered_domain.id).update(
+        synchronised=timezone.now(),
+        expired=False
+    )
+    return info
+
+
+def synchronise_contact_info(contact, timeout=None):
+    """
+    Fetch a contact or registrant from its registry and store the result.
+
+    :contact: Contact or Registrant object
+    :timeout: float seconds to wait for the registry
+    :returns: dict info data
+
+    """
+    queryset = contact.__class__.objects.all()
+    query = ContactQuery(queryset)
+    info = query.info(contact, timeout=timeout)
+    queryset.filter(pk=contact.id).update(synchronised=timezone.now(),
+                                          expired=False,
+                                          **info)
+    return info
+
+
+def synchronise_host_info(host, timeout=None):
+    """
+    Fetch a host from its registry and store the result.
+
+    :host: Nameserver object
+    :timeout: float seconds to wait for the registry
+    :returns: dict info data
+
+    """
+    queryset = Nameserver.objects.all()
+    query = HostQuery(queryset)
+    info = query.info(host, timeout=timeout)
+    queryset.filter(pk=host.id).update(synchronised=timezone.now(),
+                                       expired=False,
+                                       **info)
+    return info
+
+
+def synchronise_info(instance, timeout=None):
+    """
+    Fetch any supported object from its registry and store the result.
+
+    :instance: RegisteredDomain, Contact, Registrant or Nameserver
+    :timeout: float seconds to wait for the registry
+    :returns: dict info data
+
+    """
+    kind = info_kind(instance)
+    if kind == "domain":
+        return synchronise_domain_info(instance, timeout)
+    if kind == "host":
+        return synchronise_host_info(instance, timeout)
+    return synchronise_contact_info(instance, timeout)
+
+
+def prepare_info(instance, refresh=False):
+    """
+    Apply the freshness policy before an object is served.
+
+    Syncs the object from the registry when asked to, when it has never
+    been synced or when we changed it since, queues a background refresh
+    when the local copy is stale, and falls back to the local copy when a
+    live sync fails.
+
+    :instance: RegisteredDomain, Contact, Registrant or Nameserver
+    :refresh: Boolean True to sync from the registry regardless of age
+    :returns: tuple of info dict (None if the local copy is served) and
+              dict of response headers
+
+    """
+    if refresh or instance.synchronised is None or instance.expired:
+        try:
+            return synchronise_info(instance, info_timeout(instance)), {}
+        except REGISTRY_UNAVAILABLE as e:
+            if instance.synchronised is None:
+                raise e
+            log.warning({"message": "Serving local copy after failed sync",
+                         "object": str(instance.pk),
+                         "kind": info_kind(instance),
+                         "error": repr(e)})
+            return None, freshness_headers(instance, revalidation_failed=True)
+    if not is_fresh(instance):
+        schedule_refresh(instance)
+    return None, freshness_headers(instance)
@@ -0,0 +1,498 @@
+"""
+Run registry workflows in the background and track them as jobs.
+
+Requests sent with "Prefer: respond-async" do not wait on the Celery chain.
+Each task of the chain gets its task id up front and a WorkflowJobStep row,
+the chain is sent off and the request answers 202 with the job. Celery
+signal handlers, running in the worker, move the steps and the job along
+and store the final result or the error the synchronous request would have
+returned.
+
+Requests with an Idempotency-Key header always run as a job kept under
+that key, and every step records its signature and what it returned. When
+the request is repeated after a failure the job carries on from its first
+step that did not succeed, so registry changes already made, like a domain
+created before connecting it failed, are not made again. A create domain
+step that failed, or whose worker went away, may still have created the
+domain, e.g. when only its reply was lost, so the registry is asked first.
+Other registry commands are sent again as they are. A pending or running
+job is only resumed once it has not moved for JOB_STALL_TIMEOUT seconds.
+
+Bulk jobs have a WorkflowJobItem per domain. Their task only handles items
+that are not finished, so a job that failed, or whose worker went away,
+is resumed by sending the task again.
+"""
+import hashlib
+import json
+import logging
+import uuid
+from datetime import timedelta
+
+from celery import chain, signature
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework import status
+
+from ..epp.queries import Domain as DomainQuery
+from ..exceptions import EppObjectDoesNotExist
+from ..models import WorkflowJob, WorkflowJobItem, WorkflowJobStep
+
+log = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "HTTP_IDEMPOTENCY_KEY"
+CREATE_DOMAIN_TASK = "domain_api.tasks.create_domain"
+# Exception names (tasks may raise them from the worker) and the response
+# the synchronous endpoints give for them.
+JOB_ERRORS = (
+    ("DomainNotAvailable", status.HTTP_400_BAD_REQUEST, "Domain not available"),
+    ("NotObjectOwner", status.HTTP_400_BAD_REQUEST, "Not owner of object"),
+    ("EppObjectDoesNotExist", status.HTTP_404_NOT_FOUND, None),
+    ("EppError", status.HTTP_400_BAD_REQUEST, None),
+)
+
+
+def prefers_async(request):
+    """
+    Determine whether the client asked not to wait for the workflow.
+
+    :request: HTTP request
+    :returns: Boolean
+
+    """
+    prefer = request.META.get("HTTP_PREFER", "")
+    preferences = [i.split(";")[0].split("=")[0].strip().lower()
+                   for i in prefer.split(",")]
+    return "respond-async" in preferences
+
+
+def job_error(exception):
+    """
+    Map a failed step to an HTTP status and message.
+
+    :exception: Exception raised by a workflow task
+    :returns: tuple of int status and str message
+
+    """
+    names = [i.__name__ for i in type(exception).__mro__]
+    for name, error_status, message in JOB_ERRORS:
+        if name in names:
+            return error_status, message or str(exception)
+    return status.HTTP_500_INTERNAL_SERVER_ERROR, "Workflow error"
+
+
+def json_result(result):
+    """
+    Return a task result in a form a JSONField can store.
+
+    :result: task result
+    :returns: JSON compatible copy of the result
+
+    """
+    return json.loads(json.dumps(result, cls=DjangoJSONEncoder))
+
+
+def idempotency_key(request):
+    """
+    Return the Idempotency-Key header of a request.
+
+    :request: HTTP request
+    :returns: str key or None
+
+    """
+    key = request.META.get(IDEMPOTENCY_KEY_HEADER, "").strip()
+    if not key:
+        return None
+    if len(key) > 255:
+        raise ValueError("Idempotency-Key longer than 255 characters")
+    return key
+
+
+def request_fingerprint(action, name, data):
+    """
+    Hash what a request asks for, to tell whether a repeated Idempotency-Key
+    belongs to the same request.
+
+    :action: str workflow action, i.e. create_domain
+    :name: str domain or host the workflow acts on
+    :data: dict request data
+    :returns: str hex digest
+
+    """
+    content = json.dumps([action, name, data],
+                         sort_keys=True,
+                         cls=DjangoJSONEncoder)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def create_job(user, action, name, items=(), parameters=None,
+               idempotency_key=None, fingerprint=None):
+    """
+    Create a job and, for bulk jobs, its items.
+
+    :user: User object the job belongs to
+    :action: str workflow action, i.e. create_domain
+    :name: str domain or host the workflow acts on
+    :items: list of str domains a bulk workflow handles one by one
+    :parameters: dict request data a bulk workflow applies to each item
+    :idempotency_key: str Idempotency-Key of the request
+    :fingerprint: str request_fingerprint of the request
+    :returns: WorkflowJob object
+
+    """
+    with transaction.atomic():
+        job = WorkflowJob.objects.create(user=user,
+                                         action=action,
+                                         name=name,
+                                         parameters=parameters,
+                                         idempotency_key=idempotency_key,
+                                         fingerprint=fingerprint)
+        WorkflowJobItem.objects.bulk_create(
+            [WorkflowJobItem(job=job, name=i) for i in items],
+            batch_size=1000
+        )
+    return job
+
+
+def record_steps(job, workflow, first_position=0):
+    """
+    Give each task of a workflow its task id up front and a step row.
+
+    :job: WorkflowJob object
+    :workflow: list of celery signatures, in chain order
+    :first_position: int position of the first step within the job
+
+    """
+    steps = []
+    for position, task_signature in enumerate(workflow, first_position):
+        stored = json_result(task_signature)
+        task_id = str(uuid.uuid4())
+        task_signature.set(task_id=task_id)
+        steps.append(WorkflowJobStep(job=job,
+                                     position=position,
+                                     task_id=task_id,
+                                     task=task_signature.task,
+                                     signature=stored))
+    WorkflowJobStep.objects.bulk_create(steps)
+
+
+def send_workflow(job, workflow, wait=False):
+    """
+    Send the recorded steps of a job off as a chain.
+
+    :job: WorkflowJob object
+    :workflow: list of celery signatures, in chain order
+    :wait: Boolean True if the caller waits for the result of the chain
+    :returns: AsyncResult of the last task, None if it could not be sent
+
+    """
+    # The steps do not publish their results, the signal handlers record
+    # them. A waiting caller gets the last one from workflow_result.
+    if wait:
+        from ..tasks import workflow_result
+        workflow = workflow + [workflow_result.s()]
+    try:
+        return chain(workflow).apply_async()
+    except Exception as e:
+        log.error(str(e), exc_info=True)
+        WorkflowJob.objects.filter(pk=job.pk).update(
+            status=WorkflowJob.FAILED,
+            error="Unable to start workflow",
+            error_status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+        if wait:
+            raise e
+        job.refresh_from_db()
+        return None
+
+
+def send_job_workflow(job, workflow, first_position=0):
+    """
+    Record the steps of a workflow and send it off as a chain.
+
+    :job: WorkflowJob object
+    :workflow: list of celery signatures, in chain order
+    :first_position: int position of the first step within the job
+    :returns: WorkflowJob object
+
+    """
+    record_steps(job, workflow, first_position)
+    send_workflow(job, workflow)
+    return job
+
+
+def start_job(workflow, user, action, name, items=(), parameters=None):
+    """
+    Send a workflow off to Celery without waiting for it.
+
+    :workflow: list of celery signatures, in chain order
+    :user: User object the job belongs to
+    :action: str workflow action, i.e. create_domain
+    :name: str domain or host the workflow acts on
+    :items: list of str domains a bulk workflow handles one by one
+    :parameters: dict request data a bulk workflow applies to each item
+    :returns: WorkflowJob object
+
+    """
+    job = create_job(user, action, name, items, parameters)
+    return send_job_workflow(job, workflow)
+
+
+def request_job(request):
+    """
+    Return the job kept under the Idempotency-Key of a request.
+
+    :request: HTTP request
+    :returns: WorkflowJob object, None if the request has no (valid) key or
+              nothing ran under it yet
+
+    """
+    try:
+        key = idempotency_key(request)
+    except ValueError:
+        return None
+    if key is None:
+        return None
+    return WorkflowJob.objects.filter(user=request.user,
+                                      idempotency_key=key).first()
+
+
+def job_stalled(job):
+    """
+    Determine whether a pending or running job has not moved for
+    JOB_STALL_TIMEOUT seconds, i.e. the worker running it has gone away.
+
+    :job: WorkflowJob object
+    :returns: Boolean
+
+    """
+    if job.status not in (WorkflowJob.PENDING, WorkflowJob.RUNNING):
+        return False
+    activity = job.steps.aggregate(Max('started'), Max('finished'))
+    moved = [job.updated,
+             activity['started__max'],
+             activity['finished__max']]
+    last_move = max(i for i in moved if i is not None)
+    stalled = timezone.now() - timedelta(seconds=settings.JOB_STALL_TIMEOUT)
+    return last_move < stalled
+
+
+def step_carried_out(step, task_signature):
+    """
+    Ask the registry whether the command of a step that did not succeed was
+    carried out anyway.
+
+    Only create domain is looked up: the domain counts as created by the
+    step if it exists with the registrant the step asked for. Any other
+    step is run again.
+
+    :step: WorkflowJobStep object
+    :task_signature: celery signature the step would run again with
+    :returns: dict what the step would have returned, None if it has to run
+              again
+
+    """
+    if step.task != CREATE_DOMAIN_TASK or step.status == WorkflowJob.PENDING:
+        return None
+    epp, registry = task_signature.args[:2]
+    try:
+        created = DomainQuery().created_info(registry, epp["name"])
+    except EppObjectDoesNotExist:
+        return None
+    if created.pop("registrant") != epp.get("registrant"):
+        return None
+    log.info({"message": "Domain created by an earlier attempt",
+              "domain": epp["name"]})
+    created.update(epp)
+    return json_result(created)
+
+
+def resume_job_steps(job, wait=False):
+    """
+    Run a job again from its first step that did not succeed.
+
+    Steps that succeeded are not run again. If the first step to run takes
+    the result of the one before, it gets that step's recorded output. A
+    step the registry reports as carried out is recorded as succeeded
+    instead of being run. If no step is left to run the job succeeds with
+    the output of the last one.
+
+    :job: WorkflowJob object
+    :wait: Boolean True if the caller waits for the result
+    :returns: AsyncResult of the last task, None if nothing was left to run
+              or the workflow could not be sent
+
+    """
+    steps = list(job.steps.order_by('position'))
+    remaining = [i for i in steps if i.status != WorkflowJob.SUCCEEDED]
+    workflow = [signature(i.signature) for i in remaining]
+    output = None
+    if not remaining:
+        output = steps[-1].output
+    elif steps.index(remaining[0]) > 0:
+        output = steps[steps.index(remaining[0]) - 1].output
+    while remaining:
+        first = remaining[0]
+        if first.position > 0 and not workflow[0].immutable:
+            workflow[0] = workflow[0].clone(args=(output,))
+        carried_out = step_carried_out(first, workflow[0])
+        if carried_out is None:
+            break
+        WorkflowJobStep.objects.filter(pk=first.pk).update(
+            status=WorkflowJob.SUCCEEDED,
+            output=carried_out,
+            error=None,
+            finished=timezone.now()
+        )
+        output = carried_out
+        remaining.pop(0)
+        workflow.pop(0)
+    if not remaining:
+        WorkflowJob.objects.filter(pk=job.pk).update(
+            status=WorkflowJob.SUCCEEDED,
+            result=output,
+            error=None,
+            error_status=None,
+            updated=timezone.now()
+        )
+        job.refresh_from_db()
+        return None
+    log.info({"message": "Resuming job",
+              "job": str(job.pk),
+              "position": first.position})
+    WorkflowJobStep.objects.filter(pk__in=[i.pk for i in remaining]).delete()
+    # updated restarts the clock job_stalled goes by.
+    WorkflowJob.objects.filter(pk=job.pk).update(status=WorkflowJob.PENDING,
+                                                 result=None,
+                                                 error=None,
+                                                 error_status=None,
+                                                 updated=timezone.now())
+    record_steps(job, workflow, first.position)
+    async_result = send_workflow(job, workflow, wait)
+    job.refresh_from_db()
+    return async_result
+
+
+def job_resumable(job):
+    """
+    Determine whether a bulk job may be sent again.
+
+    Finished jobs can always be resumed. Unfinished ones only once none of
+    their items has moved for BULK_STALL_TIMEOUT seconds, i.e. the worker
+    running them has gone away.
+
+    :job: WorkflowJob object
+    :returns: Boolean
+
+    """
+    items = WorkflowJobItem.objects.filter(job=job)
+    if not items.exists():
+        return False
+    if job.status in (WorkflowJob.SUCCEEDED, WorkflowJob.FAILED):
+        return True
+    last_update = items.aggregate(Max('updated'))['updated__max']
+    stalled = timezone.now() - timedelta(seconds=settings.BULK_STALL_TIMEOUT)
+    return last_update < stalled
+
+
+def resume_job(job, retry_failed=False):
+    """
+    Send the task of a bulk job again. It only handles the items that are
+    not finished yet.
+
+    :job: WorkflowJob object
+    :retry_failed: Boolean True to also retry items that failed
+    :returns: WorkflowJob object
+
+    """
+    if retry_failed:
+        WorkflowJobItem.objects.filter(
+            job=job,
+            status=WorkflowJob.FAILED
+        ).update(status=WorkflowJob.PENDING,
+                 result=None,
+                 error=None,
+                 error_status=None,
+                 updated=timezone.now())
+    WorkflowJob.objects.filter(pk=job.pk).update(status=WorkflowJob.PENDING,
+                                                 result=None,
+                                                 error=None,
+                                                 error_status=None)
+    job.refresh_from_db()
+    last_step = job.steps.order_by('position').last()
+    workflow = [signature(last_step.task, immutable=True)]
+    return send_job_workflow(job, workflow, last_step.position + 1)
+
+
+def get_job_step(task_id):
+    """
+    Return the job step of a task, if it belongs to one.
+
+    :task_id: str celery task id
+    :returns: WorkflowJobStep object or None
+
+    """
+    if not task_id:
+        return None
+    return WorkflowJobStep.objects.filter(task_id=task_id).first()
+
+
+def job_step_started(sender=None, task_id=None, **kwargs):
+    """
+    Celery task_prerun handler.
+    """
+    step = get_job_step(task_id)
+    if step is None:
+        return
+    WorkflowJobStep.objects.filter(pk=step.pk).update(
+        status=WorkflowJob.RUNNING,
+        started=timezone.now()
+    )
+    WorkflowJob.objects.filter(pk=step.job_id,
+                               status=WorkflowJob.PENDING).update(
+        status=WorkflowJob.RUNNING
+    )
+
+
+def job_step_succeeded(sender=None, result=None, **kwargs):
+    """
+    Celery task_success handler. The last step completes the job.
+    """
+    step = get_job_step(sender.request.id)
+    if step is None:
+        return
+    output = json_result(result)
+    WorkflowJobStep.objects.filter(pk=step.pk).update(
+        status=WorkflowJob.SUCCEEDED,
+        output=output,
+        finished=timezone.now()
+    )
+    if WorkflowJobStep.objects.filter(job_id=step.job_id,
+                                      position__gt=step.position).exists():
+        return
+    WorkflowJob.objects.filter(pk=step.job_id).update(
+        status=WorkflowJob.SUCCEEDED,
+        result=output
+    )
+
+
+def job_step_failed(sender=None, task_id=None, exception=None, **kwargs):
+    """
+    Celery task_failure handler. Later steps of the chain never run.
+    """
+    step = get_job_step(task_id)
+    if step is None:
+        return
+    WorkflowJobStep.objects.filter(pk=step.pk).update(
+        status=WorkflowJob.FAILED,
+        error=str(exception),
+        finished=timezone.now()
+    )
+    error_status, message = job_error(exception)
+    WorkflowJob.objects.filter(pk=step.job_id).update(
+        status=WorkflowJob.FAILED,
+        error=message,
+        error_status=error_status
+    )
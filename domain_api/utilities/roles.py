@@ -0,0 +1,70 @@
+"""
+Resolve the groups a user belongs to once per request.
+
+request.user is built afresh for every request, so the group names are
+stored on the user object the first time they are needed and every later
+check in the same request (views, permissions, workflows) reads them from
+there. With ROLES_FROM_JWT enabled the names are taken from the "groups"
+claim of the token instead, and no query is made at all.
+"""
+from django.conf import settings
+from rest_framework_jwt.utils import jwt_payload_handler as default_payload
+
+ADMIN_GROUP = 'admin'
+# Attribute of the user object holding its group names.
+GROUPS_ATTRIBUTE = '_domain_api_groups'
+
+
+def set_user_groups(user, groups):
+    """
+    Store the group names of a user.
+
+    :user: User object
+    :groups: iterable of str group names
+
+    """
+    setattr(user, GROUPS_ATTRIBUTE, frozenset(groups))
+
+
+def get_user_groups(user):
+    """
+    Return the group names of a user, querying for them on first use.
+
+    :user: User object
+    :returns: frozenset of str group names
+
+    """
+    groups = getattr(user, GROUPS_ATTRIBUTE, None)
+    if groups is None:
+        if user.is_authenticated:
+            groups = user.groups.values_list('name', flat=True)
+        else:
+            groups = []
+        set_user_groups(user, groups)
+        groups = getattr(user, GROUPS_ATTRIBUTE)
+    return groups
+
+
+def is_admin(user):
+    """
+    Determine whether a user is in the admin group.
+
+    :user: User object
+    :returns: Boolean
+
+    """
+    return ADMIN_GROUP in get_user_groups(user)
+
+
+def jwt_payload_handler(user):
+    """
+    Build the JWT payload with the user's group names in a "groups" claim.
+
+    :user: User object
+    :returns: dict payload
+
+    """
+    payload = default_payload(user)
+    if settings.ROLES_FROM_JWT:
+        payload["groups"] = sorted(get_user_groups(user))
+    return payload
@@ -1,13 +1,31 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future
 
 import pika
-import uuid
-import json
+from pika.exceptions import AMQPError
+from django.conf import settings
 
-from ..exceptions import EppError, EppObjectDoesNotExist
+from ..exceptions import (
+    EppError,
+    EppObjectDoesNotExist,
+    EppTimeout,
+    RpcPoolExhausted,
+)
 
+log = logging.getLogger(__name__)
 
-class EppRpcClient(object):
+
+class RpcConnection(object):
     """
+    A single AMQP connection with its own exclusive callback queue.
+
     This is based on the rpc client example in
     this tutorial:
 
@@ -33,33 +51,479 @@ class EppRpcClient(object):
 
         self.channel.basic_consume(self.on_response, no_ack=True,
                                    queue=self.callback_queue)
+        # correlation id -> PendingReply for every command still in flight
+        self.pending = {}
 
     def on_response(self, ch, method, props, body):
-        if self.corr_id == props.correlation_id:
-            self.response = body
+        reply = self.pending.pop(props.correlation_id, None)
+        if reply is None:
+            log.debug("Discarding reply for unknown correlation id %s"
+                      % props.correlation_id)
+            return
+        try:
+            reply.set_result(process_response(body))
+        except Exception as e:
+            reply.set_exception(e)
 
-    def call(self, routing_key, command, data):
-        epp_command = {"command": command, "data": data}
-        self.response = None
-        self.corr_id = str(uuid.uuid4())
-        self.channel.basic_publish(exchange=self.exchange,
-                                   routing_key=routing_key,
-                                   properties=pika.BasicProperties(
-                                         reply_to=self.callback_queue,
-                                         correlation_id=self.corr_id,
-                                         ),
-                                   body=json.dumps(epp_command))
-        while self.response is None:
+    def is_healthy(self):
+        """
+        Check that the connection and channel are still usable.
+
+        :returns: Boolean
+
+        """
+        try:
+            if not (self.connection.is_open and self.channel.is_open):
+                return False
+            # Service heartbeats and notice a broker that went away while the
+            # connection sat idle in the pool.
             self.connection.process_data_events()
-        response_data = json.loads(self.response.decode("utf-8"))
-        result_code = int(response_data["result"]["code"])
-        msg = response_data["result"]["msg"]
-        if isinstance(msg, dict):
-            msg = msg["$t"]
-        if result_code == 2303:
-            raise EppObjectDoesNotExist(msg)
-        if result_code >= 2000:
-            raise EppError(msg)
-        if "data" in response_data:
-            return response_data["data"]
-        return msg
+            return True
+        except AMQPError:
+            return False
+
+    def publish(self, routing_key, command, data, reply):
+        """
+        Send an EPP command to the gateway.
+
+        :routing_key: str registry slug
+        :command: str EPP command (i.e. checkDomain)
+        :data: dict EPP payload
+        :reply: PendingReply to resolve when the response arrives
+
+        """
+        epp_command = {"command": command, "data": data}
+        self.pending[reply.correlation_id] = reply
+        try:
+            self.channel.basic_publish(exchange=self.exchange,
+                                       routing_key=routing_key,
+                                       properties=pika.BasicProperties(
+                                             reply_to=self.callback_queue,
+                                             correlation_id=reply.correlation_id,
+                                             ),
+                                       body=json.dumps(epp_command))
+        except Exception:
+            self.pending.pop(reply.correlation_id, None)
+            raise
+
+    def expire(self, now):
+        """
+        Fail commands whose deadline has passed. A reply that turns up later
+        no longer has an entry in the pending map and is discarded.
+
+        :now: float monotonic time
+
+        """
+        for correlation_id, reply in list(self.pending.items()):
+            if reply.deadline <= now:
+                del self.pending[correlation_id]
+                reply.set_exception(EppTimeout(
+                    "No reply to %s within %ss" % (reply.command,
+                                                   reply.timeout)
+                ))
+
+    def wait(self, replies):
+        """
+        Process incoming responses until all of the given replies are done
+        or have passed their deadline. Blocks on the socket in between rather
+        than polling.
+
+        :replies: list of PendingReply objects
+
+        """
+        while True:
+            now = time.monotonic()
+            self.expire(now)
+            waiting = [reply for reply in replies if not reply.done()]
+            if not waiting:
+                return
+            time_limit = min(reply.deadline for reply in waiting) - now
+            self.connection.process_data_events(time_limit=time_limit)
+
+    def fail_pending(self, exc):
+        """
+        Fail every command still waiting on this connection.
+
+        :exc: Exception to set on each pending reply
+
+        """
+        pending, self.pending = self.pending, {}
+        for reply in pending.values():
+            reply.set_exception(exc)
+
+    def close(self):
+        """
+        Close the connection. The exclusive callback queue is removed by the
+        broker along with it.
+        """
+        try:
+            if self.connection.is_open:
+                self.connection.close()
+        except AMQPError as e:
+            log.warning("Problem closing rpc connection: %s" % e)
+
+
+class RpcConnectionPool(object):
+
+    """
+    Pool of long-lived RPC connections for a single broker.
+
+    Connections are opened lazily up to ``size`` and handed out one at a time.
+    A connection that fails its health check on checkout, or that raised an
+    AMQP error while in use, is thrown away and replaced by a new one.
+    """
+
+    def __init__(self, size=4, checkout_timeout=10, **connection_params):
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self.connection_params = connection_params
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        return RpcConnection(**self.connection_params)
+
+    def acquire(self):
+        """
+        Check out a healthy connection, opening a new one if necessary.
+
+        :returns: RpcConnection object
+
+        """
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise RpcPoolExhausted(
+                "No rpc connection free after %ss" % self.checkout_timeout
+            )
+        try:
+            while True:
+                try:
+                    connection = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if connection.is_healthy():
+                    return connection
+                log.info("Discarding unhealthy rpc connection")
+                connection.close()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection, discard=False):
+        """
+        Return a connection to the pool.
+
+        :connection: RpcConnection object
+        :discard: Boolean close the connection instead of keeping it
+
+        """
+        try:
+            if discard:
+                connection.close()
+            else:
+                self._idle.put(connection)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """
+        Close all idle connections.
+        """
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = None
+
+
+def get_connection_pool(**connection_params):
+    """
+    Return the pool for a set of connection parameters.
+
+    Pools are per process: a gunicorn or celery worker forked from a parent
+    that already had a pool starts with a fresh one rather than sharing the
+    parent's sockets.
+
+    :connection_params: keyword arguments for RpcConnection
+    :returns: RpcConnectionPool object
+
+    """
+    global _pools_pid
+    key = tuple(sorted(connection_params.items()))
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(key)
+        if pool is None:
+            pool = RpcConnectionPool(
+                size=settings.EPP_RPC_POOL_SIZE,
+                checkout_timeout=settings.EPP_RPC_POOL_TIMEOUT,
+                **connection_params
+            )
+            _pools[key] = pool
+        return pool
+
+
+def close_connection_pools():
+    """
+    Close every pool owned by this process.
+    """
+    with _pools_lock:
+        if _pools_pid == os.getpid():
+            for pool in _pools.values():
+                pool.close()
+        _pools.clear()
+
+
+atexit.register(close_connection_pools)
+
+
+def get_transport(**connection_params):
+    """
+    Return what EppRpcClient sends commands through, as chosen by
+    EPP_RPC_TRANSPORT: the AMQP connection pool in production, or the
+    in-process registry simulator for tests and load testing.
+
+    :connection_params: keyword arguments for RpcConnection
+    :returns: object with acquire() and release() for connections
+
+    """
+    if settings.EPP_RPC_TRANSPORT == "fake":
+        from .fake_registry import FakeRegistryTransport, get_fake_registry
+        return FakeRegistryTransport(get_fake_registry())
+    return get_connection_pool(**connection_params)
+
+
+def process_response(body):
+    """
+    Decode a response from the EPP gateway.
+
+    :body: bytes raw response body
+    :returns: data part of response, or message if there is no data
+
+    """
+    response_data = json.loads(body.decode("utf-8"))
+    result_code = int(response_data["result"]["code"])
+    msg = response_data["result"]["msg"]
+    if isinstance(msg, dict):
+        msg = msg["$t"]
+    if result_code == 2303:
+        raise EppObjectDoesNotExist(msg)
+    if result_code >= 2000:
+        raise EppError(msg)
+    if "data" in response_data:
+        return response_data["data"]
+    return msg
+
+
+def get_command_timeout(routing_key, command):
+    """
+    Return how long to wait for a reply to a command.
+
+    Registry specific values in EPP_REGISTRY_COMMAND_TIMEOUTS win over
+    EPP_COMMAND_TIMEOUTS, which falls back to its "default" entry.
+
+    :routing_key: str registry slug
+    :command: str EPP command
+    :returns: float seconds
+
+    """
+    registry_timeouts = settings.EPP_REGISTRY_COMMAND_TIMEOUTS.get(
+        routing_key,
+        {}
+    )
+    for timeouts in (registry_timeouts, settings.EPP_COMMAND_TIMEOUTS):
+        if command in timeouts:
+            return float(timeouts[command])
+    for timeouts in (registry_timeouts, settings.EPP_COMMAND_TIMEOUTS):
+        if "default" in timeouts:
+            return float(timeouts["default"])
+    return 30.0
+
+
+class PendingReply(Future):
+
+    """
+    Future for the response to a single EPP command.
+
+    Waiting on the result drives the client's connection, so several replies
+    can be outstanding on one callback queue without a background thread.
+    """
+
+    def __init__(self, client, command=None, timeout=30.0):
+        super().__init__()
+        self.client = client
+        self.command = command
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout
+        self.correlation_id = str(uuid.uuid4())
+
+    def result(self, timeout=None):
+        if not self.done():
+            self.client.wait([self])
+        return super().result(timeout=0)
+
+    def exception(self, timeout=None):
+        if not self.done():
+            self.client.wait([self])
+        return super().exception(timeout=0)
+
+
+class EppRpcClient(object):
+    """
+    Send EPP commands to the gateway over a pooled AMQP connection.
+
+    Creating a client is cheap. A connection is checked out of the
+    transport (normally the process wide AMQP pool) when the first command
+    is sent and returned once every outstanding reply has arrived or passed
+    its deadline, so any number of commands sent through ``call_async`` or
+    ``call_many`` share one connection and callback queue.
+
+    Callers that may not wait on every reply they asked for should use the
+    client as a context manager, which fails whatever is still pending and
+    returns the connection on exit::
+
+        with EppRpcClient() as client:
+            replies = client.call_many(commands)
+            ...
+    """
+    def __init__(self,
+                 host=None,
+                 port=None,
+                 login=None,
+                 password=None,
+                 vhost=None,
+                 exchange="epp"):
+        self.transport = get_transport(
+            host=host or settings.RABBITMQ_HOST,
+            port=int(port or settings.RABBITMQ_PORT),
+            login=login or settings.RABBITMQ_USER,
+            password=password or settings.RABBITMQ_PASSWORD,
+            vhost=vhost or settings.RABBITMQ_VHOST,
+            exchange=exchange
+        )
+        self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _checkout(self):
+        if self.connection is None:
+            self.connection = self.transport.acquire()
+        return self.connection
+
+    def _release(self, discard=False):
+        connection, self.connection = self.connection, None
+        if connection is not None:
+            self.transport.release(connection, discard=discard)
+
+    def _release_if_idle(self):
+        """
+        Return the connection to the pool once nothing is in flight on it.
+        Replies past their deadline are failed first, so a reply nobody
+        waited for does not hold on to the connection.
+        """
+        connection = self.connection
+        if connection is None:
+            return
+        connection.expire(time.monotonic())
+        if not connection.pending:
+            self._release()
+
+    def _fail(self, exc):
+        """
+        Give up on the current connection and everything in flight on it.
+        """
+        if self.connection is not None:
+            self.connection.fail_pending(exc)
+        self._release(discard=True)
+
+    def call_async(self, routing_key, command, data, timeout=None):
+        """
+        Send a command without waiting for the reply.
+
+        A stale connection is only retried if publishing failed; once a
+        command has gone out it is never sent a second time.
+
+        :routing_key: str registry slug
+        :command: str EPP command
+        :data: dict EPP payload
+        :timeout: float seconds to wait for the reply; defaults to the
+                  configured deadline for this registry and command
+        :returns: PendingReply future
+
+        """
+        if timeout is None:
+            timeout = get_command_timeout(routing_key, command)
+        self._release_if_idle()
+        reply = PendingReply(self, command, timeout)
+        for attempt in range(2):
+            connection = self._checkout()
+            try:
+                connection.publish(routing_key, command, data, reply)
+                return reply
+            except AMQPError as e:
+                self._fail(e)
+                if attempt > 0:
+                    raise e
+                log.warning("Publish failed, retrying on a new connection: %s"
+                            % e)
+
+    def call_many(self, commands):
+        """
+        Send several commands at once over the same connection.
+
+        :commands: iterable of (routing_key, command, data) tuples, optionally
+                   with a timeout as fourth item
+        :returns: list of PendingReply futures in the same order
+
+        """
+        return [self.call_async(*command) for command in commands]
+
+    def wait(self, replies):
+        """
+        Wait until all of the given replies have arrived.
+
+        :replies: list of PendingReply objects
+
+        """
+        connection = self.connection
+        if connection is None:
+            return
+        try:
+            connection.wait(replies)
+        except AMQPError as e:
+            self._fail(e)
+            raise e
+        finally:
+            self._release_if_idle()
+
+    def close(self):
+        """
+        Fail any replies still pending and return the connection to the
+        pool. Replies arriving for them later are discarded.
+        """
+        if self.connection is not None:
+            self.connection.fail_pending(EppError("Rpc client closed"))
+        self._release()
+
+    def call(self, routing_key, command, data, timeout=None):
+        """
+        Send a command and wait for the reply.
+
+        :routing_key: str registry slug
+        :command: str EPP command
+        :data: dict EPP payload
+        :timeout: float seconds to wait for the reply
+        :returns: dict response data
+
+        """
+        return self.call_async(routing_key, command, data, timeout).result()
@@ -0,0 +1,128 @@
+"""
+In-memory lookup of the zones (TLDs) we know about.
+
+Zones are kept in a trie of reversed labels so the zone of a domain is
+found by walking its labels from the right, picking the longest match
+(``co.nz`` over ``nz``) without a database query. The trie is built once
+per process, rebuilt when a TopLevelDomain is saved or deleted in this
+process, and at least every ZONE_TRIE_MAX_AGE seconds to pick up changes
+made elsewhere.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from ..exceptions import InvalidTld
+from . import idn
+
+log = logging.getLogger(__name__)
+
+# Marks a node that ends a zone.
+ZONE = None
+
+
+class ZoneTrie(object):
+
+    """
+    Trie of zone labels, right-most label first.
+    """
+
+    def __init__(self, zones=()):
+        self.root = {}
+        for zone in zones:
+            self.add(zone)
+
+    def add(self, zone):
+        """
+        Add a zone to the trie.
+
+        :zone: str ascii zone, i.e. co.nz
+
+        """
+        node = self.root
+        for label in reversed(zone.split(".")):
+            node = node.setdefault(label, {})
+        node[ZONE] = zone
+
+    def match(self, labels):
+        """
+        Find the longest zone matching the end of a list of labels that
+        still leaves a label in front of it for the domain name.
+
+        :labels: list of str labels of a domain name
+        :returns: tuple of zone and number of labels it covers, or (None, 0)
+
+        """
+        node = self.root
+        zone, depth = None, 0
+        for count, label in enumerate(reversed(labels[1:]), 1):
+            node = node.get(label)
+            if node is None:
+                break
+            if ZONE in node:
+                zone, depth = node[ZONE], count
+        return zone, depth
+
+    def parse(self, fqdn):
+        """
+        Split an ascii domain name into name and zone.
+
+        :fqdn: str ascii domain name
+        :returns: dict containing domain and zone
+
+        """
+        labels = fqdn.split(".")
+        zone, depth = self.match(labels)
+        if zone is None or not labels[-depth - 1]:
+            raise InvalidTld(fqdn)
+        # Only the label directly in front of the zone, never a subdomain.
+        return {"domain": labels[-depth - 1], "zone": zone}
+
+
+_trie = None
+_trie_built = 0
+_trie_lock = threading.Lock()
+
+
+def get_zone_trie():
+    """
+    Return the zone trie, building it if needed.
+
+    :returns: ZoneTrie object
+
+    """
+    global _trie, _trie_built
+    with _trie_lock:
+        max_age = settings.ZONE_TRIE_MAX_AGE
+        if _trie is None or (max_age and
+                             time.monotonic() - _trie_built > max_age):
+            from ..models import TopLevelDomain
+            zones = TopLevelDomain.objects.values_list("zone", flat=True)
+            _trie = ZoneTrie(zones)
+            _trie_built = time.monotonic()
+            log.debug("Built zone trie")
+        return _trie
+
+
+def reset_zone_trie(*args, **kwargs):
+    """
+    Throw the trie away so it is rebuilt on next use. Also used as the
+    TopLevelDomain save and delete signal handler.
+    """
+    global _trie
+    with _trie_lock:
+        _trie = None
+
+
+def parse_domains(fqdns):
+    """
+    Parse many domain names against one snapshot of the zones.
+
+    :fqdns: iterable of domain names
+    :returns: list of dict containing domain and zone, in the same order
+
+    """
+    trie = get_zone_trie()
+    return [trie.parse(fqdn) for fqdn in idn.encode_many(fqdns)]
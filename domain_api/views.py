@@ -1,13 +1,19 @@
 from __future__ import absolute_import, unicode_literals
-import idna
+import json
+import time
 from celery import chain, group
+from celery.exceptions import TimeoutError as CeleryTimeoutError
 import logging
-from django.db.models import Q
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 # Remove this
 from django.contrib.auth.models import User
 from django.contrib.auth import get_user_model
 from rest_framework import status, permissions, viewsets, generics
+from rest_framework.decorators import detail_route, list_route
 from rest_framework.response import Response
 from domain_api.models import (
     AccountDetail,
@@ -17,11 +23,13 @@ from domain_api.models import (
     Registrant,
     Contact,
     RegisteredDomain,
+    DomainAccess,
     DomainContact,
     TopLevelDomainProvider,
     DefaultAccountTemplate,
     DefaultAccountContact,
     Nameserver,
+    WorkflowJob,
 )
 from domain_api.serializers import (
     UserSerializer,
@@ -43,11 +51,13 @@ from domain_api.serializers import (
     PrivateInfoRegistrantSerializer,
     AdminInfoRegistrantSerializer,
     AdminInfoDomainSerializer,
+    WorkflowJobItemSerializer,
+    WorkflowJobSerializer,
 )
 from domain_api.filters import (
     IsPersonFilterBackend
 )
-from .epp.queries import Domain as DomainQuery, ContactQuery, HostQuery
+from .epp.queries import HostQuery
 from .exceptions import (
     EppError,
     InvalidTld,
@@ -56,17 +66,102 @@ from .exceptions import (
     DomainNotAvailable,
     NotObjectOwner,
     EppObjectDoesNotExist,
+    EppTimeout,
 )
 from domain_api.utilities.domain import (
     parse_domain,
-    synchronise_domain,
+    get_domain_registries,
     get_domain_registry,
 )
+from .pagination import (
+    ContactCursorPagination,
+    DomainPagination,
+    NameserverCursorPagination,
+    OrderedCursorPagination,
+    RegisteredDomainCursorPagination,
+)
+from .utilities import idn
+from .tasks import (
+    bulk_create_domains,
+    bulk_update_domains,
+    workflow_result,
+)
+from .utilities.availability import check_availability
+from .utilities.bulk import bulk_domain_names
+from .utilities.chain_results import wait_for_chain
+from .utilities.info import prepare_info, refresh_requested
+from .utilities.jobs import (
+    create_job,
+    idempotency_key,
+    job_resumable,
+    job_stalled,
+    prefers_async,
+    record_steps,
+    request_fingerprint,
+    request_job,
+    resume_job,
+    resume_job_steps,
+    send_workflow,
+    start_job,
+)
+from .utilities.roles import is_admin
+from .utilities.rpc_client import get_command_timeout
 from .workflows import workflow_factory
 from application.settings import get_logzio_sender
 
 log = logging.getLogger(__name__)
 
+STREAM_CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+# What a bulk domain update may change, and the domain list filters that
+# select the domains to change.
+BULK_UPDATE_FIELDS = ("registrant", "contacts", "nameservers", "status")
+BULK_UPDATE_FILTERS = ("registrant", "admin", "tech", "nameserver",
+                       "provider")
+# EPP command each workflow task sends, for how long a request waits on
+# its chain. Tasks missing here only use our database. The create domain
+# prerequisites run side by side, so count as one contact create.
+TASK_COMMANDS = {
+    "domain_api.tasks.check_bulk_domain": "checkDomain",
+    "domain_api.tasks.check_domain": "checkDomain",
+    "domain_api.tasks.check_host": "checkHost",
+    "domain_api.tasks.create_domain": "createDomain",
+    "domain_api.tasks.create_domain_prerequisites": "createContact",
+    "domain_api.tasks.create_host": "createHost",
+    "domain_api.tasks.create_registrant": "createContact",
+    "domain_api.tasks.create_registry_contact": "createContact",
+    "domain_api.tasks.update_domain": "updateDomain",
+    "domain_api.tasks.update_domain_registrant": "createContact",
+    "domain_api.tasks.update_domain_registry_contact": "createContact",
+}
+
+
+def with_domain_relations(queryset):
+    """
+    Load everything the domain serializers read along with the domains.
+
+    Registrant and provider are joined in and the active contacts are
+    fetched for the whole page in one query and stored in active_contacts.
+
+    :queryset: RegisteredDomain queryset
+    :returns: RegisteredDomain queryset
+
+    """
+    return queryset.select_related(
+        'registrant',
+        'tld_provider__provider'
+    ).prefetch_related(
+        Prefetch(
+            'contacts',
+            queryset=DomainContact.objects.filter(
+                active=True
+            ).select_related('contact', 'contact_type'),
+            to_attr='active_contacts'
+        )
+    )
+
 
 def get_registered_domain_queryset(user):
     """
@@ -77,26 +172,54 @@ def get_registered_domain_queryset(user):
 
     """
     queryset = RegisteredDomain.objects.all()
-    if user.groups.filter(name='admin').exists():
+    if is_admin(user):
         return queryset
     return queryset.filter(
-        Q(registrant__user=user) |
-        Q(contacts__contact__user=user)
-    ).distinct()
+        pk__in=DomainAccess.objects.filter(user=user).values(
+            'registered_domain_id'
+        )
+    )
+
 
+def workflow_timeout(workflow):
+    """
+    Return how long to wait for the result of a workflow chain: the timeout
+    of the EPP command each step sends, added up, at least the default
+    command timeout and no more than WORKFLOW_WAIT_TIMEOUT.
+
+    :workflow: list of celery signatures or job steps
+    :returns: float seconds
 
-def process_workflow_chain(chained_workflow):
+    """
+    registries = [None] + list(settings.EPP_REGISTRY_COMMAND_TIMEOUTS)
+    timeout = 0.0
+    for step in workflow:
+        command = TASK_COMMANDS.get(step.task)
+        if command is not None:
+            timeout += max(get_command_timeout(registry, command)
+                           for registry in registries)
+    timeout = max(timeout, get_command_timeout(None, "default"))
+    return min(timeout, settings.WORKFLOW_WAIT_TIMEOUT)
+
+
+def process_workflow_chain(chained_workflow, timeout=None):
     """
     Process results of workflow chain.
 
+    Only the result of the last task is fetched. If an earlier task failed,
+    its exception is raised as soon as its reply comes in. No result within
+    the timeout raises EppTimeout.
+
     :workflow_chain: chain workflow
+    :timeout: float seconds to wait for the result
     :returns: value of last item in chain
 
     """
     try:
-        reversed_workflow = reversed(list(workflow_scan(chained_workflow)))
-        values = [node.get() for node in reversed_workflow]
-        return values[-1]
+        try:
+            return wait_for_chain(chained_workflow, timeout)
+        except CeleryTimeoutError:
+            raise EppTimeout("No workflow result within %ss" % timeout)
     except KeyError as e:
         log.error(str(e))
     except Exception as e:
@@ -113,14 +236,103 @@ def process_workflow_chain(chained_workflow):
             raise e
 
 
-def workflow_scan(node):
+def run_workflow_chain(workflow):
+    """
+    Run workflow steps as a celery chain and wait for the outcome.
+
+    The steps never publish their results (they are declared with
+    ignore_result), so only workflow_result, appended to the chain, sends
+    one back to the web process. Errors are published regardless
+    (CELERY_TASK_STORE_ERRORS_EVEN_IF_IGNORED).
+
+    :workflow: list of celery signatures
+    :returns: value of last item in chain
+
+    """
+    return process_workflow_chain(chain(workflow + [workflow_result.s()])(),
+                                  workflow_timeout(workflow))
+
+
+def job_accepted(job, request):
+    """
+    Answer an asynchronous request with the job running it.
+
+    :job: WorkflowJob object
+    :request: HTTP request
+    :returns: Response object
+
     """
-    Generate a list of workflow nodes.
+    serializer = WorkflowJobSerializer(job, context={"request": request})
+    return Response(serializer.data,
+                    status=status.HTTP_202_ACCEPTED,
+                    headers={"Location": serializer.data["url"],
+                             "Preference-Applied": "respond-async"})
+
+
+def run_request_workflow(request, workflow, action, name):
+    """
+    Run the workflow of a registry request the way the client asked.
+
+    Requests preferring respond-async get the job back straight away, the
+    others wait for the outcome. Requests with an Idempotency-Key header run
+    as a job kept under that key. The same request sent again with the key
+    carries on from the first step that did not succeed, or is answered
+    again without running anything once the job has succeeded. A job that
+    is still pending or running is carried on with once it has stalled
+    (JOB_STALL_TIMEOUT).
+
+    :request: HTTP request
+    :workflow: list of celery signatures, may be None if a job is kept
+               under the key of the request already
+    :action: str workflow action, i.e. create_domain
+    :name: str domain or host the workflow acts on
+    :returns: tuple of Response to answer with instead (or None) and the
+              result of the workflow
+
     """
-    while node.parent:
-        yield node
-        node = node.parent
-    yield node
+    wait = not prefers_async(request)
+    try:
+        key = idempotency_key(request)
+    except ValueError as e:
+        return Response({"msg": str(e)},
+                        status=status.HTTP_400_BAD_REQUEST), None
+    if key is None:
+        if wait:
+            return None, run_workflow_chain(workflow)
+        job = start_job(workflow, request.user, action, name)
+        return job_accepted(job, request), None
+
+    fingerprint = request_fingerprint(action, name, request.data)
+    job = request_job(request)
+    if job is None:
+        try:
+            job = create_job(request.user, action, name,
+                             idempotency_key=key,
+                             fingerprint=fingerprint)
+        except IntegrityError:
+            return Response({"msg": "Request with this key in progress"},
+                            status=status.HTTP_409_CONFLICT), None
+        record_steps(job, workflow)
+        async_result = send_workflow(job, workflow, wait)
+    elif job.fingerprint != fingerprint:
+        return Response({"msg": "Key was used for a different request"},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY), None
+    elif job.status == WorkflowJob.FAILED or job_stalled(job):
+        async_result = resume_job_steps(job, wait)
+    elif not wait:
+        return job_accepted(job, request), None
+    elif job.status == WorkflowJob.SUCCEEDED:
+        return None, job.result
+    else:
+        return Response({"msg": "Request with this key in progress"},
+                        status=status.HTTP_409_CONFLICT), None
+    if not wait:
+        return job_accepted(job, request), None
+    if async_result is None:
+        # Nothing was left to run.
+        return None, job.result
+    return None, process_workflow_chain(async_result,
+                                        workflow_timeout(job.steps.all()))
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -139,11 +351,7 @@ class BaseViewSet(viewsets.ModelViewSet):
         Determine if the current logged in user is admin
         :returns: Boolean
         """
-        user = self.request.user
-        # Check if user is admin
-        if user.groups.filter(name='admin').exists():
-            return True
-        return False
+        return is_admin(self.request.user)
 
     def get_serializer_class(self):
         """
@@ -172,7 +380,7 @@ class BaseViewSet(viewsets.ModelViewSet):
 
         """
         user = self.request.user
-        if user.groups.filter(name='admin').exists():
+        if is_admin(user):
             return self.queryset
         return self.queryset.filter(user=user).distinct()
 
@@ -196,9 +404,7 @@ class HostAvailabilityViewSet(viewsets.GenericViewSet):
         """
         try:
             query = HostQuery()
-            availability = query.check_host(
-                idna.encode(host, uts46=True).decode('ascii')
-            )
+            availability = query.check_host(idn.encode(host))
             serializer = HostAvailabilitySerializer(
                 data=availability["result"][0]
             )
@@ -232,13 +438,8 @@ class DomainAvailabilityViewSet(viewsets.ViewSet):
 
         """
         try:
-            query = DomainQuery()
-            availability = query.check_domain(
-                idna.encode(domain, uts46=True).decode('ascii')
-            )
-            serializer = self.serializer_class(
-                data=availability["result"][0]
-            )
+            availability = check_availability([domain])
+            serializer = self.serializer_class(data=availability[0])
             if serializer.is_valid():
                 return Response(serializer.data)
         except EppError as e:
@@ -248,47 +449,166 @@ class DomainAvailabilityViewSet(viewsets.ViewSet):
             log.error(str(e), exc_info=True)
             return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def bulk_check_tasks(self, name):
+        """
+        Prepare a check domain task per active registry.
+
+        :name: str domain name without tld
+        :returns: list of (registry slug, fqdn list, task signature) tuples
+
+        """
+        encoded_name = idn.encode(name)
+        providers = DomainProvider.objects.filter(active=True)
+        checks = []
+        for provider in providers.all():
+            provider_slug = provider.slug
+            log.debug("Adding registry to check %s" % provider_slug)
+            workflow_manager = workflow_factory(provider_slug)()
+            tld_providers = provider.topleveldomainprovider_set.filter(
+                active=True
+            )
+            fqdn_list = []
+            for tld_provider in tld_providers.all():
+                zone = tld_provider.zone.zone
+                fqdn_list.append(".".join([encoded_name, zone]))
+                log.debug(
+                    {
+                        "msg": "Adding tld to check",
+                        "tld": zone
+                    }
+                )
+            checks.append(
+                (provider_slug,
+                 fqdn_list,
+                 workflow_manager.check_domains(fqdn_list))
+            )
+        return checks
+
+    def stream_format(self, request):
+        """
+        Return the streaming format asked for, if any.
+
+        Either ``?stream=ndjson`` / ``?stream=sse`` or an Accept header of
+        application/x-ndjson or text/event-stream selects streaming.
+
+        :request: HTTP request
+        :returns: str "ndjson", "sse" or None
+
+        """
+        stream = request.query_params.get("stream")
+        if stream in STREAM_CONTENT_TYPES:
+            return stream
+        accept = request.META.get("HTTP_ACCEPT", "")
+        for stream, content_type in STREAM_CONTENT_TYPES.items():
+            if content_type in accept:
+                return stream
+        return None
+
+    def registry_results(self, checks, deadline):
+        """
+        Yield the result of each registry check as soon as it is ready.
+        Registries that have not answered by the deadline are reported with
+        a timeout status.
+
+        :checks: list of (registry slug, fqdn list, task signature) tuples
+        :deadline: float seconds to wait for all registries
+        :returns: generator of dict objects
+
+        """
+        end = time.monotonic() + deadline
+        outstanding = [
+            (registry, fqdn_list, check_task.apply_async())
+            for registry, fqdn_list, check_task in checks
+        ]
+        while outstanding:
+            waiting = []
+            for registry, fqdn_list, result in outstanding:
+                if not result.ready():
+                    waiting.append((registry, fqdn_list, result))
+                    continue
+                item = {"registry": registry}
+                if result.successful():
+                    serializer = self.serializer_class(data=result.result,
+                                                       many=True)
+                    serializer.is_valid()
+                    item["status"] = "ok"
+                    item["result"] = serializer.data
+                else:
+                    log.error({"msg": "Bulk check failed",
+                               "registry": registry,
+                               "error": str(result.result)})
+                    item["status"] = "error"
+                    item["domains"] = fqdn_list
+                yield item
+            outstanding = waiting
+            if outstanding and time.monotonic() >= end:
+                for registry, fqdn_list, result in outstanding:
+                    log.warning({"msg": "Bulk check timed out",
+                                 "registry": registry})
+                    yield {"registry": registry,
+                           "status": "timeout",
+                           "domains": fqdn_list}
+                return
+            time.sleep(settings.BULK_AVAILABILITY_POLL_INTERVAL)
+
+    def stream_bulk_available(self, checks, stream, deadline):
+        """
+        Stream registry results as NDJSON lines or Server-Sent Events.
+
+        :checks: list of (registry slug, fqdn list, task signature) tuples
+        :stream: str "ndjson" or "sse"
+        :deadline: float seconds to wait for all registries
+        :returns: StreamingHttpResponse
+
+        """
+        def ndjson():
+            for item in self.registry_results(checks, deadline):
+                yield json.dumps(item) + "\n"
+
+        def sse():
+            for item in self.registry_results(checks, deadline):
+                yield "event: %s\ndata: %s\n\n" % (item["status"],
+                                                   json.dumps(item))
+            yield "event: end\ndata: {}\n\n"
+
+        content = sse() if stream == "sse" else ndjson()
+        response = StreamingHttpResponse(
+            content,
+            content_type=STREAM_CONTENT_TYPES[stream]
+        )
+        response["Cache-Control"] = "no-cache"
+        # Stop nginx from buffering the stream.
+        response["X-Accel-Buffering"] = "no"
+        return response
+
     def bulk_available(self, request, name=None):
         """
         Leave the tld away to check availability at all supported tld providers.
 
+        With a streaming format (see ``stream_format``) each registry's
+        results are sent as soon as they arrive. Registries still busy after
+        ``?deadline=`` seconds (at most BULK_AVAILABILITY_DEADLINE) are
+        reported with a timeout status.
+
         :request: HTTP request
         :name: str domain name to check
         :returns: availability of domain object
 
         """
         try:
-            providers = DomainProvider.objects.filter(active=True)
-            registry_workflows = []
-            for provider in providers.all():
-                provider_slug = provider.slug
-                log.debug("Adding registry to check %s" % provider_slug)
-                workflow_manager = workflow_factory(provider_slug)()
-                tld_providers = provider.topleveldomainprovider_set.filter(
-                    active=True
-                )
-                fqdn_list = []
-                for tld_provider in tld_providers.all():
-                    zone = tld_provider.zone.zone
-                    fqdn_list.append(
-                        ".".join(
-                            [
-                                idna.encode(name, uts46=True).decode('ascii'),
-                                zone
-                            ]
-                        )
+            checks = self.bulk_check_tasks(name)
+            stream = self.stream_format(request)
+            if stream:
+                deadline = settings.BULK_AVAILABILITY_DEADLINE
+                try:
+                    deadline = min(
+                        float(request.query_params.get("deadline", deadline)),
+                        deadline
                     )
-                    log.debug(
-                        {
-                            "msg": "Adding tld to check",
-                            "tld": zone
-                        }
-                    )
-                check_task = workflow_manager.check_domains(
-                    fqdn_list
-                )
-                registry_workflows.append(check_task)
-            check_group = group(registry_workflows)()
+                except ValueError:
+                    pass
+                return self.stream_bulk_available(checks, stream, deadline)
+            check_group = group([i[2] for i in checks])()
             registry_result = check_group.get()
             check_result = []
             for i in registry_result:
@@ -371,6 +691,7 @@ class ContactViewSet(BaseViewSet):
     permission_classes = (permissions.IsAuthenticated,
                           permissions.DjangoModelPermissionsOrAnonReadOnly,)
     filter_backends = (IsPersonFilterBackend,)
+    pagination_class = ContactCursorPagination
     lookup_field = 'registry_id'
     serializer_class = PrivateInfoContactSerializer
     admin_serializer_class = AdminInfoContactSerializer
@@ -382,8 +703,8 @@ class ContactViewSet(BaseViewSet):
         :returns: Contact or registrant set
         """
         user = self.request.user
-        queryset = self.queryset
-        if not user.groups.filter(name='admin').exists():
+        queryset = self.queryset.select_related('provider')
+        if not is_admin(user):
             queryset = queryset.filter(user=user)
 
         provider = self.request.query_params.get('provider', None)
@@ -407,13 +728,12 @@ class ContactViewSet(BaseViewSet):
         try:
             serializer_class = self.get_serializer_class()
             log.info("Serializer class: {!r}".format(serializer_class))
-            log.debug("Performing info for %s as owner." % registry_id)
-            query = ContactQuery(queryset)
-            contact_data = query.info(contact)
-            queryset.filter(pk=contact.id).update(**contact_data)
-            contact = queryset.get(pk=contact.id)
+            info, headers = prepare_info(contact, refresh_requested(request))
+            if info is not None:
+                log.debug("Performed info for %s as owner." % registry_id)
+                contact = queryset.get(pk=contact.id)
             serializer = serializer_class(contact, context={"request": request})
-            return Response(serializer.data)
+            return Response(serializer.data, headers=headers)
         except UnknownRegistry as e:
             log.error(str(e), exc_info=True)
             return Response(status=status.HTTP_400_BAD_REQUEST)
@@ -459,6 +779,7 @@ class RegistrantViewSet(ContactViewSet):
 class RegisteredDomainViewSet(BaseViewSet):
 
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = RegisteredDomainCursorPagination
     serializer_class = PrivateInfoDomainSerializer
     admin_serializer_class = AdminInfoDomainSerializer
     lookup_value_regex = '[^/]+'
@@ -491,7 +812,7 @@ class RegisteredDomainViewSet(BaseViewSet):
         nameserver = self.request.query_params.get("nameserver", None)
         if nameserver is not None:
             queryset = queryset.filter(
-                nameservers__contains=nameserver
+                domain_nameservers__idn_host=idn.encode(nameserver)
             )
         provider = self.request.query_params.get('provider', None)
         if provider is not None:
@@ -504,7 +825,7 @@ class RegisteredDomainViewSet(BaseViewSet):
             active = False
         queryset = queryset.filter(active=active)
 
-        return queryset
+        return with_domain_relations(queryset)
 
     def is_owner(self, domain=None):
         """
@@ -512,12 +833,11 @@ class RegisteredDomainViewSet(BaseViewSet):
         :domain: RegisteredDomain object
         :returns: Boolean
         """
-        user = self.request.user
         if domain:
-            if domain.registrant.user == user:
-                return True
-            if domain.contacts.filter(contact__user=user).exists():
-                return True
+            return DomainAccess.objects.filter(
+                user=self.request.user,
+                registered_domain=domain
+            ).exists()
         return False
 
     def retrieve(self, request, fqdn=None):
@@ -537,21 +857,20 @@ class RegisteredDomainViewSet(BaseViewSet):
             queryset,
             fqdn=fqdn,
         )
-        domain = registered_domain.name + "." + registered_domain.tld.zone
 
         try:
-            # Fetch registry for domain
-            query = DomainQuery(self.get_queryset())
-            info = query.info(domain)
-            get_logzio_sender().append(info)
-            log.debug("Info domain for %s" % domain)
+            info, headers = prepare_info(registered_domain,
+                                         refresh_requested(request))
+            if info is not None:
+                get_logzio_sender().append(info)
+                log.debug("Info domain for %s" % fqdn)
+                registered_domain = queryset.get(pk=registered_domain.id)
             serializer_class = self.get_serializer_class()
-            synchronise_domain(info, registered_domain.id)
             serializer = serializer_class(
-                queryset.get(pk=registered_domain.id),
+                registered_domain,
                 context={"request": request}
             )
-            return Response(serializer.data)
+            return Response(serializer.data, headers=headers)
         except InvalidTld as e:
             log.error(str(e), exc_info=True)
             return Response(status=status.HTTP_400_BAD_REQUEST)
@@ -588,8 +907,11 @@ class RegisteredDomainViewSet(BaseViewSet):
             log.debug({"msg": "About to call workflow_manager.create_domain"})
             workflow = workflow_manager.create_domain(data, request.user)
             # run chained workflow and register the domain
-            chained_workflow = chain(workflow)()
-            process_workflow_chain(chained_workflow)
+            response, _ = run_request_workflow(request, workflow,
+                                               "create_domain",
+                                               data["domain"])
+            if response is not None:
+                return response
             registered_domain = self.get_queryset().get(
                 name=parsed_domain["domain"],
                 tld__zone=parsed_domain["zone"],
@@ -622,6 +944,99 @@ class RegisteredDomainViewSet(BaseViewSet):
             log.error(str(e), exc_info=True)
             return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @list_route(methods=['post', 'patch'])
+    def bulk(self, request):
+        """
+        Register or update a batch of domains in the background.
+
+        :request: Request object with JSON payload
+        :returns: Response with the job handling the domains
+        """
+        if request.method == 'PATCH':
+            return self.bulk_update(request)
+        return self.bulk_create(request)
+
+    def bulk_create(self, request):
+        """
+        Register a batch of domains.
+
+        :request: Request object with JSON payload; domains is a list of
+                  domain names, everything else applies to all of them as
+                  in a single create request
+        :returns: Response with the job registering the domains
+        """
+        try:
+            domains = bulk_domain_names(request.data)
+            # Reject names we cannot route before anything is queued.
+            get_domain_registries(domains)
+        except (KeyError, ValueError, InvalidTld, UnsupportedTld) as e:
+            log.error(str(e), exc_info=True)
+            return Response({"msg": str(e)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        data = {key: value for key, value in request.data.items()
+                if key != "domains"}
+        job = start_job([bulk_create_domains.si()],
+                        request.user,
+                        "bulk_create_domain",
+                        "%d domains" % len(domains),
+                        items=domains,
+                        parameters=data)
+        return job_accepted(job, request)
+
+    def bulk_update(self, request):
+        """
+        Apply one change set to a batch of domains.
+
+        The domains are either listed in the payload, at most
+        BULK_MAX_DOMAINS of them, or all domains matching the filters of the
+        domain list (?registrant=, ?admin=, ?tech=, ?nameserver=,
+        ?provider=), however many there are.
+
+        :request: Request object with JSON payload; domains is an optional
+                  list of domain names, everything else is the change set
+                  as in a single partial update
+        :returns: Response with the job updating the domains
+        """
+        data = {key: value for key, value in request.data.items()
+                if key != "domains"}
+        if not any(key in data for key in BULK_UPDATE_FIELDS):
+            return Response({"msg": "No change to domains"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        # Prefetching does not apply to a list of names.
+        queryset = self.get_queryset().prefetch_related(None)
+        try:
+            if "domains" in request.data:
+                domains = bulk_domain_names(request.data)
+                found = set(queryset.filter(fqdn__in=domains).values_list(
+                    'fqdn',
+                    flat=True
+                ))
+                missing = [i for i in domains if i not in found]
+                if missing:
+                    return Response({"msg": "Unknown domains",
+                                     "domains": missing},
+                                    status=status.HTTP_400_BAD_REQUEST)
+            elif any(i in request.query_params for i in BULK_UPDATE_FILTERS):
+                domains = list(queryset.order_by('fqdn').values_list(
+                    'fqdn',
+                    flat=True
+                ).distinct())
+                if not domains:
+                    raise ValueError("No domains match the filters")
+            else:
+                raise ValueError("List domains or filter them")
+        except ValueError as e:
+            log.error(str(e), exc_info=True)
+            return Response({"msg": str(e)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        job = start_job([bulk_update_domains.si()],
+                        request.user,
+                        "bulk_update_domain",
+                        "%d domains" % len(domains),
+                        items=domains,
+                        parameters=data)
+        return job_accepted(job, request)
+
     def partial_update(self, request, fqdn=None):
         """
         Partial update of domain
@@ -644,16 +1059,25 @@ class RegisteredDomainViewSet(BaseViewSet):
             update_domain = request.data
             update_domain["domain"] = domain
 
-            log.debug({"msg": "About to call workflow_manager.update_domain"})
-            workflow = workflow_manager.update_domain(request.data,
-                                                      registered_domain,
-                                                      request.user)
-            # run chained workflow and register the domain
-            raw_workflow = chain(workflow)
-            if not raw_workflow:
-                return Response({"msg": "No change to domain"})
-            chained_workflow = raw_workflow()
-            chain_res = process_workflow_chain(chained_workflow)
+            if request_job(request) is not None:
+                # A repeated request is answered from its job. The domain
+                # may already have the changes, leaving nothing to build.
+                workflow = None
+            else:
+                log.debug({"msg": "About to call "
+                                  "workflow_manager.update_domain"})
+                workflow = workflow_manager.update_domain(request.data,
+                                                          registered_domain,
+                                                          request.user)
+                # run chained workflow and register the domain
+                raw_workflow = chain(workflow)
+                if not raw_workflow:
+                    return Response({"msg": "No change to domain"})
+            response, chain_res = run_request_workflow(request, workflow,
+                                                       "update_domain",
+                                                       domain)
+            if response is not None:
+                return response
             get_logzio_sender().append(chain_res)
             if registered_domain and any([self.is_admin(),
                                           self.is_owner(registered_domain)]):
@@ -677,7 +1101,9 @@ class DomainContactViewSet(viewsets.ModelViewSet):
     serializer_class = DomainContactSerializer
     permission_classes = (permissions.IsAuthenticated,
                           permissions.DjangoModelPermissionsOrAnonReadOnly,)
-    queryset = DomainContact.objects.all()
+    queryset = DomainContact.objects.select_related('registered_domain',
+                                                    'contact',
+                                                    'contact_type')
 
 
 class TopLevelDomainProviderViewSet(viewsets.ModelViewSet):
@@ -704,6 +1130,7 @@ class NameserverViewSet(BaseViewSet):
     admin_serializer_class = AdminInfoHostSerializer
     permission_classes = (permissions.DjangoModelPermissionsOrAnonReadOnly,
                           permissions.IsAuthenticated,)
+    pagination_class = NameserverCursorPagination
     queryset = Nameserver.objects.all()
     lookup_field = 'idn_host'
 
@@ -735,17 +1162,18 @@ class NameserverViewSet(BaseViewSet):
         """
         registered_host = get_object_or_404(
             self.get_queryset(),
-            idn_host=idna.encode(idn_host, uts46=True).decode('ascii'),
+            idn_host=idn.encode(idn_host),
         )
         try:
-            # Fetch registry for host
-            query = HostQuery(self.get_queryset())
-            info = query.info(registered_host)
-            self.get_queryset().filter(pk=registered_host.id).update(**info)
-            registered_host = self.get_queryset().get(pk=registered_host.id)
+            info, headers = prepare_info(registered_host,
+                                         refresh_requested(request))
+            if info is not None:
+                registered_host = self.get_queryset().get(
+                    pk=registered_host.id
+                )
             serializer_class = self.get_serializer_class()
             serializer = serializer_class(registered_host)
-            return Response(serializer.data)
+            return Response(serializer.data, headers=headers)
         except EppObjectDoesNotExist as e:
             log.error(str(e), exc_info=True)
             return Response(status=status.HTTP_404_NOT_FOUND)
@@ -756,6 +1184,32 @@ class NameserverViewSet(BaseViewSet):
             log.error(str(e), exc_info=True)
             return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @detail_route(methods=['get'])
+    def domains(self, request, idn_host=None):
+        """
+        List the domains visible to the user that are delegated to a host.
+
+        :request: HTTP request
+        :idn_host: str host name
+        :returns: paginated list of domains
+
+        """
+        queryset = get_registered_domain_queryset(request.user).filter(
+            domain_nameservers__idn_host=idn.encode(idn_host),
+            active=True
+        ).order_by('fqdn')
+        queryset = with_domain_relations(queryset)
+        if self.is_admin():
+            serializer_class = AdminInfoDomainSerializer
+        else:
+            serializer_class = PrivateInfoDomainSerializer
+        paginator = DomainPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = serializer_class(page,
+                                      many=True,
+                                      context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
     def create(self, request):
         """
         Register a nameserver host.
@@ -778,11 +1232,13 @@ class NameserverViewSet(BaseViewSet):
                 log.debug("About to call workflow_manager.create_host")
                 workflow = workflow_manager.create_host(data, request.user)
                 # run chained workflow and register the domain
-                chained_workflow = chain(workflow)()
-                process_workflow_chain(chained_workflow)
+                response, _ = run_request_workflow(request, workflow,
+                                                   "create_host",
+                                                   data["idn_host"])
+                if response is not None:
+                    return response
                 registered_host = self.get_queryset().get(
-                    idn_host=idna.encode(data["idn_host"],
-                                         uts46=True).decode('ascii'),
+                    idn_host=idn.encode(data["idn_host"]),
                 )
                 serializer = serializer_class(registered_host)
                 return Response(serializer.data,
@@ -798,3 +1254,63 @@ class NameserverViewSet(BaseViewSet):
                 log.error(str(e), exc_info=True)
                 return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class WorkflowJobViewSet(viewsets.ReadOnlyModelViewSet):
+
+    """
+    Progress and outcome of asynchronous registry requests.
+    """
+    serializer_class = WorkflowJobSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = OrderedCursorPagination
+    queryset = WorkflowJob.objects.prefetch_related('steps')
+
+    def get_queryset(self):
+        """
+        Return queryset
+        :returns: WorkflowJob set
+        """
+        user = self.request.user
+        if is_admin(user):
+            return self.queryset
+        return self.queryset.filter(user=user)
+
+    @detail_route(methods=['get'])
+    def items(self, request, pk=None):
+        """
+        List the domains of a bulk job with their outcome.
+
+        :request: HTTP request; ?status= limits the list to one status
+        :pk: str job id
+        :returns: paginated list of job items
+
+        """
+        job = self.get_object()
+        queryset = job.items.all()
+        item_status = request.query_params.get("status", None)
+        if item_status is not None:
+            queryset = queryset.filter(status=item_status)
+        paginator = DomainPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = WorkflowJobItemSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @detail_route(methods=['post'])
+    def resume(self, request, pk=None):
+        """
+        Carry on with the unfinished domains of a bulk job.
+
+        :request: HTTP request; retry_failed true in the payload also
+                  retries domains that failed
+        :pk: str job id
+        :returns: Response with the job
+
+        """
+        job = self.get_object()
+        if not job_resumable(job):
+            return Response({"msg": "Job is not a bulk job or still running"},
+                            status=status.HTTP_409_CONFLICT)
+        retry_failed = str(request.data.get("retry_failed", "")).lower()
+        job = resume_job(job, retry_failed in ("1", "true"))
+        return job_accepted(job, request)
@@ -1,5 +1,4 @@
 from __future__ import absolute_import, unicode_literals
-import idna
 from .tasks import (
     check_domain,
     check_bulk_domain,
@@ -8,6 +7,7 @@ from .tasks import (
     update_domain_registrant,
     update_domain_registry_contact,
     create_domain,
+    create_domain_prerequisites,
     connect_domain,
     check_host,
     create_host,
@@ -17,6 +17,8 @@ from .tasks import (
     init_update_domain,
 )
 from application.settings import get_logzio_sender
+from .utilities.idn import encode as encode_idn
+from .utilities.roles import is_admin
 from .models import (
     AccountDetail,
     DefaultAccountTemplate,
@@ -116,7 +118,7 @@ class Workflow(object):
                 return epp
         self.append(
             create_registrant.si(
-                epp,
+                {},
                 person_id=account_detail_id,
                 registry=self.registry,
                 user=user.id
@@ -170,25 +172,15 @@ class Workflow(object):
                     "Adding workflow to create %s contact: %s" % (contact_type,
                                                                   person_id)
                 )
-                if len(self.workflow) == 1:
-                    self.append(
-                        create_registry_contact.si(
-                            epp,
-                            person_id=person_id,
-                            registry=self.registry,
-                            contact_type=contact_type,
-                            user=user_id
-                        )
-                    )
-                else:
-                    self.append(
-                        create_registry_contact.s(
-                            person_id=person_id,
-                            registry=self.registry,
-                            contact_type=contact_type,
-                            user=user_id
-                        )
+                self.append(
+                    create_registry_contact.si(
+                        {},
+                        person_id=person_id,
+                        registry=self.registry,
+                        contact_type=contact_type,
+                        user=user_id
                     )
+                )
         if len(existing_contacts) > 0:
             self.append_contacts_to_epp(epp, existing_contacts)
 
@@ -237,14 +229,15 @@ class Workflow(object):
         if "period" in data:
             epp["period"] = data["period"]
 
-        self.append(check_domain.s(data["domain"]))
         self.create_registrant_workflow(epp, data, user)
         self.create_contact_workflow(epp, data, user)
-
-        if len(self.workflow) == 1:
-            self.append(create_domain.si(epp, self.registry))
-        else:
-            self.append(create_domain.s(self.registry))
+        # The check and any registrant or contacts still to be created do
+        # not depend on each other. Run them together and merge what they
+        # return into the create command.
+        prerequisites = [check_domain.si(data["domain"])] + self.workflow
+        self.workflow = []
+        self.append(create_domain_prerequisites.si(epp, prerequisites))
+        self.append(create_domain.s(self.registry))
         self.append(connect_domain.s(self.registry))
         return self.workflow
 
@@ -356,7 +349,7 @@ class Workflow(object):
         query_set = Contact.objects.filter(
             provider__slug=self.registry,
         )
-        if not user.groups.filter(name='admin').exists():
+        if not is_admin(user):
             query_set = query_set.filter(user=user)
         contact_query_set = query_set.filter(registry_id=contact_id)
         # This contact exists
@@ -424,7 +417,7 @@ class Workflow(object):
         # Look for an existing registrant that belongs to this request user.
         # This assumes that the new registrant id is a "registry id".
         query_set = Registrant.objects.all()
-        if not user.groups.filter(name='admin').exists():
+        if not is_admin(user):
             query_set = Registrant.objects.filter(user=user)
         registrant_query_set = query_set.filter(
             registry_id=new_registrant
@@ -457,7 +450,7 @@ class Workflow(object):
         if current_nameservers is None:
             current_nameservers = []
         for ns_host in ns:
-            idn = idna.encode(ns_host, uts46=True).decode('ascii')
+            idn = encode_idn(ns_host)
             if idn not in current_nameservers:
                 add = epp.get("add", {})
                 add_ns = add.get("ns", [])
@@ -468,7 +461,7 @@ class Workflow(object):
                 log.debug("%s is a current nameserver" % idn)
 
         for ns_host in current_nameservers:
-            idn = idna.encode(ns_host, uts46=True).decode('ascii')
+            idn = encode_idn(ns_host)
             idn_included = idn in ns
             host_included = ns_host in ns
             if not any([idn_included, host_included]):